@@ -0,0 +1,78 @@
+"""
+Бенчмарк AIClient: новый httpx.AsyncClient на каждый запрос против общего пула.
+
+Запуск:
+    python -m benchmarks.bench_ai_client --requests 500 --concurrency 8
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from benchmarks.common import print_table, summarize
+from benchmarks.fake_openrouter import FakeOpenRouter
+from config.settings import settings
+from src.ai.client import AIClient
+
+
+async def _run(worker, total: int, concurrency: int) -> list[float]:
+    latencies: list[float] = []
+    remaining = iter(range(total))
+
+    async def loop():
+        for _ in remaining:
+            started = time.perf_counter()
+            await worker()
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(loop() for _ in range(concurrency)))
+    return latencies
+
+
+async def main(total: int, concurrency: int, latency: float):
+    async with FakeOpenRouter(latency=latency) as server:
+        settings.openrouter_base_url = server.base_url
+        settings.openrouter_api_key = settings.openrouter_api_key or "bench-key"
+        headers = {"Authorization": f"Bearer {settings.openrouter_api_key}"}
+        payload = {"model": "fake/model", "messages": [{"role": "user", "content": "hi"}]}
+
+        async def per_request_client():
+            async with httpx.AsyncClient(timeout=30.0) as client:
+                response = await client.post(server.base_url, json=payload, headers=headers)
+                response.raise_for_status()
+
+        before = server.connections
+        per_request = await _run(per_request_client, total, concurrency)
+        per_request_connections = server.connections - before
+
+        ai_client = AIClient()
+        before = server.connections
+        await ai_client.start()
+
+        async def shared_client():
+            await ai_client.generate_response([], "hi")
+
+        shared = await _run(shared_client, total, concurrency)
+        shared_connections = server.connections - before
+        await ai_client.close()
+
+    per_request_stats = summarize(per_request)
+    shared_stats = summarize(shared)
+    print_table(
+        f"AIClient round trip ({total} requests, concurrency {concurrency}, server latency {latency * 1000:.0f}ms)",
+        [("client per request", per_request_stats), ("shared pooled client", shared_stats)],
+    )
+    print(f"\nTCP connections opened: per-request={per_request_connections}, shared={shared_connections}")
+    for q in ("p50", "p99"):
+        gain = per_request_stats[q] - shared_stats[q]
+        print(f"{q} gain per request: {gain * 1000:.3f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.0, help="искусственная задержка сервера, с")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.latency))
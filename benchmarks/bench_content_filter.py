@@ -0,0 +1,80 @@
+"""
+Бенчмарк фильтра нецензурной лексики на ~4 КБ ответах модели.
+
+Сравнивает однопроходный ProfanityMatcher с прежней реализацией на
+better_profanity (contains_profanity + censor), если пакет установлен.
+
+Запуск:
+    python -m benchmarks.bench_content_filter --iterations 200
+"""
+import argparse
+import logging
+import time
+
+from benchmarks.common import print_table, summarize
+from benchmarks.corpus import make_text
+from src.filters.content_filter import ContentFilter
+from src.filters.stopwords import ALL_STOPWORDS
+
+
+def _legacy_filter():
+    try:
+        from better_profanity import profanity
+    except ImportError:
+        return None
+    profanity.load_censor_words()
+    profanity.add_censor_words(ALL_STOPWORDS)
+
+    def filter_response(text: str) -> str:
+        if profanity.contains_profanity(text):
+            return profanity.censor(text)
+        return text
+
+    return filter_response
+
+
+def _measure(func, texts, iterations):
+    timings = []
+    for _ in range(iterations):
+        for text in texts:
+            started = time.perf_counter()
+            func(text)
+            timings.append(time.perf_counter() - started)
+    return summarize(timings)
+
+
+def main(iterations: int, size: int, legacy_iterations: int = 1):
+    # Предупреждения о цензуре на каждом тексте только мешают читать таблицу
+    logging.disable(logging.WARNING)
+
+    corpora = {
+        "en clean": [make_text(size, "en", seed=i) for i in range(5)],
+        "ru clean": [make_text(size, "ru", seed=i) for i in range(5)],
+        "mixed 1% profane": [make_text(size, "mixed", seed=i, profanity_rate=0.01) for i in range(5)],
+    }
+
+    content_filter = ContentFilter()
+    legacy = _legacy_filter()
+    if legacy is None:
+        print("better_profanity is not installed, legacy comparison skipped")
+
+    rows = []
+    for name, texts in corpora.items():
+        rows.append((f"matcher  {name}", _measure(content_filter.filter_response, texts, iterations)))
+        if legacy is not None:
+            # Прежняя реализация тратит секунды на каждый текст — хватает одного повтора
+            rows.append((f"legacy   {name}", _measure(legacy, texts, legacy_iterations)))
+            mismatches = sum(legacy(text) != content_filter.filter_response(text) for text in texts)
+            if mismatches:
+                print(f"note: {mismatches} text(s) in '{name}' censored differently")
+
+    print_table(f"ContentFilter.filter_response on {size}-char inputs", rows, unit="ms", scale=1e3)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--size", type=int, default=4096)
+    parser.add_argument("--legacy-iterations", type=int, default=1)
+    args = parser.parse_args()
+    main(args.iterations, args.size, args.legacy_iterations)
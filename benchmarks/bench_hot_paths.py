@@ -0,0 +1,241 @@
+"""
+Микробенчмарки функций, которые выполняются на каждое сообщение:
+split_message, ContentFilter.validate_message и filter_response,
+format_conversation_history, t() и normalize_language_code.
+
+Входные данные — детерминированные ~4 КБ ответы с Markdown, блоками кода
+и смешанным русским/английским текстом (benchmarks/corpus.py).
+
+Время каждого случая хранится относительно калибровочной нагрузки на чистом
+Python, замеренной вперемешку с ним, поэтому базовые значения из
+репозитория (benchmarks/baselines/) сравнимы между машинами. --save делает
+несколько прогонов, записывает медиану и разброс между прогонами — шум случая.
+--check завершается с кодом 1, если какой-то случай стал медленнее базового
+больше чем на --threshold плюс его шум. Тот же контроль в pytest:
+BENCH_CHECK=1 pytest tests/test_benchmarks.py
+
+Запуск:
+    python -m benchmarks.bench_hot_paths              # таблица и сравнение с базой
+    python -m benchmarks.bench_hot_paths --check      # код возврата 1 при регрессии
+    python -m benchmarks.bench_hot_paths --save       # обновить базовые значения
+"""
+import argparse
+import json
+import logging
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from benchmarks.corpus import make_text
+from src.ai.prompts import format_conversation_history
+from src.filters.content_filter import ContentFilter
+from src.localization.messages import normalize_language_code, t
+from src.utils.message_splitter import split_message
+
+BASELINE_PATH = Path(__file__).parent / "baselines" / "hot_paths.json"
+
+# Допустимое замедление относительно базы, доля
+DEFAULT_THRESHOLD = 0.25
+
+# Сколько прогонов набора делает --save, чтобы оценить шум каждого случая
+DEFAULT_SAVE_RUNS = 5
+
+SIZE = 4096
+
+
+def _history(count: int = 20) -> List[dict]:
+    messages = []
+    for index in range(count):
+        role = "user" if index % 2 == 0 else "assistant"
+        size = 300 if role == "user" else 1500
+        messages.append({"role": role, "content": make_text(size, "mixed", seed=index)})
+    return messages
+
+
+def build_cases() -> Dict[str, Callable[[], object]]:
+    """Случаи бенчмарка: имя -> вызов без аргументов над заранее подготовленными данными."""
+    texts = {language: make_text(SIZE, language, seed=1) for language in ("en", "ru", "mixed")}
+    # Сообщение пользователя чуть короче лимита validate_message в 4000 символов
+    user_message = make_text(3900, "mixed", seed=2)
+    history = _history()
+    content_filter = ContentFilter()
+    language_codes = ["ru", "ru-RU", "en", "en-US", "EN-gb", "de", "uk", None, "", "pt-BR"]
+
+    def each_code(func: Callable) -> Callable[[], object]:
+        return lambda: [func(code) for code in language_codes]
+
+    return {
+        "split_message en": lambda: split_message(texts["en"]),
+        "split_message ru": lambda: split_message(texts["ru"]),
+        "split_message mixed 1k parts": lambda: split_message(texts["mixed"], max_size=1024),
+        "validate_message mixed": lambda: content_filter.validate_message(user_message, "ru"),
+        "filter_response en": lambda: content_filter.filter_response(texts["en"]),
+        "filter_response ru": lambda: content_filter.filter_response(texts["ru"]),
+        "filter_response mixed": lambda: content_filter.filter_response(texts["mixed"]),
+        "format_history full": lambda: format_conversation_history(history),
+        "format_history budget": lambda: format_conversation_history(history, token_budget=3000),
+        "t plain x10": each_code(lambda code: t(code, "error_general")),
+        "t placeholders x10": each_code(lambda code: t(code, "start_welcome", first_name="Иван")),
+        "normalize_language x10": each_code(normalize_language_code),
+    }
+
+
+def calibration_workload():
+    """Эталонная нагрузка: строки, словари и циклы, как в функциях выше."""
+    words = ("alpha", "бета", "gamma", "дельта", "epsilon") * 40
+    counts: Dict[str, int] = {}
+    for word in words:
+        key = word.lower().strip()
+        counts[key] = counts.get(key, 0) + len(word)
+    return "\n".join(f"{key}:{value}" for key, value in sorted(counts.items())).split("\n")
+
+
+def _time_per_call(func: Callable[[], object], loops: int) -> float:
+    started = time.perf_counter()
+    for _ in range(loops):
+        func()
+    return (time.perf_counter() - started) / loops
+
+
+def _loops_for(func: Callable[[], object], target: float) -> int:
+    loops = 1
+    while True:
+        elapsed = _time_per_call(func, loops) * loops
+        if elapsed >= target / 10:
+            return max(1, int(loops * target / elapsed))
+        loops *= 2
+
+
+def measure(func: Callable[[], object], target: float = 0.01, rounds: int = 21) -> Tuple[float, float]:
+    """
+    Лучшее из rounds время на вызов и его отношение к лучшему времени калибровки.
+
+    Посторонняя нагрузка на машине только добавляет время, поэтому минимум из
+    многих замеров устойчивее медианы. Случай и калибровка замеряются
+    вперемешку по target секунд, чтобы оба минимума попали в одни условия.
+    """
+    calibration_loops = _loops_for(calibration_workload, target)
+    loops = _loops_for(func, target)
+    seconds = []
+    calibration = []
+    for _ in range(rounds):
+        calibration.append(_time_per_call(calibration_workload, calibration_loops))
+        seconds.append(_time_per_call(func, loops))
+    best = min(seconds)
+    return best, best / min(calibration)
+
+
+def run_suite(names: Optional[Iterable[str]] = None, target: float = 0.01, rounds: int = 21) -> dict:
+    # Предупреждения фильтра и локализации не должны попадать в замеры
+    logging.disable(logging.WARNING)
+    try:
+        cases = build_cases()
+        results = {}
+        for name in (list(cases) if names is None else names):
+            seconds, relative = measure(cases[name], target, rounds)
+            results[name] = {"seconds": seconds, "relative": relative}
+        return {"python": platform.python_version(), "cases": results}
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+def run_repeated(names: Optional[Iterable[str]] = None, target: float = 0.01, rounds: int = 21,
+                 runs: int = DEFAULT_SAVE_RUNS) -> dict:
+    """
+    Несколько прогонов набора: медиана по прогонам и шум — на сколько самый
+    медленный прогон отстал от медианы. Так база не зависит от одного
+    неудачного прогона, а порог проверки учитывает разброс каждого случая.
+    """
+    names = list(build_cases()) if names is None else list(names)
+    passes = [run_suite(names, target, rounds)["cases"] for _ in range(max(1, runs))]
+    cases = {}
+    for name in names:
+        relative = statistics.median(result[name]["relative"] for result in passes)
+        cases[name] = {
+            "seconds": statistics.median(result[name]["seconds"] for result in passes),
+            "relative": relative,
+            "noise": max(result[name]["relative"] for result in passes) / relative - 1,
+        }
+    return {"python": platform.python_version(), "cases": cases}
+
+
+def load_baseline(path: Path = BASELINE_PATH) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(results: dict, path: Path = BASELINE_PATH):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+class Comparison(NamedTuple):
+    name: str
+    seconds: float
+    change: Optional[float]
+    regressed: bool
+
+
+def compare(results: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> List[Comparison]:
+    """
+    Изменение относительного времени каждого случая против базы (0.1 — на 10%
+    медленнее). Регрессия — замедление больше threshold плюс шум случая из базы.
+    """
+    rows = []
+    for name, current in results["cases"].items():
+        base = baseline.get("cases", {}).get(name)
+        if base is None:
+            rows.append(Comparison(name, current["seconds"], None, False))
+            continue
+        change = current["relative"] / base["relative"] - 1
+        rows.append(Comparison(name, current["seconds"], change, change > threshold + base.get("noise", 0.0)))
+    return rows
+
+
+def print_comparison(rows: List[Comparison], threshold: float):
+    print(f"{'case':<32}{'time':>12}{'vs baseline':>14}")
+    for row in rows:
+        change = "new" if row.change is None else f"{row.change:+.1%}"
+        marker = "  REGRESSION" if row.regressed else ""
+        print(f"{row.name:<32}{row.seconds * 1e6:>10.1f}us{change:>14}{marker}")
+    regressions = sum(row.regressed for row in rows)
+    print(f"\n{regressions} regression(s) beyond {threshold:.0%}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--case", action="append", help="запустить только указанный случай")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="допустимое замедление, доля (0.25 — 25%%)")
+    parser.add_argument("--target", type=float, default=0.01, help="длительность одного замера, с")
+    parser.add_argument("--rounds", type=int, default=21)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true", help="записать результаты как новую базу")
+    parser.add_argument("--save-runs", type=int, default=DEFAULT_SAVE_RUNS,
+                        help="прогонов набора для --save (оценка шума)")
+    parser.add_argument("--check", action="store_true", help="код возврата 1 при регрессии")
+    args = parser.parse_args(argv)
+
+    if args.save:
+        results = run_repeated(args.case, args.target, args.rounds, args.save_runs)
+    else:
+        results = run_suite(args.case, args.target, args.rounds)
+    baseline = load_baseline(args.baseline) if args.baseline.exists() else {}
+    if args.save:
+        # С --case обновляются только выбранные случаи, остальные остаются в базе
+        saved = {**baseline, **results, "cases": {**baseline.get("cases", {}), **results["cases"]}}
+        save_baseline(saved, args.baseline)
+        print(f"Baseline saved to {args.baseline}")
+        baseline = saved
+    rows = compare(results, baseline, args.threshold)
+    print_comparison(rows, args.threshold)
+    return 1 if args.check and any(row.regressed for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
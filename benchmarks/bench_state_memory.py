@@ -0,0 +1,149 @@
+"""
+Бенчмарк памяти StateManager: байт на сессию и на сообщение.
+
+Создаёт N сессий через StateManager (по умолчанию 100 000) и по M сообщений
+в каждой, измеряя прирост памяти через tracemalloc. Для сравнения строит ту
+же структуру в прежнем формате — словари со строками времени ISO. Затем
+переносит всю историю в холодный уровень и измеряет степень сжатия,
+освободившуюся память и задержку восстановления.
+
+Запуск:
+    python -m benchmarks.bench_state_memory --sessions 100000 --messages 4
+"""
+import argparse
+import asyncio
+import gc
+import logging
+import sys
+import time
+import tracemalloc
+from collections import OrderedDict, deque
+from datetime import datetime
+
+from benchmarks.common import print_table, summarize
+from config.settings import settings
+from src.state.manager import StateManager
+
+CONTENT = "Короткое сообщение пользователя, short reply from the model"
+
+
+def _content(session: int, index: int) -> str:
+    return f"{CONTENT} {session}:{index}"
+
+
+def _measure(build):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    keep = build()
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return keep, used, elapsed
+
+
+def _records(sessions: int, messages: int):
+    manager = StateManager()
+    manager.max_sessions = 0
+    manager.max_bytes = 0
+
+    async def fill():
+        for user_id in range(sessions):
+            session = await manager.get_or_create_session(user_id, f"user{user_id}", f"User{user_id}", "ru")
+            for index in range(messages):
+                role = "user" if index % 2 == 0 else "assistant"
+                await manager.save_message(session.id, role, _content(user_id, index))
+
+    asyncio.run(fill())
+    return manager
+
+
+def _legacy(sessions: int, messages: int):
+    store = OrderedDict()
+    history = {}
+    for user_id in range(sessions):
+        session_id = f"session_{user_id}_{datetime.now().timestamp()}"
+        store[user_id] = {
+            "id": session_id,
+            "telegram_user_id": user_id,
+            "username": f"user{user_id}",
+            "first_name": f"User{user_id}",
+            "language": "ru",
+            "conversation_context": {},
+            "created_at": datetime.now().isoformat(),
+            "last_active": time.monotonic(),
+        }
+        buffer = deque(maxlen=50)
+        for index in range(messages):
+            buffer.append({
+                "role": "user" if index % 2 == 0 else "assistant",
+                "content": _content(user_id, index),
+                "created_at": datetime.now().isoformat(),
+                "tokens": 20,
+            })
+        history[session_id] = buffer
+    return store, history
+
+
+def _cold_tier(sessions: int, messages: int, samples: int = 1000):
+    tracemalloc.start()
+    manager = _records(sessions, messages)
+    gc.collect()
+    hot = tracemalloc.get_traced_memory()[0]
+
+    manager.cold_after = 1
+    started = time.perf_counter()
+    manager.archive_idle(now=time.monotonic() + 10)
+    archive_time = time.perf_counter() - started
+    gc.collect()
+    cold = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    print(f"\nCold tier ({manager.cold.codec.name}): {len(manager.cold)} sessions archived in {archive_time:.2f}s")
+    print(f"  compression ratio {manager.cold.compression_ratio:.2f}, "
+          f"{manager.cold.compressed_bytes / sessions:.0f} B/session compressed")
+    print(f"  process memory {hot / 2 ** 20:.1f} MB hot -> {cold / 2 ** 20:.1f} MB with cold tier")
+
+    async def rehydrate():
+        timings = []
+        for user_id in range(0, sessions, max(1, sessions // samples)):
+            session_id = manager.sessions[user_id].id
+            started = time.perf_counter()
+            await manager.get_conversation_history(session_id)
+            timings.append(time.perf_counter() - started)
+        return timings
+
+    print_table("Rehydration via get_conversation_history", [("rehydrate", summarize(asyncio.run(rehydrate())))],
+                unit="us", scale=1e6)
+
+
+def main(sessions: int, messages: int):
+    logging.disable(logging.WARNING)
+    settings.state_session_ttl = 0
+    content_bytes = sys.getsizeof(_content(sessions, messages))
+
+    print(f"\nState memory at {sessions} sessions x {messages} messages "
+          f"(message text ~{content_bytes} B)")
+    print(f"{'layout':<12}{'per session':>14}{'per message':>14}{'msg overhead':>14}{'total MB':>12}{'build s':>10}")
+    for name, build in (("records", _records), ("legacy", _legacy)):
+        _, empty, _ = _measure(lambda: build(sessions, 0))
+        _, full, elapsed = _measure(lambda: build(sessions, messages))
+        per_session = empty / sessions
+        per_message = (full - empty) / (sessions * messages) if messages else 0.0
+        overhead = per_message - content_bytes if messages else 0.0
+        print(
+            f"{name:<12}{per_session:>12.0f} B{per_message:>12.0f} B{overhead:>12.0f} B"
+            f"{full / 2 ** 20:>12.1f}{elapsed:>10.2f}"
+        )
+    if messages:
+        _cold_tier(sessions, messages)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--messages", type=int, default=4)
+    args = parser.parse_args()
+    main(args.sessions, args.messages)
@@ -0,0 +1,36 @@
+"""
+Общие помощники для бенчмарков: перцентили и вывод таблиц.
+"""
+from typing import Iterable, Sequence
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Перцентиль q (0..100) методом ближайшего ранга."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def summarize(values: Sequence[float]) -> dict:
+    return {
+        "n": len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else 0.0,
+    }
+
+
+def print_table(title: str, rows: Iterable[tuple[str, dict]], unit: str = "ms", scale: float = 1000.0):
+    print(f"\n{title}")
+    print(f"{'case':<28}{'n':>8}{'p50':>12}{'p95':>12}{'p99':>12}{'max':>12}")
+    for name, stats in rows:
+        print(
+            f"{name:<28}{stats['n']:>8}"
+            f"{stats['p50'] * scale:>10.3f}{unit}"
+            f"{stats['p95'] * scale:>10.3f}{unit}"
+            f"{stats['p99'] * scale:>10.3f}{unit}"
+            f"{stats['max'] * scale:>10.3f}{unit}"
+        )
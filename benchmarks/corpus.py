@@ -0,0 +1,62 @@
+"""
+Детерминированные тестовые тексты: ответы модели на русском и английском
+с Markdown-разметкой и блоками кода.
+"""
+import random
+
+ENGLISH_WORDS = (
+    "the model returns a response with code examples and explains how the function "
+    "works in practice while keeping the answer short clear and helpful for the user "
+    "python async await request handler message session context token budget"
+).split()
+
+RUSSIAN_WORDS = (
+    "модель возвращает ответ с примерами кода и объясняет как работает функция "
+    "на практике сохраняя ответ коротким понятным и полезным для пользователя "
+    "асинхронный обработчик сообщение сессия контекст бюджет токенов запрос"
+).split()
+
+CODE_BLOCK = (
+    "```python\n"
+    "async def handle(update, context):\n"
+    "    text = update.message.text\n"
+    "    return await client.generate_response([], text)\n"
+    "```"
+)
+
+
+def make_text(size: int, language: str = "en", seed: int = 0, profanity_rate: float = 0.0,
+              profane_words=("shit", "сука")) -> str:
+    """Текст примерно size символов: абзацы, списки, **жирный** и блоки кода."""
+    rng = random.Random(seed)
+    if language == "en":
+        pool = ENGLISH_WORDS
+    elif language == "ru":
+        pool = RUSSIAN_WORDS
+    else:
+        pool = ENGLISH_WORDS + RUSSIAN_WORDS
+
+    parts = []
+    length = 0
+    while length < size:
+        kind = rng.random()
+        if kind < 0.1:
+            block = CODE_BLOCK
+        elif kind < 0.3:
+            block = "\n".join(
+                f"- {' '.join(rng.choice(pool) for _ in range(rng.randint(3, 8)))}"
+                for _ in range(rng.randint(2, 4))
+            )
+        else:
+            words = []
+            for _ in range(rng.randint(15, 40)):
+                if profanity_rate and rng.random() < profanity_rate:
+                    words.append(rng.choice(profane_words))
+                elif rng.random() < 0.05:
+                    words.append(f"**{rng.choice(pool)}**")
+                else:
+                    words.append(rng.choice(pool))
+            block = " ".join(words).capitalize() + "."
+        parts.append(block)
+        length += len(block) + 2
+    return "\n\n".join(parts)[:size]
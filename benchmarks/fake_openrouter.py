@@ -0,0 +1,236 @@
+"""
+Локальная заглушка OpenRouter Chat Completions API для бенчмарков.
+
+Минимальный HTTP/1.1 сервер на asyncio с поддержкой keep-alive: на любой
+POST отвечает фиксированным ответом модели (при "stream": true — потоком SSE
+по словам), на HEAD — пустым 200.
+
+Для нагрузочных прогонов задержка может быть распределением (см.
+parse_latency), доля error_rate запросов получает 500/502/503, а раз в
+burst_every секунд сервер на burst_duration секунд отвечает 429 с Retry-After.
+"""
+import asyncio
+import json
+import math
+import random
+import time
+from collections import Counter
+from typing import Callable, Optional, Union
+
+ERROR_STATUSES = (500, 502, 503)
+
+LatencySpec = Union[float, str, Callable[[], float]]
+
+
+def parse_latency(spec: LatencySpec, rng: Optional[random.Random] = None) -> Callable[[], float]:
+    """
+    Превращает описание задержки в функцию-генератор, секунды:
+    число или "fixed:0.5" — постоянная, "uniform:0.2,1.5" — равномерная,
+    "exp:0.8" — экспоненциальная со средним 0.8,
+    "lognormal:0.8,0.5" — логнормальная с медианой 0.8 и sigma 0.5.
+    """
+    if callable(spec):
+        return spec
+    rng = rng or random.Random()
+    if isinstance(spec, (int, float)):
+        value = float(spec)
+        return lambda: value
+    kind, _, args = spec.partition(":")
+    if not args:
+        kind, args = "fixed", kind
+    params = [float(arg) for arg in args.split(",")]
+    if kind == "fixed":
+        return lambda: params[0]
+    if kind == "uniform":
+        return lambda: rng.uniform(params[0], params[1])
+    if kind == "exp":
+        return lambda: rng.expovariate(1 / params[0]) if params[0] > 0 else 0.0
+    if kind == "lognormal":
+        mu = math.log(params[0])
+        return lambda: rng.lognormvariate(mu, params[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+class FakeOpenRouter:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: LatencySpec = 0.0,
+        reply: str = "Hello from the fake model",
+        token_delay: float = 0.0,
+        error_rate: float = 0.0,
+        burst_every: float = 0.0,
+        burst_duration: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.host = host
+        self.port = port
+        self.random = random.Random(seed)
+        self.latency = parse_latency(latency, self.random)
+        self.reply = reply
+        self.token_delay = token_delay
+        self.error_rate = error_rate
+        self.burst_every = burst_every
+        self.burst_duration = burst_duration
+        self.requests = 0
+        self.connections = 0
+        self.statuses: Counter = Counter()
+        self._started_at = time.monotonic()
+        self._server: Optional[asyncio.base_events.Server] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/api/v1/chat/completions"
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._started_at = time.monotonic()
+        return self.base_url
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    def _completion_body(self) -> bytes:
+        return json.dumps({
+            "id": "gen-fake",
+            "model": "fake/model",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": self.reply}}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+        }).encode()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method = request_line.split(b" ", 1)[0].decode()
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", "0"))
+                body = await reader.readexactly(length) if length else b""
+                self.requests += 1
+
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await self._respond(method, body, writer, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    def _burst_remaining(self) -> float:
+        """Сколько секунд ещё длится текущая серия 429 (0 — серии нет)."""
+        if self.burst_every <= 0 or self.burst_duration <= 0:
+            return 0.0
+        phase = (time.monotonic() - self._started_at) % self.burst_every
+        return max(0.0, self.burst_duration - phase)
+
+    def _error_status(self) -> Optional[int]:
+        if self._burst_remaining() > 0:
+            return 429
+        if self.error_rate and self.random.random() < self.error_rate:
+            return self.random.choice(ERROR_STATUSES)
+        return None
+
+    async def _respond(self, method: str, body: bytes, writer: asyncio.StreamWriter, keep_alive: bool):
+        status = self._error_status() if method == "POST" else None
+        if status == 429:
+            # Лимит отвечает сразу, без задержки модели
+            retry_after = max(1, math.ceil(self._burst_remaining()))
+            self.statuses[429] += 1
+            payload = json.dumps({"error": {"code": 429, "message": "Rate limit exceeded"}}).encode()
+            self._write_response(writer, 429, payload, "application/json", keep_alive,
+                                 extra_headers={"Retry-After": str(retry_after)})
+            await writer.drain()
+            return
+
+        delay = self.latency()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        if status is not None:
+            self.statuses[status] += 1
+            payload = json.dumps({"error": {"code": status, "message": "Upstream error"}}).encode()
+            self._write_response(writer, status, payload, "application/json", keep_alive)
+            await writer.drain()
+            return
+        self.statuses[200] += 1
+
+        if method == "POST" and body and json.loads(body).get("stream"):
+            await self._respond_stream(writer, keep_alive)
+            return
+
+        payload = self._completion_body()
+        if method == "HEAD":
+            self._write_response(writer, 200, b"", "application/json", keep_alive,
+                                 content_length=len(payload))
+        else:
+            self._write_response(writer, 200, payload, "application/json", keep_alive)
+        await writer.drain()
+
+    async def _respond_stream(self, writer: asyncio.StreamWriter, keep_alive: bool):
+        writer.write((
+            "HTTP/1.1 200 OK\r\n"
+            "Content-Type: text/event-stream\r\n"
+            "Transfer-Encoding: chunked\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        ).encode())
+
+        def event(data: str):
+            chunk = f"data: {data}\n\n".encode()
+            writer.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+
+        words = self.reply.split(" ")
+        for index, word in enumerate(words):
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            content = word if index == 0 else " " + word
+            event(json.dumps({"choices": [{"index": 0, "delta": {"content": content}}]}))
+            await writer.drain()
+        event("[DONE]")
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    @staticmethod
+    def _write_response(
+        writer: asyncio.StreamWriter,
+        status: int,
+        payload: bytes,
+        content_type: str,
+        keep_alive: bool,
+        extra_headers: Optional[dict] = None,
+        content_length: Optional[int] = None,
+    ):
+        reason = {200: "OK", 429: "Too Many Requests", 500: "Internal Server Error",
+                  502: "Bad Gateway", 503: "Service Unavailable"}.get(status, "OK")
+        lines = [
+            f"HTTP/1.1 {status} {reason}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(payload) if content_length is None else content_length}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        for name, value in (extra_headers or {}).items():
+            lines.append(f"{name}: {value}")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + payload)
@@ -0,0 +1,185 @@
+"""
+Локальная заглушка сервера Redis для тестов и нагрузочных прогонов.
+
+Понимает RESP2 и команды, которые использует RedisBackend: PING, AUTH,
+SELECT, GET, SET (с EX), DEL, EXPIRE, TTL, RPUSH, LTRIM, LRANGE и FLUSHDB.
+Все базы общие, сроки жизни ключей проверяются лениво при обращении.
+Все выполненные команды сохраняются в commands.
+"""
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def _encode(value: Any) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, Exception):
+        return b"-ERR %s\r\n" % str(value).encode()
+    if isinstance(value, bool):
+        return b"+OK\r\n"
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, str):
+        return b"+%s\r\n" % value.encode()
+    if isinstance(value, bytes):
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+    return b"*%d\r\n" % len(value) + b"".join(_encode(item) for item in value)
+
+
+def _list_range(items: List[bytes], start: int, stop: int) -> Tuple[int, int]:
+    """Индексы Redis (включительно, с отрицательными) -> срез Python."""
+    length = len(items)
+    if start < 0:
+        start = max(length + start, 0)
+    if stop < 0:
+        stop += length
+    return start, min(stop, length - 1) + 1
+
+
+class FakeRedis:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.data: Dict[bytes, Any] = {}
+        self.expires: Dict[bytes, float] = {}
+        self.commands: List[Tuple[str, ...]] = []
+        self.connections = 0
+        self._server: Optional[asyncio.base_events.Server] = None
+
+    @property
+    def url(self) -> str:
+        return f"redis://{self.host}:{self.port}/0"
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.url
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def _read_command(self, reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+        line = await reader.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            return line.strip().split()
+        args = []
+        for _ in range(int(line[1:])):
+            length = int((await reader.readline())[1:])
+            args.append((await reader.readexactly(length + 2))[:-2])
+        return args
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                args = await self._read_command(reader)
+                if args is None:
+                    break
+                if self.latency and not reader._buffer:
+                    # Задержка сети: один раз на пакет команд, а не на каждую команду
+                    await asyncio.sleep(self.latency)
+                writer.write(_encode(self.execute(args)))
+                if not reader._buffer:
+                    await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    def _alive(self, key: bytes) -> bool:
+        expires = self.expires.get(key)
+        if expires is not None and expires <= time.monotonic():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+    def execute(self, args: List[bytes]) -> Any:
+        name = args[0].decode().upper()
+        self.commands.append((name, *(arg.decode(errors="replace") for arg in args[1:])))
+        handler = getattr(self, f"_cmd_{name.lower()}", None)
+        if handler is None:
+            return ValueError(f"unknown command '{name}'")
+        try:
+            return handler(*args[1:])
+        except (TypeError, ValueError, IndexError) as e:
+            return ValueError(f"wrong arguments for '{name}': {e}")
+
+    def _cmd_ping(self, *args):
+        return args[0] if args else "PONG"
+
+    def _cmd_auth(self, *args):
+        return True
+
+    def _cmd_select(self, db):
+        return True
+
+    def _cmd_flushdb(self):
+        self.data.clear()
+        self.expires.clear()
+        return True
+
+    def _cmd_get(self, key):
+        return self.data[key] if self._alive(key) else None
+
+    def _cmd_set(self, key, value, *options):
+        self.data[key] = value
+        self.expires.pop(key, None)
+        if options and options[0].upper() == b"EX":
+            self.expires[key] = time.monotonic() + int(options[1])
+        return True
+
+    def _cmd_del(self, *keys):
+        removed = 0
+        for key in keys:
+            if self._alive(key):
+                del self.data[key]
+                self.expires.pop(key, None)
+                removed += 1
+        return removed
+
+    def _cmd_expire(self, key, seconds):
+        if not self._alive(key):
+            return 0
+        self.expires[key] = time.monotonic() + int(seconds)
+        return 1
+
+    def _cmd_ttl(self, key):
+        if not self._alive(key):
+            return -2
+        expires = self.expires.get(key)
+        return -1 if expires is None else max(0, round(expires - time.monotonic()))
+
+    def _cmd_rpush(self, key, *values):
+        self._alive(key)
+        items = self.data.setdefault(key, [])
+        items.extend(values)
+        return len(items)
+
+    def _cmd_ltrim(self, key, start, stop):
+        if self._alive(key):
+            begin, end = _list_range(self.data[key], int(start), int(stop))
+            self.data[key] = self.data[key][begin:end]
+            if not self.data[key]:
+                del self.data[key]
+                self.expires.pop(key, None)
+        return True
+
+    def _cmd_lrange(self, key, start, stop):
+        if not self._alive(key):
+            return []
+        begin, end = _list_range(self.data[key], int(start), int(stop))
+        return self.data[key][begin:end]
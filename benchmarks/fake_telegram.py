@@ -0,0 +1,215 @@
+"""
+Локальная заглушка Telegram Bot API для тестов и нагрузочных прогонов.
+
+Понимает методы, которые вызывает бот: getMe, getUpdates (long polling),
+setWebhook/deleteWebhook, setMyCommands, sendMessage, sendChatAction,
+editMessageText и deleteMessage. Все вызовы сохраняются в calls, а
+входящие сообщения пользователей добавляются через push_message().
+"""
+import asyncio
+import json
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl
+from src.utils.http_server import HttpRequest, HttpResponse, HttpServer
+
+# Как src.bot.streaming.PLACEHOLDER. Модуль бота здесь не импортируется: load_test
+# загружает этот файл в процессе бота до того, как подставит его окружение в настройки
+PLACEHOLDER = "…"
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "FakeBot", "username": "fake_bot"}
+
+
+def _decode_params(request: HttpRequest) -> Dict[str, Any]:
+    """PTB передаёт параметры формой, сложные значения — как JSON-строки."""
+    if request.headers.get("content-type", "").startswith("application/json"):
+        return json.loads(request.body or b"{}")
+    params = {}
+    for name, value in parse_qsl(request.body.decode(), keep_blank_values=True):
+        try:
+            params[name] = json.loads(value)
+        except ValueError:
+            params[name] = value
+    return params
+
+
+class FakeBotAPI:
+    def __init__(self, token: str = "123456:TEST", host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        self.token = token
+        self.latency = latency
+        self.server = HttpServer(self._handle, host=host, port=port)
+        self.calls: List[Tuple[str, Dict[str, Any]]] = []
+        # Время каждого исходящего сообщения по чатам — для подсчёта задержек ответа
+        self.sent: Dict[int, List[Tuple[float, str]]] = defaultdict(list)
+        # Только готовые ответы: без заглушки «…» и промежуточных правок потокового вывода
+        self.replies: Dict[int, List[Tuple[float, str]]] = defaultdict(list)
+        self.webhook: Dict[str, Any] = {}
+        self._updates: asyncio.Queue = asyncio.Queue()
+        self._update_id = 0
+        self._message_id = 0
+        self._call_event = asyncio.Event()
+        self._chat_events: Dict[int, asyncio.Event] = defaultdict(asyncio.Event)
+        self._closing = asyncio.Event()
+        self._polling = 0
+
+    @property
+    def base_url(self) -> str:
+        """Значение для Application.builder().base_url(...)."""
+        return f"http://{self.server.host}:{self.server.port}/bot"
+
+    async def start(self):
+        await self.server.start()
+
+    async def stop(self):
+        # Сначала отпускаем висящие long polling запросы, иначе их задачи отменит закрытие цикла
+        self._closing.set()
+        while self._polling:
+            await asyncio.sleep(0.01)
+        await self.server.stop()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    def calls_to(self, method: str) -> List[Dict[str, Any]]:
+        return [params for name, params in self.calls if name == method]
+
+    async def wait_for(self, method: str, count: int = 1, timeout: float = 5.0) -> List[Dict[str, Any]]:
+        deadline = time.monotonic() + timeout
+        while len(self.calls_to(method)) < count:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise asyncio.TimeoutError(f"{method} was called {len(self.calls_to(method))}/{count} times")
+            self._call_event.clear()
+            try:
+                await asyncio.wait_for(self._call_event.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+        return self.calls_to(method)
+
+    async def wait_sent(self, chat_id: int, count: int, timeout: float = 5.0) -> List[Tuple[float, str]]:
+        """Ждёт, пока в чат уйдёт count сообщений (sendMessage и editMessageText)."""
+        return await self._wait_chat(self.sent[chat_id], chat_id, count, timeout)
+
+    async def wait_replies(self, chat_id: int, count: int, timeout: float = 5.0) -> List[Tuple[float, str]]:
+        """Ждёт count готовых ответов в чате (см. _is_reply)."""
+        return await self._wait_chat(self.replies[chat_id], chat_id, count, timeout)
+
+    async def _wait_chat(self, sent: List[Tuple[float, str]], chat_id: int, count: int,
+                         timeout: float) -> List[Tuple[float, str]]:
+        deadline = time.monotonic() + timeout
+        while len(sent) < count:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise asyncio.TimeoutError(f"chat {chat_id} got {len(sent)}/{count} messages")
+            event = self._chat_events[chat_id]
+            event.clear()
+            try:
+                await asyncio.wait_for(event.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+        return sent
+
+    def make_message_update(self, user_id: int, text: str, chat_id: Optional[int] = None) -> Dict[str, Any]:
+        self._update_id += 1
+        self._message_id += 1
+        chat_id = user_id if chat_id is None else chat_id
+        message = {
+            "message_id": self._message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "group"},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"User{user_id}",
+                     "username": f"user{user_id}", "language_code": "ru"},
+            "text": text,
+        }
+        if text.startswith("/"):
+            command = text.split()[0]
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(command)}]
+        return {"update_id": self._update_id, "message": message}
+
+    def push_message(self, user_id: int, text: str, chat_id: Optional[int] = None) -> Dict[str, Any]:
+        """Ставит сообщение пользователя в очередь getUpdates."""
+        update = self.make_message_update(user_id, text, chat_id)
+        self._updates.put_nowait(update)
+        return update
+
+    def _message(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        self._message_id += 1
+        return {
+            "message_id": self._message_id,
+            "date": int(time.time()),
+            "chat": {"id": params.get("chat_id"), "type": "private"},
+            "from": BOT_USER,
+            "text": params.get("text", ""),
+        }
+
+    async def _get_updates(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        timeout = float(params.get("timeout") or 0)
+        limit = int(params.get("limit") or 100)
+        updates = []
+        if self._updates.empty() and timeout and not self._closing.is_set():
+            getter = asyncio.ensure_future(self._updates.get())
+            closing = asyncio.ensure_future(self._closing.wait())
+            self._polling += 1
+            try:
+                await asyncio.wait((getter, closing), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                self._polling -= 1
+                closing.cancel()
+                getter.cancel()
+            if not getter.done() or getter.cancelled():
+                return []
+            updates.append(getter.result())
+        while not self._updates.empty() and len(updates) < limit:
+            updates.append(self._updates.get_nowait())
+        return updates
+
+    @staticmethod
+    def _is_reply(method: str, params: Dict[str, Any]) -> bool:
+        """
+        Готовый ответ — любое новое сообщение, кроме заглушки потокового вывода,
+        или правка с разметкой: промежуточные правки StreamingReply идут без
+        parse_mode, а окончательный текст — с Markdown.
+        """
+        if method == "sendMessage":
+            return params.get("text") != PLACEHOLDER
+        return bool(params.get("parse_mode"))
+
+    async def _handle(self, request: HttpRequest) -> HttpResponse:
+        prefix = f"/bot{self.token}/"
+        if not request.path.startswith(prefix):
+            return HttpResponse(404, json.dumps({"ok": False, "error_code": 404,
+                                                 "description": "Not Found"}).encode(), "application/json")
+        method = request.path[len(prefix):]
+        params = _decode_params(request)
+        if method != "getUpdates":
+            self.calls.append((method, params))
+            self._call_event.set()
+            if self.latency:
+                await asyncio.sleep(self.latency)
+
+        if method == "getMe":
+            result: Any = BOT_USER
+        elif method == "getUpdates":
+            result = await self._get_updates(params)
+        elif method == "setWebhook":
+            self.webhook = params
+            result = True
+        elif method in ("sendMessage", "editMessageText"):
+            chat_id = params.get("chat_id")
+            entry = (time.monotonic(), params.get("text", ""))
+            self.sent[chat_id].append(entry)
+            if self._is_reply(method, params):
+                self.replies[chat_id].append(entry)
+            self._chat_events[chat_id].set()
+            result = self._message(params)
+        else:
+            # deleteWebhook, setMyCommands, sendChatAction, deleteMessage и т.п.
+            result = True
+
+        body = json.dumps({"ok": True, "result": result}).encode()
+        return HttpResponse(200, body, "application/json")
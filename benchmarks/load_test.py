@@ -0,0 +1,257 @@
+"""
+Нагрузочный прогон бота целиком: заглушки Telegram Bot API и OpenRouter плюс
+тысячи моделируемых пользователей.
+
+Бот запускается отдельным процессом из main.py (build_application, при
+--workers > 1 — супервизор с воркерами) и получает обновления long polling'ом
+от FakeBotAPI, а в модель ходит в FakeOpenRouter с заданным распределением
+задержек, долей ошибок и сериями 429. Каждый пользователь пишет сообщение,
+ждёт ответа, «думает» и пишет следующее. В конце выводятся пропускная
+способность, перцентили задержки ответа (от отправки сообщения до готового
+ответа бота: в потоковом режиме — до окончательной правки) и пиковый RSS
+процесса бота.
+
+Запуск:
+    python -m benchmarks.load_test --users 2000 --messages 3 --ramp 20 \\
+        --ai-latency lognormal:0.8,0.5 --error-rate 0.02 --burst-every 30 --burst-duration 2
+"""
+import argparse
+import asyncio
+import functools
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from benchmarks.common import print_table, summarize
+from benchmarks.fake_openrouter import FakeOpenRouter
+from benchmarks.fake_telegram import FakeBotAPI
+
+TOKEN = "123456:LOAD"
+
+
+@dataclass
+class LoadConfig:
+    users: int = 1000
+    messages: int = 3
+    # За сколько секунд подключаются все пользователи
+    ramp: float = 10.0
+    # Средняя пауза пользователя между ответом бота и следующим сообщением
+    think: float = 1.0
+    reply_timeout: float = 120.0
+    ai_latency: str = "lognormal:0.8,0.5"
+    error_rate: float = 0.0
+    burst_every: float = 0.0
+    burst_duration: float = 0.0
+    workers: int = 1
+    telegram_rate: float = 30.0
+    log_level: str = "ERROR"
+    seed: Optional[int] = None
+    # Дополнительные переменные окружения процесса бота (STATE_BACKEND и т.п.)
+    env: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class LoadResult:
+    latencies: List[float]
+    timeouts: int
+    elapsed: float
+    peak_rss_kb: int
+    ai_statuses: Counter
+    telegram_calls: Counter
+
+    @property
+    def replies(self) -> int:
+        return len(self.latencies)
+
+    @property
+    def throughput(self) -> float:
+        return self.replies / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def _peak_rss_kb() -> int:
+    """Пиковый RSS процесса вместе с дочерними (воркерами супервизора), КиБ."""
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # На macOS ru_maxrss в байтах, на Linux — в килобайтах
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def _bot_process(base_url: str, env: Dict[str, str], report):
+    """Точка входа процесса бота: то же, что main.main(), но с base_url заглушки."""
+    os.environ.update(env)
+    import main as bot
+    from config.settings import settings
+    from src.bot.supervisor import Supervisor
+
+    if settings.bot_workers > 1:
+        supervisor = Supervisor(functools.partial(bot.build_application, settings.bot_workers, base_url))
+        application = bot.build_supervisor_application(supervisor, base_url)
+    else:
+        application = bot.build_application(base_url=base_url)
+    try:
+        bot.run(application)
+    finally:
+        report.send(_peak_rss_kb())
+        report.close()
+
+
+def _bot_env(config: LoadConfig, openrouter_url: str, log_dir: str) -> Dict[str, str]:
+    env = {
+        "TELEGRAM_BOT_TOKEN": TOKEN,
+        "OPENROUTER_API_KEY": "load-test",
+        "OPENROUTER_BASE_URL": openrouter_url,
+        "TELEGRAM_MODE": "polling",
+        "TELEGRAM_GLOBAL_RATE": str(config.telegram_rate),
+        "BOT_WORKERS": str(config.workers),
+        "LOG_LEVEL": config.log_level,
+        # Логи и трассы прогона не попадают в logs/ рабочего дерева
+        "LOG_FILE": os.path.join(log_dir, "bot.log"),
+        "TRACE_PATH": os.path.join(log_dir, "traces.jsonl"),
+        "METRICS_ENABLED": "false",
+    }
+    env.update(config.env)
+    return env
+
+
+async def _user(api: FakeBotAPI, config: LoadConfig, user_id: int, rng: random.Random,
+                latencies: List[float], timeouts: List[int]):
+    await asyncio.sleep(config.ramp * (user_id - 1) / max(1, config.users))
+    for index in range(config.messages):
+        expected = len(api.replies[user_id]) + 1
+        started = time.monotonic()
+        api.push_message(user_id, f"Сообщение {index} от пользователя {user_id}: what is asyncio?")
+        try:
+            # В потоковом режиме ждём окончательного текста, а не заглушки и промежуточных правок
+            sent = await api.wait_replies(user_id, expected, config.reply_timeout)
+        except asyncio.TimeoutError:
+            timeouts[0] += 1
+            return
+        latencies.append(sent[expected - 1][0] - started)
+        if config.think > 0 and index < config.messages - 1:
+            await asyncio.sleep(rng.expovariate(1 / config.think))
+
+
+async def run_load(config: LoadConfig) -> LoadResult:
+    """Поднимает заглушки и процесс бота, прогоняет пользователей и собирает итоги."""
+    rng = random.Random(config.seed)
+    async with FakeBotAPI(TOKEN) as api, FakeOpenRouter(
+        latency=config.ai_latency,
+        error_rate=config.error_rate,
+        burst_every=config.burst_every,
+        burst_duration=config.burst_duration,
+        seed=config.seed,
+    ) as openrouter:
+        log_dir = tempfile.mkdtemp(prefix="load-test-")
+        context = multiprocessing.get_context("spawn")
+        receiver, sender = context.Pipe(duplex=False)
+        process = context.Process(
+            target=_bot_process,
+            args=(api.base_url, _bot_env(config, openrouter.base_url, log_dir), sender),
+            name="load-test-bot",
+        )
+        process.start()
+        sender.close()
+        peak_rss = 0
+        try:
+            # Updater удаляет вебхук перед первым getUpdates — значит, бот готов
+            await api.wait_for("deleteWebhook", timeout=60)
+
+            latencies: List[float] = []
+            timeouts = [0]
+            started = time.monotonic()
+            await asyncio.gather(*(
+                _user(api, config, user_id, random.Random(rng.random()), latencies, timeouts)
+                for user_id in range(1, config.users + 1)
+            ))
+            elapsed = time.monotonic() - started
+        finally:
+            process.terminate()
+            await asyncio.to_thread(process.join, 30)
+            if receiver.poll():
+                peak_rss = receiver.recv()
+            receiver.close()
+            if process.is_alive():
+                process.kill()
+            shutil.rmtree(log_dir, ignore_errors=True)
+
+        return LoadResult(
+            latencies=latencies,
+            timeouts=timeouts[0],
+            elapsed=elapsed,
+            peak_rss_kb=peak_rss,
+            ai_statuses=Counter(openrouter.statuses),
+            telegram_calls=Counter(name for name, _ in api.calls),
+        )
+
+
+def print_report(config: LoadConfig, result: LoadResult):
+    print_table(
+        f"Reply latency ({config.users} users x {config.messages} messages, "
+        f"workers {config.workers}, AI latency {config.ai_latency})",
+        [("reply", summarize(result.latencies))],
+        unit="s", scale=1.0,
+    )
+    print(f"\nReplies: {result.replies}, timeouts: {result.timeouts}, elapsed {result.elapsed:.1f}s")
+    print(f"Throughput: {result.throughput:.1f} replies/s")
+    print(f"Peak RSS of the bot process: {result.peak_rss_kb / 1024:.1f} MiB")
+    print("OpenRouter responses: " + ", ".join(
+        f"{status}={count}" for status, count in sorted(result.ai_statuses.items())))
+    print("Telegram calls: " + ", ".join(
+        f"{method}={count}" for method, count in result.telegram_calls.most_common()))
+
+
+def _parse_env(values: List[str]) -> Dict[str, str]:
+    env = {}
+    for value in values:
+        name, sep, setting = value.partition("=")
+        if not sep:
+            raise argparse.ArgumentTypeError(f"expected NAME=VALUE, got {value}")
+        env[name] = setting
+    return env
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=3, help="сообщений от каждого пользователя")
+    parser.add_argument("--ramp", type=float, default=10.0, help="время подключения всех пользователей, с")
+    parser.add_argument("--think", type=float, default=1.0, help="средняя пауза между сообщениями, с")
+    parser.add_argument("--reply-timeout", type=float, default=120.0)
+    parser.add_argument("--ai-latency", default="lognormal:0.8,0.5",
+                        help="задержка модели: 0.5, uniform:a,b, exp:mean, lognormal:median,sigma")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 500/502/503")
+    parser.add_argument("--burst-every", type=float, default=0.0, help="период серий 429, с")
+    parser.add_argument("--burst-duration", type=float, default=0.0, help="длительность серии 429, с")
+    parser.add_argument("--workers", type=int, default=1, help="BOT_WORKERS процесса бота")
+    parser.add_argument("--telegram-rate", type=float, default=30.0, help="TELEGRAM_GLOBAL_RATE, сообщений/с")
+    parser.add_argument("--log-level", default="ERROR")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE",
+                        help="переменная окружения процесса бота, можно несколько")
+    args = parser.parse_args()
+
+    load_config = LoadConfig(
+        users=args.users,
+        messages=args.messages,
+        ramp=args.ramp,
+        think=args.think,
+        reply_timeout=args.reply_timeout,
+        ai_latency=args.ai_latency,
+        error_rate=args.error_rate,
+        burst_every=args.burst_every,
+        burst_duration=args.burst_duration,
+        workers=args.workers,
+        telegram_rate=args.telegram_rate,
+        log_level=args.log_level,
+        seed=args.seed,
+        env=_parse_env(args.env),
+    )
+    print_report(load_config, asyncio.run(run_load(load_config)))
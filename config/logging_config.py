@@ -1,27 +1,176 @@
+"""
+Настройка логирования.
+
+Корневой логгер пишет только в очередь (QueueHandler), а форматирование и
+запись в файл и stdout выполняет фоновый поток QueueListener, поэтому вызов
+logger.info в обработчике сообщений не блокирует цикл событий на диске.
+
+Файл лога ротируется по размеру (LOG_ROTATION=size) или по времени
+(LOG_ROTATION=time); LOG_FORMAT=json включает вывод по JSON-объекту на строку.
+LOG_SAMPLE_RATES прореживает многословные логгеры: "src.state.manager=0.1"
+оставляет каждую десятую запись уровня INFO и ниже, предупреждения и ошибки
+проходят всегда.
+"""
+import atexit
+import json
 import logging
+import logging.handlers
+import multiprocessing
+import queue
 import sys
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Dict, List, Optional
 from config.settings import settings
 
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 
-def setup_logging():
-    log_dir = Path("logs")
-    log_dir.mkdir(exist_ok=True)
-
-    log_format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    date_format = "%Y-%m-%d %H:%M:%S"
-
-    logging.basicConfig(
-        level=getattr(logging, settings.log_level.upper()),
-        format=log_format,
-        datefmt=date_format,
-        handlers=[
-            logging.FileHandler(log_dir / "bot.log", encoding="utf-8"),
-            logging.StreamHandler(sys.stdout)
-        ]
+# Аргументы этих типов безопасно форматировать позже в потоке записи
+_IMMUTABLE_ARGS = (str, int, float, bool, type(None))
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись — один JSON-объект в строке."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "process": record.process,
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Пропускает долю rate записей уровня ниже WARNING от логгера и его потомков.
+    Прореживание детерминированное: при rate 0.1 проходит каждая десятая запись.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        # Длинные префиксы проверяются первыми, чтобы точное правило побеждало общее
+        self.rates = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+        self._credit: Dict[str, float] = {}
+
+    def _rate_for(self, name: str) -> Optional[tuple]:
+        for prefix, rate in self.rates:
+            if name == prefix or name.startswith(prefix + "."):
+                return prefix, rate
+        return None
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rule = self._rate_for(record.name)
+        if rule is None:
+            return True
+        prefix, rate = rule
+        credit = self._credit.get(prefix, 0.0) + rate
+        if credit >= 1.0:
+            self._credit[prefix] = credit - 1.0
+            return True
+        self._credit[prefix] = credit
+        return False
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler, который не форматирует сообщение в вызывающем потоке.
+
+    Стандартный prepare() собирает строку до постановки в очередь; здесь это
+    откладывается до потока записи, если аргументы неизменяемые. Изменяемые
+    аргументы (списки, объекты) подставляются сразу, чтобы в лог попало их
+    состояние на момент вызова.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args
+        if args and not (isinstance(args, tuple) and all(isinstance(arg, _IMMUTABLE_ARGS) for arg in args)):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """'src.state.manager=0.1, src.ai.client=0.5' -> {'src.state.manager': 0.1, ...}"""
+    rates = {}
+    for item in value.split(","):
+        name, sep, rate = item.strip().partition("=")
+        if not sep:
+            continue
+        rates[name.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+
+def _file_handler(path: Path) -> logging.Handler:
+    if multiprocessing.parent_process() is not None:
+        # Воркеры супервизора пишут в тот же файл; ротирует его только главный
+        # процесс, а воркеры переоткрывают файл, когда он переименован
+        return logging.handlers.WatchedFileHandler(path, encoding="utf-8")
+    if settings.log_rotation == "time":
+        return logging.handlers.TimedRotatingFileHandler(
+            path, when=settings.log_rotate_when, backupCount=settings.log_backup_count, encoding="utf-8"
+        )
+    return logging.handlers.RotatingFileHandler(
+        path, maxBytes=settings.log_max_bytes, backupCount=settings.log_backup_count, encoding="utf-8"
     )
 
+
+def _output_handlers() -> List[logging.Handler]:
+    formatter = JsonFormatter() if settings.log_format == "json" else logging.Formatter(LOG_FORMAT, DATE_FORMAT)
+    handlers: List[logging.Handler] = [logging.StreamHandler(sys.stdout)]
+    if settings.log_file:
+        path = Path(settings.log_file)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        handlers.insert(0, _file_handler(path))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+def stop_logging():
+    """Дописывает очередь и останавливает поток записи."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+
+
+def setup_logging():
+    global _listener
+    stop_logging()
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    rates = parse_sample_rates(settings.log_sample_rates)
+    if rates:
+        queue_handler.addFilter(SamplingFilter(rates))
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(queue_handler)
+    root.setLevel(getattr(logging, settings.log_level.upper()))
+
+    _listener = logging.handlers.QueueListener(log_queue, *_output_handlers(), respect_handler_level=True)
+    _listener.start()
+
     logging.getLogger("httpx").setLevel(logging.WARNING)
     logging.getLogger("telegram").setLevel(logging.WARNING)
 
     return logging.getLogger(__name__)
+
+
+atexit.register(stop_logging)
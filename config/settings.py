@@ -12,10 +12,116 @@ class Settings(BaseSettings):
     ai_model: str = os.getenv("AI_MODEL", "deepseek/deepseek-chat")
     ai_max_tokens: int = int(os.getenv("AI_MAX_TOKENS", "4000"))
     ai_temperature: float = float(os.getenv("AI_TEMPERATURE", "0.7"))
+    # Резервные модели через запятую, в порядке приоритета
+    ai_fallback_models: str = os.getenv("AI_FALLBACK_MODELS", "")
+    ai_hedging: bool = os.getenv("AI_HEDGING", "false").lower() == "true"
+    ai_hedge_min_delay: float = float(os.getenv("AI_HEDGE_MIN_DELAY", "1.0"))
+    ai_hedge_default_delay: float = float(os.getenv("AI_HEDGE_DEFAULT_DELAY", "10.0"))
+
+    openrouter_base_url: str = os.getenv(
+        "OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1/chat/completions"
+    )
+    ai_request_timeout: float = float(os.getenv("AI_REQUEST_TIMEOUT", "30"))
+    ai_http2: bool = os.getenv("AI_HTTP2", "false").lower() == "true"
+    ai_pool_max_connections: int = int(os.getenv("AI_POOL_MAX_CONNECTIONS", "100"))
+    ai_pool_max_keepalive: int = int(os.getenv("AI_POOL_MAX_KEEPALIVE", "20"))
+    ai_pool_keepalive_expiry: float = float(os.getenv("AI_POOL_KEEPALIVE_EXPIRY", "60"))
+    ai_warmup_connections: int = int(os.getenv("AI_WARMUP_CONNECTIONS", "2"))
+
+    # 0 — без ограничения; пауза по Retry-After/X-RateLimit-* действует всегда
+    ai_requests_per_minute: int = int(os.getenv("AI_REQUESTS_PER_MINUTE", "0"))
+    ai_tokens_per_minute: int = int(os.getenv("AI_TOKENS_PER_MINUTE", "0"))
+    ai_max_retries: int = int(os.getenv("AI_MAX_RETRIES", "4"))
+    ai_retry_budget: float = float(os.getenv("AI_RETRY_BUDGET", "30"))
+    ai_retry_base_delay: float = float(os.getenv("AI_RETRY_BASE_DELAY", "0.5"))
+    ai_retry_max_delay: float = float(os.getenv("AI_RETRY_MAX_DELAY", "8"))
+
+    ai_cache_max_entries: int = int(os.getenv("AI_CACHE_MAX_ENTRIES", "1000"))
+    ai_cache_ttl: float = float(os.getenv("AI_CACHE_TTL", "3600"))
+    ai_cache_path: str = os.getenv("AI_CACHE_PATH", "")
+    # По умолчанию кэшируются только ответы при temperature 0: иначе один случайный
+    # ответ отдавался бы на все последующие одинаковые запросы
+    ai_cache_deterministic_only: bool = os.getenv("AI_CACHE_DETERMINISTIC_ONLY", "true").lower() == "true"
+
+    ai_stream_responses: bool = os.getenv("AI_STREAM_RESPONSES", "false").lower() == "true"
+    stream_edit_interval: float = float(os.getenv("STREAM_EDIT_INTERVAL", "1.0"))
+    # Как часто повторять «печатает» в чате, пока идёт генерация (Telegram показывает его ~5 с)
+    typing_interval: float = float(os.getenv("TYPING_INTERVAL", "4.0"))
+
+    # Получение обновлений: polling или webhook
+    telegram_mode: str = os.getenv("TELEGRAM_MODE", "polling")
+    webhook_url: str = os.getenv("WEBHOOK_URL", "")
+    webhook_path: str = os.getenv("WEBHOOK_PATH", "/telegram")
+    webhook_listen: str = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+    webhook_port: int = int(os.getenv("WEBHOOK_PORT", "8080"))
+    webhook_secret_token: str = os.getenv("WEBHOOK_SECRET_TOKEN", "")
+    webhook_max_connections: int = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+
+    # Число процессов-воркеров; при 1 бот работает в одном процессе, как раньше
+    bot_workers: int = int(os.getenv("BOT_WORKERS", "1"))
+    worker_restart_delay: float = float(os.getenv("WORKER_RESTART_DELAY", "1.0"))
+    worker_report_interval: float = float(os.getenv("WORKER_REPORT_INTERVAL", "60"))
+
+    # Ограничения исходящих запросов к Telegram (сообщений в секунду / в минуту для групп)
+    telegram_global_rate: float = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))
+    telegram_chat_rate: float = float(os.getenv("TELEGRAM_CHAT_RATE", "1"))
+    telegram_chat_burst: float = float(os.getenv("TELEGRAM_CHAT_BURST", "3"))
+    telegram_group_per_minute: float = float(os.getenv("TELEGRAM_GROUP_PER_MINUTE", "20"))
+    telegram_max_retries: int = int(os.getenv("TELEGRAM_MAX_RETRIES", "3"))
+    telegram_max_retry_after: float = float(os.getenv("TELEGRAM_MAX_RETRY_AFTER", "60"))
+
+    # Порядок обработки сообщений одного чата: queue — по очереди, cancel — новое отменяет текущее
+    message_dispatch_policy: str = os.getenv("MESSAGE_DISPATCH_POLICY", "queue")
+
+    # Эндпоинт метрик Prometheus; воркеры супервизора слушают METRICS_PORT + 1 + номер шарда
+    metrics_enabled: bool = os.getenv("METRICS_ENABLED", "false").lower() == "true"
+    metrics_listen: str = os.getenv("METRICS_LISTEN", "0.0.0.0")
+    metrics_port: int = int(os.getenv("METRICS_PORT", "9100"))
+    metrics_path: str = os.getenv("METRICS_PATH", "/metrics")
+
+    # Трассировка обновлений: доля записываемых трасс и порог, с которого пишутся все медленные
+    trace_sample_rate: float = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+    trace_slow_threshold: float = float(os.getenv("TRACE_SLOW_THRESHOLD", "0"))
+    trace_path: str = os.getenv("TRACE_PATH", "logs/traces.jsonl")
+    trace_max_bytes: int = int(os.getenv("TRACE_MAX_BYTES", str(10 * 1024 * 1024)))
+    trace_backup_count: int = int(os.getenv("TRACE_BACKUP_COUNT", "5"))
 
     log_level: str = os.getenv("LOG_LEVEL", "INFO")
+    # Логи пишет фоновый поток; пустой LOG_FILE — только stdout. Формат text или json
+    log_file: str = os.getenv("LOG_FILE", "logs/bot.log")
+    log_format: str = os.getenv("LOG_FORMAT", "text")
+    # Ротация по размеру (size) или по времени (time, период LOG_ROTATE_WHEN)
+    log_rotation: str = os.getenv("LOG_ROTATION", "size")
+    log_max_bytes: int = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+    log_rotate_when: str = os.getenv("LOG_ROTATE_WHEN", "midnight")
+    log_backup_count: int = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+    # Доля записей INFO и ниже по логгерам: "src.state.manager=0.1,src.ai.client=0.5"
+    log_sample_rates: str = os.getenv("LOG_SAMPLE_RATES", "")
 
     max_context_messages: int = 10
+    ai_context_token_budget: int = int(os.getenv("AI_CONTEXT_TOKEN_BUDGET", "8000"))
+
+    state_backend: str = os.getenv("STATE_BACKEND", "memory")
+    state_sqlite_path: str = os.getenv("STATE_SQLITE_PATH", "data/bot.db")
+    state_flush_interval: float = float(os.getenv("STATE_FLUSH_INTERVAL", "0.2"))
+    state_flush_batch_size: int = int(os.getenv("STATE_FLUSH_BATCH_SIZE", "100"))
+    state_redis_url: str = os.getenv("STATE_REDIS_URL", "redis://127.0.0.1:6379/0")
+    state_redis_prefix: str = os.getenv("STATE_REDIS_PREFIX", "tgbot:")
+    # Срок жизни сессии и истории в Redis с последней записи, секунды
+    state_redis_ttl: float = float(os.getenv("STATE_REDIS_TTL", "604800"))
+    # Локальный кэш чтений: сколько секунд допустимо не видеть записи других реплик
+    state_redis_cache_ttl: float = float(os.getenv("STATE_REDIS_CACHE_TTL", "2"))
+    state_redis_cache_size: int = int(os.getenv("STATE_REDIS_CACHE_SIZE", "10000"))
+    # Ёмкость кольцевого буфера истории каждой сессии в памяти
+    state_hot_tail: int = int(os.getenv("STATE_HOT_TAIL", "50"))
+    state_session_ttl: float = float(os.getenv("STATE_SESSION_TTL", "86400"))
+    state_max_sessions: int = int(os.getenv("STATE_MAX_SESSIONS", "100000"))
+    state_max_memory_mb: float = float(os.getenv("STATE_MAX_MEMORY_MB", "512"))
+    state_sweep_interval: float = float(os.getenv("STATE_SWEEP_INTERVAL", "60"))
+    # Холодный уровень: через сколько секунд простоя сжимать историю (0 — не сжимать), zlib или zstd
+    state_cold_after: float = float(os.getenv("STATE_COLD_AFTER", "600"))
+    state_cold_codec: str = os.getenv("STATE_COLD_CODEC", "zlib")
+    state_cold_level: int = int(os.getenv("STATE_COLD_LEVEL", "6"))
     default_language: str = os.getenv("DEFAULT_LANGUAGE", "ru")
 
     class Config:
@@ -1,25 +1,36 @@
 import asyncio
+import functools
 import logging
+from typing import Optional
 from telegram import Update
 from telegram.ext import (
     Application,
     CommandHandler,
     MessageHandler,
+    TypeHandler,
     filters,
 )
 from config.settings import settings
 from config.logging_config import setup_logging
 from src.ai.client import AIClient
 from src.state.manager import StateManager
+from src.state.backends import create_backend
 from src.filters.content_filter import ContentFilter
 from src.bot.commands import BotCommands
+from src.bot.dispatcher import UserDispatcher
+from src.bot.send_scheduler import SendScheduler
+from src.bot.supervisor import Supervisor
+from src.bot.typing_scheduler import TypingScheduler
+from src.bot.webhook import ALLOWED_UPDATES, run_webhook
 from src.bot.handlers import MessageHandler as BotMessageHandler
-from src.bot.handlers import error_handler
+from src.bot.handlers import count_update, error_handler
+from src.utils.metrics_server import MetricsServer
+from src.utils.tracing import tracer
 
 logger = setup_logging()
 
 
-async def post_init(application: Application):
+async def set_commands(application: Application):
     await application.bot.set_my_commands([
         ("start", "Начать работу с ботом"),
         ("help", "Показать справку"),
@@ -29,26 +40,85 @@ async def post_init(application: Application):
     logger.info("Bot commands set successfully")
 
 
-def main():
-    logger.info("Starting Telegram AI Bot...")
+async def start_metrics(application: Application):
+    """Поднимает /metrics; воркеры супервизора слушают METRICS_PORT + 1 + номер шарда."""
+    if not settings.metrics_enabled:
+        return
+    shard = application.bot_data.get("shard")
+    port = settings.metrics_port if shard is None else settings.metrics_port + 1 + shard
+    server = MetricsServer(host=settings.metrics_listen, port=port, path=settings.metrics_path)
+    await server.start()
+    application.bot_data["metrics_server"] = server
 
-    if not settings.telegram_bot_token:
-        logger.error("TELEGRAM_BOT_TOKEN is not set")
-        raise ValueError("TELEGRAM_BOT_TOKEN is required")
 
-    if not settings.openrouter_api_key:
-        logger.error("OPENROUTER_API_KEY is not set")
-        raise ValueError("OPENROUTER_API_KEY is required")
+async def stop_metrics(application: Application):
+    server = application.bot_data.pop("metrics_server", None)
+    if server is not None:
+        await server.stop()
+
+
+async def start_services(application: Application):
+    await application.bot_data["state_manager"].start()
+    await application.bot_data["ai_client"].start()
+    await start_metrics(application)
 
+
+async def post_init(application: Application):
+    await set_commands(application)
+    await start_services(application)
+
+
+async def post_stop(application: Application):
+    """Дожидается начатых ответов, пока бот и планировщик отправки ещё работают."""
+    await application.bot_data["dispatcher"].shutdown()
+    application.bot_data["typing"].close()
+
+
+async def post_shutdown(application: Application):
+    await stop_metrics(application)
+    await application.bot_data["ai_client"].close()
+    await application.bot_data["state_manager"].close()
+    tracer.close()
+
+
+def build_application(worker_count: Optional[int] = None, base_url: Optional[str] = None) -> Application:
+    """
+    Собирает приложение бота со всеми обработчиками.
+
+    worker_count задаётся для процессов-воркеров супервизора: у них нет
+    Updater, команды бота регистрирует супервизор, а глобальный лимит
+    исходящих сообщений делится между воркерами.
+    """
     ai_client = AIClient()
-    state_manager = StateManager()
+    state_manager = StateManager(backend=create_backend(settings.state_backend))
     content_filter = ContentFilter()
 
-    bot_commands = BotCommands(state_manager)
-    message_handler = BotMessageHandler(ai_client, state_manager, content_filter)
+    dispatcher = UserDispatcher()
+    typing_scheduler = TypingScheduler()
 
-    application = Application.builder().token(settings.telegram_bot_token).post_init(post_init).build()
+    bot_commands = BotCommands(state_manager, dispatcher)
+    message_handler = BotMessageHandler(ai_client, state_manager, content_filter, dispatcher, typing_scheduler)
 
+    global_rate = settings.telegram_global_rate / (worker_count or 1)
+    builder = (
+        Application.builder()
+        .token(settings.telegram_bot_token)
+        .rate_limiter(SendScheduler(global_rate=global_rate))
+        .post_init(start_services if worker_count else post_init)
+        .post_stop(post_stop)
+        .post_shutdown(post_shutdown)
+    )
+    if base_url:
+        builder = builder.base_url(base_url)
+    if worker_count:
+        builder = builder.updater(None)
+    application = builder.build()
+    application.bot_data["ai_client"] = ai_client
+    application.bot_data["state_manager"] = state_manager
+    application.bot_data["dispatcher"] = dispatcher
+    application.bot_data["typing"] = typing_scheduler
+
+    application.add_handler(TypeHandler(Update, count_update), group=-1)
     application.add_handler(CommandHandler("start", bot_commands.start_command))
     application.add_handler(CommandHandler("help", bot_commands.help_command))
     application.add_handler(CommandHandler("about", bot_commands.about_command))
@@ -59,12 +129,68 @@ def main():
     )
 
     application.add_error_handler(error_handler)
+    return application
+
+
+def build_supervisor_application(supervisor: Supervisor, base_url: Optional[str] = None) -> Application:
+    """Приложение супервизора: только получает обновления и раздаёт их воркерам."""
+
+    async def supervisor_post_init(application: Application):
+        await set_commands(application)
+        supervisor.start()
+        await supervisor.start_monitor()
+        await start_metrics(application)
+
+    async def supervisor_post_shutdown(application: Application):
+        await stop_metrics(application)
+        await supervisor.stop()
+
+    builder = (
+        Application.builder()
+        .token(settings.telegram_bot_token)
+        .post_init(supervisor_post_init)
+        .post_shutdown(supervisor_post_shutdown)
+    )
+    if base_url:
+        builder = builder.base_url(base_url)
+    application = builder.build()
+    supervisor.attach(application)
+    return application
+
+
+def run(application: Application):
+    if settings.telegram_mode == "webhook":
+        if not settings.webhook_url:
+            logger.error("WEBHOOK_URL is not set")
+            raise ValueError("WEBHOOK_URL is required in webhook mode")
+        asyncio.run(run_webhook(application))
+    else:
+        application.run_polling(allowed_updates=ALLOWED_UPDATES)
+
+
+def main():
+    logger.info("Starting Telegram AI Bot...")
+
+    if not settings.telegram_bot_token:
+        logger.error("TELEGRAM_BOT_TOKEN is not set")
+        raise ValueError("TELEGRAM_BOT_TOKEN is required")
+
+    if not settings.openrouter_api_key:
+        logger.error("OPENROUTER_API_KEY is not set")
+        raise ValueError("OPENROUTER_API_KEY is required")
+
+    if settings.bot_workers > 1:
+        supervisor = Supervisor(functools.partial(build_application, settings.bot_workers))
+        application = build_supervisor_application(supervisor)
+        logger.info("Running in supervisor mode with %d workers", settings.bot_workers)
+    else:
+        application = build_application()
+        logger.info("Bot handlers registered successfully")
 
-    logger.info("Bot handlers registered successfully")
-    logger.info(f"Using AI model: {settings.ai_model}")
+    logger.info("Using AI model: %s", settings.ai_model)
     logger.info("Bot is running... Press Ctrl+C to stop")
 
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
+    run(application)
 
 
 if __name__ == "__main__":
@@ -73,5 +199,5 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         logger.info("Bot stopped by user")
     except Exception as e:
-        logger.critical(f"Critical error: {e}", exc_info=True)
+        logger.critical("Critical error: %s", e, exc_info=True)
         raise
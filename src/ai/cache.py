@@ -0,0 +1,143 @@
+"""
+Кэш ответов модели с вытеснением LRU и сроком жизни записей.
+"""
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from config.settings import settings
+from src.utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+cache_hits = registry.counter("ai_cache_hits_total", "AI responses served from cache")
+cache_misses = registry.counter("ai_cache_misses_total", "AI requests not found in cache")
+cache_latency_saved = registry.counter(
+    "ai_cache_latency_saved_seconds_total", "Upstream latency avoided by cache hits"
+)
+
+# value, expires_at (unix time), upstream latency in seconds
+CacheEntry = Tuple[str, float, float]
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split()).casefold()
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl: Optional[float] = None,
+        path: Optional[str] = None,
+        deterministic_only: Optional[bool] = None,
+    ):
+        self.max_entries = settings.ai_cache_max_entries if max_entries is None else max_entries
+        self.ttl = settings.ai_cache_ttl if ttl is None else ttl
+        self.path = settings.ai_cache_path if path is None else path
+        self.deterministic_only = (
+            settings.ai_cache_deterministic_only if deterministic_only is None else deterministic_only
+        )
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def cacheable(self, temperature: float) -> bool:
+        if self.max_entries <= 0:
+            return False
+        return not self.deterministic_only or temperature == 0
+
+    @staticmethod
+    def make_key(model: str, temperature: float, messages: List[Dict[str, str]]) -> str:
+        normalized = [[msg["role"], _normalize(msg["content"])] for msg in messages]
+        payload = json.dumps([model, temperature, normalized], ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            cache_misses.inc()
+            return None
+
+        value, expires_at, latency = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            cache_misses.inc()
+            return None
+
+        self._entries.move_to_end(key)
+        cache_hits.inc()
+        cache_latency_saved.inc(latency)
+        return value
+
+    def put(self, key: str, value: str, latency: float = 0.0):
+        self._entries[key] = (value, time.time() + self.ttl, latency)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def load(self):
+        """Загружает непросроченные записи с диска (если задан путь)."""
+        if not self.path or not Path(self.path).exists():
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Failed to load response cache from %s: %s", self.path, e)
+            return
+
+        if not isinstance(entries, list):
+            logger.warning("Ignoring malformed response cache %s", self.path)
+            return
+
+        now = time.time()
+        skipped = 0
+        for entry in entries:
+            # Битая запись (ручная правка, файл другой версии) не должна мешать запуску
+            if not self._is_valid_entry(entry):
+                skipped += 1
+                continue
+            key, value, expires_at, latency = entry
+            if expires_at > now:
+                self._entries[key] = (value, expires_at, latency)
+        if skipped:
+            logger.warning("Skipped %d malformed response cache entry(ies) in %s", skipped, self.path)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        logger.info("Loaded %d cached response(s) from %s", len(self._entries), self.path)
+
+    @staticmethod
+    def _is_valid_entry(entry) -> bool:
+        if not isinstance(entry, list) or len(entry) != 4:
+            return False
+        key, value, expires_at, latency = entry
+        return (
+            isinstance(key, str)
+            and isinstance(value, str)
+            and isinstance(expires_at, (int, float))
+            and isinstance(latency, (int, float))
+        )
+
+    def save(self):
+        if not self.path:
+            return
+        now = time.time()
+        entries = [
+            [key, value, expires_at, latency]
+            for key, (value, expires_at, latency) in self._entries.items()
+            if expires_at > now
+        ]
+        try:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f, ensure_ascii=False)
+            Path(tmp_path).replace(self.path)
+            logger.info("Saved %d cached response(s) to %s", len(entries), self.path)
+        except OSError as e:
+            logger.warning("Failed to save response cache to %s: %s", self.path, e)
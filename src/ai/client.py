@@ -1,21 +1,349 @@
+import asyncio
+import json
 import logging
+import time
 import httpx
-from typing import List, Dict
+from typing import AsyncIterator, List, Dict, Optional, Tuple
+from urllib.parse import urlsplit
 from config.settings import settings
+from src.ai.cache import ResponseCache
+from src.ai.model_router import ModelRouter, hedged_requests
 from src.ai.prompts import format_conversation_history
-from src.utils.exceptions import AIClientError
+from src.ai.rate_limiter import UpstreamRateLimiter, backoff_delay
+from src.ai.tokens import context_token_budget, estimate_message_tokens
+from src.utils.exceptions import AIClientError, RateLimitError
+from src.utils.metrics import registry
+from src.utils.tracing import span, traced
 
 logger = logging.getLogger(__name__)
 
+time_to_first_token = registry.histogram(
+    "ai_time_to_first_token_seconds",
+    "Time from sending a streaming request to receiving the first content token",
+)
+retries_counter = registry.counter(
+    "ai_retries_total", "Upstream requests retried after a retryable status", labelnames=("status",)
+)
+errors_counter = registry.counter(
+    "ai_errors_total", "Upstream AI errors by HTTP status or error kind", labelnames=("status",)
+)
+tokens_counter = registry.counter(
+    "ai_tokens_total", "Tokens reported in the OpenRouter usage field", labelnames=("direction",)
+)
+
+# Статусы, при которых запрос повторяется с паузой
+RETRY_STATUSES = {429, 503}
+
+
+def _should_failover(e: BaseException) -> bool:
+    """Ошибки, при которых имеет смысл переключиться на следующую модель."""
+    if isinstance(e, httpx.HTTPStatusError):
+        return e.response.status_code >= 500
+    return isinstance(e, (httpx.TimeoutException, httpx.TransportError))
+
+
+def _error_status(e: BaseException) -> str:
+    """Метка ошибки для ai_errors_total: HTTP-статус или вид сбоя."""
+    if isinstance(e, httpx.HTTPStatusError):
+        return str(e.response.status_code)
+    if isinstance(e, httpx.TimeoutException):
+        return "timeout"
+    if isinstance(e, httpx.TransportError):
+        return "transport"
+    return "other"
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
 
 class AIClient:
     def __init__(self):
         self.api_key = settings.openrouter_api_key
         self.model = settings.ai_model
+        # Основная модель и резервные в порядке приоритета
+        self.models = [self.model] + [
+            m.strip() for m in settings.ai_fallback_models.split(",")
+            if m.strip() and m.strip() != self.model
+        ]
+        self.router = ModelRouter(self.models)
+        self.hedging = settings.ai_hedging and len(self.models) > 1
         self.max_tokens = settings.ai_max_tokens
         self.temperature = settings.ai_temperature
-        self.base_url = "https://openrouter.ai/api/v1/chat/completions"
+        self.base_url = settings.openrouter_base_url
+        # Промпт должен поместиться в окно любой модели цепочки
+        self.context_budget = min(context_token_budget(m, self.max_tokens) for m in self.models)
+        self.cache = ResponseCache()
+        self.rate_limiter = UpstreamRateLimiter()
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _build_client(self) -> httpx.AsyncClient:
+        http2 = settings.ai_http2
+        if http2 and not _http2_available():
+            logger.warning("AI_HTTP2 is enabled but 'h2' is not installed, falling back to HTTP/1.1")
+            http2 = False
+
+        limits = httpx.Limits(
+            max_connections=settings.ai_pool_max_connections,
+            max_keepalive_connections=settings.ai_pool_max_keepalive,
+            keepalive_expiry=settings.ai_pool_keepalive_expiry,
+        )
+        return httpx.AsyncClient(
+            timeout=settings.ai_request_timeout,
+            limits=limits,
+            http2=http2,
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json",
+            },
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Общий HTTP-клиент процесса; создаётся лениво, если start() не вызывался."""
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+        return self._client
+
+    async def start(self):
+        """Создаёт пул соединений и прогревает его до первого сообщения пользователя."""
+        await asyncio.to_thread(self.cache.load)
+        client = self.client
+        count = settings.ai_warmup_connections
+        if count <= 0:
+            return
+
+        parts = urlsplit(self.base_url)
+        warmup_url = f"{parts.scheme}://{parts.netloc}/"
+
+        results = await asyncio.gather(
+            *(client.head(warmup_url) for _ in range(count)),
+            return_exceptions=True,
+        )
+        failed = [r for r in results if isinstance(r, Exception)]
+        if failed:
+            logger.warning("AI client warm-up: %d/%d connections failed: %s", len(failed), count, failed[0])
+        else:
+            logger.info("AI client warmed up %d connection(s) to %s", count, parts.netloc)
+
+    async def close(self):
+        await asyncio.to_thread(self.cache.save)
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+            logger.info("AI client connection pool closed")
+        self._client = None
+
+    def _payload(
+        self,
+        formatted_messages: List[Dict[str, str]],
+        stream: bool = False,
+        model: Optional[str] = None
+    ) -> Dict:
+        payload = {
+            "model": model or self.model,
+            "messages": formatted_messages,
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+        }
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    @staticmethod
+    def _wrap_error(e: Exception) -> AIClientError:
+        errors_counter.inc(status=_error_status(e))
+        if isinstance(e, AIClientError):
+            return e
+        if isinstance(e, httpx.TimeoutException):
+            logger.error("Timeout error: %s", e)
+            return AIClientError("Request timeout. Please try again.")
+        if isinstance(e, httpx.HTTPStatusError):
+            logger.error("HTTP error: %s - %s", e.response.status_code, e.response.text)
+            if e.response.status_code == 429:
+                return RateLimitError("Rate limit exceeded. Please wait.")
+            return AIClientError(f"AI service error: {e.response.status_code}")
+        logger.error("Unexpected error in AI client: %s", e)
+        return AIClientError(f"Failed to generate response: {str(e)}")
+
+    async def _send(self, payload: Dict, prompt_tokens: int, stream: bool = False) -> httpx.Response:
+        """
+        Отправляет запрос через ограничитель частоты и повторяет его при 429/503.
+
+        Пауза берётся из Retry-After / X-RateLimit-Reset или из экспоненциальной
+        задержки с джиттером. Суммарное ожидание ограничено AI_RETRY_BUDGET:
+        если следующая попытка не укладывается в него, возвращается последний ответ.
+        """
+        deadline = time.monotonic() + settings.ai_retry_budget
+        # С резервными моделями 5xx не повторяем, а сразу переключаемся на следующую
+        retry_statuses = RETRY_STATUSES if len(self.models) == 1 else {429}
+        attempt = 0
+        while True:
+            await self.rate_limiter.acquire(prompt_tokens, deadline)
+
+            if stream:
+                request = self.client.build_request("POST", self.base_url, json=payload)
+                response = await self.client.send(request, stream=True)
+            else:
+                response = await self.client.post(self.base_url, json=payload)
+
+            retry_after = self.rate_limiter.update_from_headers(response.headers)
+            status = response.status_code
+            if status not in retry_statuses or attempt >= settings.ai_max_retries:
+                return response
+
+            delay = retry_after if retry_after is not None else backoff_delay(attempt)
+            if time.monotonic() + delay > deadline:
+                return response
+
+            if status == 429:
+                self.rate_limiter.block_for(delay)
+            if stream:
+                await response.aclose()
+
+            attempt += 1
+            retries_counter.inc(status=status)
+            logger.warning("AI request got %s, retry %d in %.2fs", status, attempt, delay)
+            await asyncio.sleep(delay)
+
+    def _record_usage(self, data: Dict, prompt_tokens: int):
+        usage = data.get("usage") or {}
+        prompt = usage.get("prompt_tokens")
+        completion = usage.get("completion_tokens")
+        if isinstance(prompt, int):
+            tokens_counter.inc(prompt, direction="in")
+        if isinstance(completion, int):
+            tokens_counter.inc(completion, direction="out")
+        total = usage.get("total_tokens")
+        if isinstance(total, int):
+            self.rate_limiter.record_usage(total - prompt_tokens)
+
+    async def _request_model(
+        self,
+        model: str,
+        formatted_messages: List[Dict[str, str]],
+        prompt_tokens: int
+    ) -> str:
+        logger.debug("Sending request to AI model: %s", model)
+        started = time.perf_counter()
+
+        with span("ai.request", model=model) as request_span:
+            response = await self._send(self._payload(formatted_messages, model=model), prompt_tokens)
+            request_span.set(status=response.status_code)
+
+        response.raise_for_status()
+        data = response.json()
+        self._record_usage(data, prompt_tokens)
+
+        if "choices" not in data or len(data["choices"]) == 0:
+            raise AIClientError("No response from AI model")
+
+        ai_response = data["choices"][0]["message"]["content"]
+        self.router.record_success(model, time.perf_counter() - started)
+        logger.debug("Successfully received AI response from %s", model)
+        return ai_response
 
+    async def _complete(self, formatted_messages: List[Dict[str, str]], prompt_tokens: int) -> Tuple[str, str]:
+        """
+        Запрашивает ответ по цепочке моделей; возвращает ответившую модель и текст.
+
+        При 5xx, таймауте или сетевой ошибке запрос уходит следующей модели.
+        В режиме хеджирования, если модель не ответила за свой наблюдаемый p95,
+        параллельно запускается следующая; берётся первый успешный ответ,
+        остальные запросы отменяются.
+        """
+        pending: Dict[asyncio.Task, str] = {}
+        next_index = 0
+        last_error: Optional[BaseException] = None
+
+        def launch():
+            nonlocal next_index
+            model = self.models[next_index]
+            next_index += 1
+            task = asyncio.create_task(self._request_model(model, formatted_messages, prompt_tokens))
+            pending[task] = model
+
+        launch()
+        try:
+            while pending:
+                timeout = None
+                if self.hedging and next_index < len(self.models):
+                    timeout = self.router.hedge_delay(self.models[next_index - 1])
+
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged_requests.inc()
+                    logger.info("Hedging request to %s after %.2fs", self.models[next_index], timeout)
+                    launch()
+                    continue
+
+                for task in done:
+                    model = pending.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        self.router.record_win(model)
+                        return model, task.result()
+                    if not _should_failover(error):
+                        raise error
+                    self.router.record_failure(model)
+                    last_error = error
+                    logger.warning("Model %s failed (%r), failing over", model, error)
+                    if next_index < len(self.models):
+                        launch()
+                    if pending:
+                        # Последнюю ошибку посчитает _wrap_error, когда она будет выброшена
+                        errors_counter.inc(status=_error_status(error))
+
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _open_stream(self, formatted_messages: List[Dict[str, str]], prompt_tokens: int):
+        """
+        Открывает потоковый ответ, переключаясь на следующую модель при 5xx или
+        сетевой ошибке. После начала потока резервирование уже не применяется.
+        """
+        for index, model in enumerate(self.models):
+            last = index == len(self.models) - 1
+            logger.debug("Sending streaming request to AI model: %s", model)
+            try:
+                response = await self._send(
+                    self._payload(formatted_messages, stream=True, model=model), prompt_tokens, stream=True
+                )
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                if last:
+                    raise
+                self.router.record_failure(model)
+                errors_counter.inc(status=_error_status(e))
+                logger.warning("Model %s failed (%r), failing over", model, e)
+                continue
+
+            if response.status_code >= 500 and not last:
+                await response.aclose()
+                self.router.record_failure(model)
+                errors_counter.inc(status=str(response.status_code))
+                logger.warning("Model %s returned %d, failing over", model, response.status_code)
+                continue
+            return model, response
+
+    def model_stats(self) -> Dict[str, dict]:
+        return self.router.snapshot()
+
+    def _cache_key(self, formatted_messages: List[Dict[str, str]]) -> Optional[str]:
+        if not self.cache.cacheable(self.temperature):
+            return None
+        return self.cache.make_key(self.model, self.temperature, formatted_messages)
+
+    def _cache_put(self, cache_key: Optional[str], model: str, response: str, latency: float):
+        # Ключ построен для основной модели: ответ резервной или хеджированной модели в её слот не кладём
+        if cache_key is not None and response and model == self.model:
+            self.cache.put(cache_key, response, latency=latency)
+
+    @traced("ai.generate")
     async def generate_response(
         self,
         messages: List[Dict[str, str]],
@@ -24,44 +352,97 @@ class AIClient:
         try:
             messages.append({"role": "user", "content": user_message})
 
-            formatted_messages = format_conversation_history(messages)
-
-            logger.info(f"Sending request to AI model: {self.model}")
-
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    self.base_url,
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json",
-                    },
-                    json={
-                        "model": self.model,
-                        "messages": formatted_messages,
-                        "max_tokens": self.max_tokens,
-                        "temperature": self.temperature,
-                    }
-                )
+            formatted_messages = format_conversation_history(messages, self.context_budget)
 
-                response.raise_for_status()
-                data = response.json()
+            cache_key = self._cache_key(formatted_messages)
+            if cache_key is not None:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    logger.debug("Serving AI response from cache")
+                    return cached
 
-                if "choices" not in data or len(data["choices"]) == 0:
-                    raise AIClientError("No response from AI model")
+            started = time.perf_counter()
+            prompt_tokens = sum(estimate_message_tokens(m) for m in formatted_messages)
 
-                ai_response = data["choices"][0]["message"]["content"]
-                logger.info("Successfully received AI response")
+            model, ai_response = await self._complete(formatted_messages, prompt_tokens)
+            self._cache_put(cache_key, model, ai_response, time.perf_counter() - started)
 
-                return ai_response
+            return ai_response
+
+        except Exception as e:
+            raise self._wrap_error(e)
+
+    async def stream_response(
+        self,
+        messages: List[Dict[str, str]],
+        user_message: str
+    ) -> AsyncIterator[str]:
+        """
+        Запрашивает ответ в потоковом режиме (SSE) и отдаёт текст по мере генерации.
+        """
+        try:
+            messages.append({"role": "user", "content": user_message})
+
+            formatted_messages = format_conversation_history(messages, self.context_budget)
+
+            cache_key = self._cache_key(formatted_messages)
+            if cache_key is not None:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    logger.debug("Serving AI response from cache")
+                    yield cached
+                    return
+
+            started = time.perf_counter()
+            first_token = True
+            chunks = []
+            prompt_tokens = sum(estimate_message_tokens(m) for m in formatted_messages)
+
+            with span("ai.stream") as stream_span:
+                model, response = await self._open_stream(formatted_messages, prompt_tokens)
+                try:
+                    if response.is_error:
+                        await response.aread()
+                    response.raise_for_status()
+
+                    async for line in response.aiter_lines():
+                        # Строки-комментарии SSE (": OPENROUTER PROCESSING") и пустые разделители пропускаем
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[5:].strip()
+                        if data == "[DONE]":
+                            # Дочитываем поток до конца, чтобы соединение вернулось в пул
+                            continue
+
+                        chunk = json.loads(data)
+                        if "error" in chunk:
+                            raise AIClientError(f"AI stream error: {chunk['error']}")
+                        if chunk.get("usage"):
+                            self._record_usage(chunk, prompt_tokens)
+
+                        choices = chunk.get("choices") or []
+                        if not choices:
+                            continue
+                        delta = (choices[0].get("delta") or {}).get("content")
+                        if not delta:
+                            continue
+
+                        if first_token:
+                            first_token = False
+                            elapsed = time.perf_counter() - started
+                            time_to_first_token.observe(elapsed)
+                            stream_span.set(model=model, first_token_ms=round(elapsed * 1000, 1))
+                            logger.debug("First token from %s after %.3fs", model, elapsed)
+                        chunks.append(delta)
+                        yield delta
+                finally:
+                    await response.aclose()
+
+            self.router.record_success(model, time.perf_counter() - started)
+            self.router.record_win(model)
+            logger.debug("Successfully received streamed AI response from %s", model)
+
+            self._cache_put(cache_key, model, "".join(chunks), time.perf_counter() - started)
 
-        except httpx.TimeoutException as e:
-            logger.error(f"Timeout error: {e}")
-            raise AIClientError("Request timeout. Please try again.")
-        except httpx.HTTPStatusError as e:
-            logger.error(f"HTTP error: {e.response.status_code} - {e.response.text}")
-            if e.response.status_code == 429:
-                raise AIClientError("Rate limit exceeded. Please wait.")
-            raise AIClientError(f"AI service error: {e.response.status_code}")
         except Exception as e:
-            logger.error(f"Unexpected error in AI client: {e}")
-            raise AIClientError(f"Failed to generate response: {str(e)}")
+            raise self._wrap_error(e)
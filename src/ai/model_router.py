@@ -0,0 +1,78 @@
+"""
+Статистика задержек по моделям для цепочки резервных моделей и хеджирования.
+"""
+from collections import deque
+from typing import Deque, Dict, List, Optional
+from config.settings import settings
+from src.utils.metrics import registry
+
+model_latency = registry.histogram(
+    "ai_model_latency_seconds", "Successful completion latency per model", labelnames=("model",)
+)
+model_wins = registry.counter(
+    "ai_model_wins_total", "Requests answered by each model", labelnames=("model",)
+)
+model_failures = registry.counter(
+    "ai_model_failures_total", "Failed requests per model that triggered failover", labelnames=("model",)
+)
+hedged_requests = registry.counter(
+    "ai_hedged_requests_total", "Hedge requests fired to the next model in the chain"
+)
+
+# Минимум наблюдений, после которого p95 считается надёжным
+MIN_SAMPLES = 20
+
+
+class ModelStats:
+    __slots__ = ("latencies", "wins", "failures")
+
+    def __init__(self, window: int):
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.wins = 0
+        self.failures = 0
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ModelRouter:
+    def __init__(self, models: List[str], window: int = 200):
+        self.models = models
+        self.stats: Dict[str, ModelStats] = {model: ModelStats(window) for model in models}
+
+    def record_success(self, model: str, latency: float):
+        self.stats[model].latencies.append(latency)
+        model_latency.observe(latency, model=model)
+
+    def record_win(self, model: str):
+        self.stats[model].wins += 1
+        model_wins.inc(model=model)
+
+    def record_failure(self, model: str):
+        self.stats[model].failures += 1
+        model_failures.inc(model=model)
+
+    def hedge_delay(self, model: str) -> float:
+        """
+        Через сколько секунд без ответа стоит отправить запрос следующей модели:
+        наблюдаемый p95 модели, но не меньше AI_HEDGE_MIN_DELAY.
+        """
+        stats = self.stats[model]
+        if len(stats.latencies) < MIN_SAMPLES:
+            return max(settings.ai_hedge_min_delay, settings.ai_hedge_default_delay)
+        return max(settings.ai_hedge_min_delay, stats.quantile(0.95))
+
+    def snapshot(self) -> Dict[str, dict]:
+        return {
+            model: {
+                "wins": stats.wins,
+                "failures": stats.failures,
+                "samples": len(stats.latencies),
+                "p50": stats.quantile(0.5),
+                "p95": stats.quantile(0.95),
+            }
+            for model, stats in self.stats.items()
+        }
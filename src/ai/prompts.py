@@ -1,3 +1,9 @@
+import logging
+from typing import Optional
+from src.ai.tokens import estimate_message_tokens
+
+logger = logging.getLogger(__name__)
+
 SYSTEM_PROMPT = """Ты полезный AI ассистент в Telegram боте. Твоя задача - помогать пользователям с их вопросами, быть дружелюбным и информативным.
 
 Правила общения:
@@ -9,13 +15,45 @@ SYSTEM_PROMPT = """Ты полезный AI ассистент в Telegram бо
 - Не используй нецензурную лексику"""
 
 
-def format_conversation_history(messages: list) -> list:
-    formatted_messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+def format_conversation_history(messages: list, token_budget: Optional[int] = None) -> list:
+    """
+    Формирует список сообщений для модели: системный промпт и история.
+
+    Если задан token_budget, системный промпт и самые новые сообщения
+    сохраняются в первую очередь, а более старые отбрасываются, как только
+    бюджет исчерпан. Последнее сообщение (вопрос пользователя) включается всегда.
+    Это единственное место, где история обрезается под бюджет.
+    """
+    system_message = {"role": "system", "content": SYSTEM_PROMPT}
+
+    if token_budget is None:
+        formatted_messages = [system_message]
+        for msg in messages:
+            formatted_messages.append({
+                "role": msg["role"],
+                "content": msg["content"]
+            })
+        return formatted_messages
+
+    used = estimate_message_tokens(system_message)
+    kept = []
+    dropped_tokens = 0
+    for index in range(len(messages) - 1, -1, -1):
+        msg = messages[index]
+        tokens = estimate_message_tokens(msg)
+        if kept and used + tokens > token_budget:
+            dropped_tokens = sum(estimate_message_tokens(m) for m in messages[:index + 1])
+            break
+        used += tokens
+        kept.append({"role": msg["role"], "content": msg["content"]})
 
-    for msg in messages:
-        formatted_messages.append({
-            "role": msg["role"],
-            "content": msg["content"]
-        })
+    dropped = len(messages) - len(kept)
+    # Усечение истории заметно в ответах модели, поэтому оно видно и на уровне INFO
+    logger.log(
+        logging.INFO if dropped else logging.DEBUG,
+        "Context: %d/%d tokens used, %d message(s) dropped (%d tokens)",
+        used, token_budget, dropped, dropped_tokens
+    )
 
-    return formatted_messages
+    kept.reverse()
+    return [system_message] + kept
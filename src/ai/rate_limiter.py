@@ -0,0 +1,158 @@
+"""
+Ограничение частоты запросов к OpenRouter: корзины токенов на запросы и
+токены в минуту, а также глобальная пауза по заголовкам Retry-After и
+X-RateLimit-*.
+"""
+import asyncio
+import logging
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Mapping, Optional
+from config.settings import settings
+from src.utils.exceptions import RateLimitError
+from src.utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+throttle_wait = registry.histogram(
+    "ai_rate_limit_wait_seconds", "Time requests waited in the upstream rate limiter"
+)
+
+
+class TokenBucket:
+    """
+    Корзина токенов с резервированием: баланс может уйти в минус,
+    тогда вызывающий ждёт, пока корзина не пополнится.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float, now: Optional[float] = None) -> float:
+        """Списывает amount и возвращает, сколько секунд нужно подождать."""
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        self.tokens -= amount
+        return max(0.0, -self.tokens / self.rate)
+
+    def available(self, now: Optional[float] = None) -> float:
+        self._refill(time.monotonic() if now is None else now)
+        return self.tokens
+
+    def refund(self, amount: float):
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+def backoff_delay(attempt: int, base: Optional[float] = None, cap: Optional[float] = None) -> float:
+    """Экспоненциальная задержка с джиттером: половина фиксирована, половина случайна."""
+    base = settings.ai_retry_base_delay if base is None else base
+    cap = settings.ai_retry_max_delay if cap is None else cap
+    delay = min(cap, base * (2 ** attempt))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_reset(value: Optional[str]) -> Optional[float]:
+    """X-RateLimit-Reset: unix-время в мс/с или число секунд до сброса."""
+    if not value:
+        return None
+    try:
+        reset = float(value)
+    except ValueError:
+        return None
+    if reset > 1e12:
+        reset /= 1000
+    if reset > 1e9:
+        return max(0.0, reset - time.time())
+    return max(0.0, reset)
+
+
+class UpstreamRateLimiter:
+    def __init__(
+        self,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+    ):
+        rpm = settings.ai_requests_per_minute if requests_per_minute is None else requests_per_minute
+        tpm = settings.ai_tokens_per_minute if tokens_per_minute is None else tokens_per_minute
+        self.requests = TokenBucket(rpm / 60, rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm / 60, tpm) if tpm > 0 else None
+        self._blocked_until = 0.0
+
+    async def acquire(self, tokens: int, deadline: float):
+        """
+        Ждёт разрешения на запрос с tokens токенами.
+        Если ожидание закончится позже deadline (time.monotonic), бросает RateLimitError.
+        """
+        now = time.monotonic()
+        wait = max(0.0, self._blocked_until - now)
+        if self.requests is not None:
+            wait = max(wait, self.requests.reserve(1, now))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.reserve(tokens, now))
+
+        if now + wait > deadline:
+            if self.requests is not None:
+                self.requests.refund(1)
+            if self.tokens is not None:
+                self.tokens.refund(tokens)
+            raise RateLimitError("Rate limit exceeded. Please wait.")
+
+        if wait > 0:
+            throttle_wait.observe(wait)
+            logger.debug("Rate limiter delaying request by %.2fs", wait)
+            await asyncio.sleep(wait)
+
+    def record_usage(self, extra_tokens: int):
+        """Досписывает разницу между фактическим расходом токенов и оценкой."""
+        if self.tokens is not None and extra_tokens:
+            self.tokens.tokens -= extra_tokens
+
+    def block_for(self, seconds: float):
+        """Приостанавливает все запросы процесса на seconds секунд."""
+        until = time.monotonic() + seconds
+        if until > self._blocked_until:
+            self._blocked_until = until
+            logger.warning("Upstream rate limited, pausing requests for %.1fs", seconds)
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> Optional[float]:
+        """
+        Учитывает заголовки ответа. Возвращает рекомендуемую паузу (Retry-After),
+        если сервер её указал.
+        """
+        retry_after = parse_retry_after(headers.get("retry-after"))
+
+        remaining = headers.get("x-ratelimit-remaining")
+        if remaining is not None:
+            try:
+                exhausted = float(remaining) <= 0
+            except ValueError:
+                exhausted = False
+            if exhausted:
+                reset = parse_reset(headers.get("x-ratelimit-reset"))
+                if reset is not None:
+                    self.block_for(reset)
+                    if retry_after is None:
+                        retry_after = reset
+
+        return retry_after
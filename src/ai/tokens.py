@@ -0,0 +1,43 @@
+"""
+Локальная оценка числа токенов и бюджет контекста для моделей.
+"""
+import math
+from config.settings import settings
+
+# BPE-токенизаторы в среднем дают ~4 байта UTF-8 на токен: ~4 латинских
+# символа или ~2 кириллических. Для бюджета этого достаточно.
+BYTES_PER_TOKEN = 4
+# Служебные токены разметки на каждое сообщение (роль, разделители)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Размер окна контекста известных моделей (в токенах)
+MODEL_CONTEXT_WINDOWS = {
+    "deepseek/deepseek-chat": 64000,
+    "deepseek/deepseek-r1": 64000,
+    "openai/gpt-4o-mini": 128000,
+    "anthropic/claude-3.5-haiku": 200000,
+    "meta-llama/llama-3.1-8b-instruct": 128000,
+}
+DEFAULT_CONTEXT_WINDOW = 32000
+
+
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    return math.ceil(len(text.encode("utf-8")) / BYTES_PER_TOKEN)
+
+
+def estimate_message_tokens(message: dict) -> int:
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+def context_token_budget(model: str, max_completion_tokens: int) -> int:
+    """
+    Бюджет токенов на промпт: окно модели минус резерв под ответ,
+    но не больше AI_CONTEXT_TOKEN_BUDGET (ограничение стоимости и задержки).
+    """
+    window = MODEL_CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW)
+    budget = max(0, window - max_completion_tokens)
+    if settings.ai_context_token_budget > 0:
+        budget = min(budget, settings.ai_context_token_budget)
+    return budget
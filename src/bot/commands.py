@@ -2,6 +2,7 @@ import logging
 from telegram import Update
 from telegram.ext import ContextTypes
 from src.state.manager import StateManager
+from src.bot.dispatcher import UserDispatcher
 from src.utils.logger import log_user_interaction
 from src.localization.messages import t
 
@@ -9,8 +10,9 @@ logger = logging.getLogger(__name__)
 
 
 class BotCommands:
-    def __init__(self, state_manager: StateManager):
+    def __init__(self, state_manager: StateManager, dispatcher: UserDispatcher | None = None):
         self.state_manager = state_manager
+        self.dispatcher = dispatcher
 
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         user = update.effective_user
@@ -30,7 +32,7 @@ class BotCommands:
                             first_name=user.first_name or "")
 
         await update.message.reply_text(welcome_message)
-        logger.info(f"User {user.id} started the bot")
+        logger.info("User %s started the bot", user.id)
 
     async def help_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         user = update.effective_user
@@ -60,16 +62,18 @@ class BotCommands:
         log_user_interaction(user.id, user.username or "", "/reset")
 
         try:
+            if self.dispatcher is not None:
+                self.dispatcher.cancel(update.effective_chat.id)
+
             await self.state_manager.reset_conversation(user.id)
 
             lang = await self.state_manager.get_user_language(user.id) or user_lang
             reset_message = t(lang, "reset_success")
 
             await update.message.reply_text(reset_message, parse_mode="Markdown")
-            logger.info(f"User {user.id} reset conversation")
+            logger.info("User %s reset conversation", user.id)
 
         except Exception as e:
-            logger.error(
-                f"Error resetting conversation for user {user.id}: {e}")
+            logger.error("Error resetting conversation for user %s: %s", user.id, e)
             lang = await self.state_manager.get_user_language(user.id) or user_lang
             await update.message.reply_text(t(lang, "reset_error"))
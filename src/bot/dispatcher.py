@@ -0,0 +1,89 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional
+from config.settings import settings
+from src.utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+POLICY_QUEUE = "queue"
+POLICY_CANCEL = "cancel"
+
+inflight_gauge = registry.gauge("dispatcher_inflight_tasks", "Message tasks queued or running")
+superseded_counter = registry.counter(
+    "dispatcher_superseded_total", "Message tasks cancelled by a newer message or /reset"
+)
+
+
+class UserDispatcher:
+    """
+    Последовательная обработка сообщений в пределах одного чата.
+
+    Задачи одного чата выстраиваются в цепочку: каждая ждёт завершения
+    предыдущей. При политике "cancel" новое сообщение отменяет ещё не
+    завершённые задачи чата. Завершённые задачи удаляются сразу же.
+    """
+
+    def __init__(self, policy: Optional[str] = None):
+        self.policy = (policy or settings.message_dispatch_policy).lower()
+        if self.policy not in (POLICY_QUEUE, POLICY_CANCEL):
+            raise ValueError(f"Unknown dispatch policy: {self.policy}")
+        self._tasks: Dict[int, List[asyncio.Task]] = {}
+        inflight_gauge.set_function(lambda: self.inflight)
+
+    @property
+    def inflight(self) -> int:
+        return sum(len(tasks) for tasks in self._tasks.values())
+
+    def pending(self, key: int) -> int:
+        return len(self._tasks.get(key, ()))
+
+    def submit(self, key: int, job: Callable[[], Awaitable]) -> asyncio.Task:
+        if self.policy == POLICY_CANCEL:
+            self.cancel(key)
+
+        tasks = self._tasks.setdefault(key, [])
+        previous = tasks[-1] if tasks else None
+        task = asyncio.create_task(self._run(previous, job))
+        tasks.append(task)
+        task.add_done_callback(lambda t: self._reap(key, t))
+        return task
+
+    def cancel(self, key: int) -> int:
+        """Отменяет все незавершённые задачи чата; возвращает их количество."""
+        cancelled = 0
+        for task in self._tasks.get(key, ()):
+            if not task.done():
+                task.cancel()
+                cancelled += 1
+        if cancelled:
+            superseded_counter.inc(cancelled)
+            logger.info("Cancelled %d pending task(s) for chat %s", cancelled, key)
+        return cancelled
+
+    async def shutdown(self):
+        tasks = [task for chat_tasks in self._tasks.values() for task in chat_tasks]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    @staticmethod
+    async def _run(previous: Optional[asyncio.Task], job: Callable[[], Awaitable]):
+        if previous is not None:
+            # asyncio.wait не пробрасывает ошибки предыдущей задачи и не отменяет её вместе с нами
+            await asyncio.wait({previous})
+        await job()
+
+    def _reap(self, key: int, task: asyncio.Task):
+        tasks = self._tasks.get(key)
+        if tasks is None:
+            return
+        try:
+            tasks.remove(task)
+        except ValueError:
+            pass
+        if not tasks:
+            del self._tasks[key]
+
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Message task for chat %s failed: %s", key, task.exception())
@@ -1,16 +1,25 @@
 import logging
+import time
 from telegram import Update
 from telegram.ext import ContextTypes
 from telegram.constants import ParseMode
+from telegram.error import BadRequest
 from telegram.helpers import escape_markdown
 from src.ai.client import AIClient
 from src.ai.response_formatter import format_ai_response, get_error_message
 from src.state.manager import StateManager
 from src.filters.content_filter import ContentFilter
+from src.bot.dispatcher import UserDispatcher
 from src.bot.middleware import MessageMiddleware
+from src.bot.streaming import StreamingReply
+from src.bot.typing_scheduler import TypingScheduler
+from config.settings import settings
 from src.utils.logger import log_user_interaction, log_bot_response
-from src.utils.exceptions import AIClientError, StateManagerError
-from src.utils.message_splitter import split_message
+from src.utils.exceptions import AIClientError, RateLimitError, StateManagerError
+from src.utils.markdown import prepare_markdown
+from src.utils.message_splitter import iter_message_chunks
+from src.utils.metrics import registry
+from src.utils.tracing import span, tracer
 from src.localization.messages import t
 
 
@@ -18,28 +27,19 @@ import asyncio
 
 logger = logging.getLogger(__name__)
 
+stage_latency = registry.histogram(
+    "bot_stage_seconds", "Latency of each message handling stage", labelnames=("stage",)
+)
+updates_counter = registry.counter("bot_updates_total", "Updates received by type", labelnames=("type",))
 
-from contextlib import asynccontextmanager
 
-@asynccontextmanager
-async def typing_indicator(chat_id: int, update: Update):
-    """Контекстный менеджер для индикатора печати"""
-    cancel_flag = {'cancel': False}
-
-    async def keep_typing():
-        while not cancel_flag['cancel']:
-            try:
-                await update.message.chat.send_action("typing")
-                await asyncio.sleep(4)
-            except Exception:
-                break
-
-    typing_task = asyncio.create_task(keep_typing())
-    try:
-        yield
-    finally:
-        cancel_flag['cancel'] = True
-        await typing_task
+async def count_update(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Считает входящие обновления по типу; регистрируется отдельной группой перед остальными."""
+    for update_type in Update.ALL_TYPES:
+        if getattr(update, update_type, None) is not None:
+            updates_counter.inc(type=update_type)
+            return
+    updates_counter.inc(type="unknown")
 
 
 class MessageHandler:
@@ -47,29 +47,47 @@ class MessageHandler:
         self,
         ai_client: AIClient,
         state_manager: StateManager,
-        content_filter: ContentFilter
+        content_filter: ContentFilter,
+        dispatcher: UserDispatcher | None = None,
+        typing: TypingScheduler | None = None
     ):
         self.ai_client = ai_client
         self.state_manager = state_manager
         self.content_filter = content_filter
         self.middleware = MessageMiddleware(content_filter)
+        self.dispatcher = dispatcher or UserDispatcher()
+        # Один цикл индикатора «печатает» на все чаты вместо задачи на сообщение
+        self.typing = typing or TypingScheduler()
 
     async def start_handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        processing_task = asyncio.create_task(
-            self._handle_message(update, context)
+        # Сообщения одного чата обрабатываются по порядку (или новое отменяет текущее)
+        queued_at = time.perf_counter()
+        self.dispatcher.submit(
+            update.effective_chat.id,
+            lambda: self._handle_message(update, context, queued_at)
         )
-        # Можно сохранить задачу в context для возможной отмены
-        if 'processing_tasks' not in context.user_data:
-            context.user_data['processing_tasks'] = []
-        context.user_data['processing_tasks'].append(processing_task)
 
-    async def _handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def _handle_message(
+        self,
+        update: Update,
+        context: ContextTypes.DEFAULT_TYPE,
+        queued_at: float | None = None
+    ):
+        """Обрабатывает сообщение внутри корневого спана трассы обновления."""
+        with tracer.trace("update", update_id=update.update_id, chat_id=update.effective_chat.id) as root:
+            if queued_at is not None:
+                # Сколько сообщение ждало завершения предыдущих сообщений чата
+                root.set(queue_ms=round((time.perf_counter() - queued_at) * 1000, 3))
+            await self._process_message(update, context)
+
+    async def _process_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         user = update.effective_user
         chat_id = update.effective_chat.id
 
         user_lang = getattr(user, "language_code", None) if user else None
 
-        is_valid, result = await self.middleware.process_message(update, context)
+        with stage_latency.time(stage="validation"):
+            is_valid, result = await self.middleware.process_message(update, context)
 
         if not is_valid:
             await update.message.reply_text(result)
@@ -80,71 +98,146 @@ class MessageHandler:
 
         try:
 
-            session = await self.state_manager.get_or_create_session(
-                telegram_user_id=user.id,
-                username=user.username or "",
-                first_name=user.first_name or "",
-                language_code=user_lang,
-            )
+            with stage_latency.time(stage="session"):
+                session = await self.state_manager.get_or_create_session(
+                    telegram_user_id=user.id,
+                    username=user.username or "",
+                    first_name=user.first_name or "",
+                    language_code=user_lang,
+                )
 
             lang = session.get("language", user_lang)
 
-            conversation_history = await self.state_manager.get_conversation_history(
-                session["id"]
-            )
-
-            async with typing_indicator(chat_id, update):
-                ai_response = await asyncio.wait_for(
-                        self.ai_client.generate_response(
-                            messages=conversation_history,
-                            user_message=user_message),
+            with stage_latency.time(stage="history"):
+                # Под бюджет контекста историю обрезает AIClient вместе с системным промптом
+                conversation_history = await self.state_manager.get_conversation_history(
+                    session["id"],
+                    limit=0
+                )
+
+            streaming = settings.ai_stream_responses
+            if streaming:
+                # В потоковом режиме фильтрация и отправка идут вперемешку с генерацией,
+                # поэтому время по этапам считает сам _stream_response
+                formatted_response = await asyncio.wait_for(
+                        self._stream_response(update, conversation_history, user_message, lang),
                         timeout=360
                     )
-
-            filtered_response = self.content_filter.filter_response(ai_response)
-            formatted_response = format_ai_response(filtered_response, lang=lang)
-
-            await self.state_manager.save_message(
-                session_id=session["id"],
-                role="user",
-                content=user_message
-            )
-
-            await self.state_manager.save_message(
-                session_id=session["id"],
-                role="assistant",
-                content=formatted_response
-            )
-
-            message_parts = split_message(formatted_response)
-            for part in message_parts:
-                # part = escape_markdown(part, version=1)
-                try:
-                    messg = await update.message.reply_text(part, parse_mode=ParseMode.MARKDOWN)
-                except Exception as e:
-                    await update.message.reply_text(part, parse_mode=None)
-                    logger.error(f"Bad response: {e} {part}")
-                    raise Exception('Ошибка в парсинге')
+            else:
+                async with self.typing.typing(chat_id, lambda: update.message.chat.send_action("typing")):
+                    with stage_latency.time(stage="ai"):
+                        ai_response = await asyncio.wait_for(
+                                self.ai_client.generate_response(
+                                    messages=conversation_history,
+                                    user_message=user_message),
+                                timeout=360
+                            )
+
+                with stage_latency.time(stage="filter"):
+                    filtered_response = self.content_filter.filter_response(ai_response)
+                    formatted_response = format_ai_response(filtered_response, lang=lang)
+
+            with stage_latency.time(stage="save"):
+                await self.state_manager.save_message(
+                    session_id=session["id"],
+                    role="user",
+                    content=user_message
+                )
+
+                await self.state_manager.save_message(
+                    session_id=session["id"],
+                    role="assistant",
+                    content=formatted_response
+                )
+
+            message_parts = []
+            if not streaming:
+                with stage_latency.time(stage="split"), span("split"):
+                    # Разметка проверяется локально: незакрытые символы экранируются до отправки
+                    message_parts = [prepare_markdown(part) for part in iter_message_chunks(formatted_response)]
+            for index, (part, is_markdown) in enumerate(message_parts):
+                parse_mode = ParseMode.MARKDOWN if is_markdown else None
+                with stage_latency.time(stage="send"), span("send", part=index):
+                    try:
+                        await update.message.reply_text(part, parse_mode=parse_mode)
+                    except BadRequest as e:
+                        if parse_mode is None:
+                            raise
+                        logger.error("Bad response: %s %s", e, part)
+                        await update.message.reply_text(part, parse_mode=None)
             log_bot_response(user.id, formatted_response)
 
+        except RateLimitError as e:
+            logger.error("AI rate limit for user %s: %s", user.id, e)
+            error_msg = get_error_message("rate_limit", lang=user_lang)
+            await update.message.reply_text(error_msg)
+
         except AIClientError as e:
-            logger.error(f"AI client error for user {user.id}: {e}")
+            logger.error("AI client error for user %s: %s", user.id, e)
             error_msg = get_error_message("ai_error", lang=user_lang)
             await update.message.reply_text(error_msg)
 
         except StateManagerError as e:
-            logger.error(f"State manager error for user {user.id}: {e}")
+            logger.error("State manager error for user %s: %s", user.id, e)
             error_msg = get_error_message("general", lang=user_lang)
             await update.message.reply_text(error_msg)
 
         except Exception as e:
-            logger.error(f"Unexpected error handling message for user {user.id}: {e}")
+            logger.error("Unexpected error handling message for user %s: %s", user.id, e)
             error_msg = get_error_message("general", lang=user_lang)
             await update.message.reply_text(error_msg)
 
+    async def _stream_response(
+        self,
+        update: Update,
+        conversation_history: list,
+        user_message: str,
+        lang: str | None
+    ) -> str:
+        # Цензура идёт по мере поступления текста, без повторной фильтрации всего ответа
+        stream_filter = self.content_filter.stream()
+        reply = StreamingReply(update.message)
+        # Ожидание модели, фильтрация и отправка чередуются: время копится по этапам
+        # и записывается одним наблюдением на этап, как в обычном режиме
+        spent: dict[str, float] = {}
+        mark = time.perf_counter()
+
+        def lap(stage: str):
+            nonlocal mark
+            now = time.perf_counter()
+            spent[stage] = spent.get(stage, 0.0) + now - mark
+            mark = now
+
+        try:
+            await reply.start()
+            lap("send")
+            async for delta in self.ai_client.stream_response(
+                    messages=conversation_history,
+                    user_message=user_message):
+                lap("ai")
+                text = stream_filter.feed(delta)
+                lap("filter")
+                await reply.push(text)
+                lap("send")
+            lap("ai")
+
+            filtered_response = reply.text + stream_filter.flush()
+            formatted_response = format_ai_response(filtered_response, lang=lang)
+            lap("filter")
+            await reply.finish(formatted_response)
+            lap("send")
+        except BaseException:
+            # Сообщение об ошибке отправит вызывающий код — заглушка «…» не должна остаться в чате
+            await reply.discard()
+            raise
+        finally:
+            for stage, seconds in spent.items():
+                stage_latency.observe(seconds, stage=stage)
+        return formatted_response
+
 
 async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    logger.error(f"Update {update} caused error {context.error}", exc_info=context.error)
+    logger.error("Update %s caused error %s", update, context.error, exc_info=context.error)
 
     if update and update.effective_message:
         user = update.effective_user
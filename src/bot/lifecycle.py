@@ -0,0 +1,26 @@
+"""
+Жизненный цикл Application без встроенного Updater: то же, что делает
+run_polling вокруг цикла получения обновлений.
+"""
+from contextlib import asynccontextmanager
+from telegram.ext import Application
+
+
+@asynccontextmanager
+async def running(application: Application):
+    """Инициализирует и запускает приложение, вызывая post_init/post_stop/post_shutdown."""
+    await application.initialize()
+    try:
+        if application.post_init:
+            await application.post_init(application)
+        await application.start()
+        try:
+            yield application
+        finally:
+            await application.stop()
+            if application.post_stop:
+                await application.post_stop(application)
+    finally:
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
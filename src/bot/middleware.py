@@ -3,6 +3,7 @@ from telegram import Update
 from telegram.ext import ContextTypes
 from src.filters.content_filter import ContentFilter
 from src.localization.messages import t
+from src.utils.tracing import traced
 
 logger = logging.getLogger(__name__)
 
@@ -11,6 +12,7 @@ class MessageMiddleware:
     def __init__(self, content_filter: ContentFilter):
         self.content_filter = content_filter
 
+    @traced("middleware.process")
     async def process_message(
         self,
         update: Update,
@@ -28,7 +30,7 @@ class MessageMiddleware:
 
         if not is_valid:
             logger.warning(
-                f"Message validation failed for user {update.effective_user.id}: {error_message}"
+                "Message validation failed for user %s: %s", update.effective_user.id, error_message
             )
             return False, error_message
 
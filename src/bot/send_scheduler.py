@@ -0,0 +1,256 @@
+"""
+Планировщик исходящих запросов к Telegram Bot API.
+
+Подключается к Application как rate limiter, поэтому через него проходят все
+вызовы бота: reply_text, edit_text, send_action и т.д. (кроме getUpdates).
+Запросы одного чата выполняются строго по очереди; перед отправкой каждый
+ждёт токен из глобальной корзины (~30/с), корзины чата (~1/с) и, для групп,
+минутной корзины (20/мин). RetryAfter ставит запрос обратно в начало очереди
+чата и приостанавливает чат на указанное время.
+"""
+import asyncio
+import contextvars
+import logging
+import time
+import warnings
+from collections import deque
+from datetime import timedelta
+from typing import Any, Callable, Coroutine, Deque, Dict, List, Optional, Union
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+from config.settings import settings
+from src.ai.rate_limiter import TokenBucket
+from src.utils.metrics import registry
+from src.utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+CHAT_ACTION_ENDPOINT = "sendChatAction"
+
+# Сколько простаивающих чатов хранить, прежде чем чистить их состояние
+MAX_IDLE_CHATS = 10000
+
+queue_depth = registry.gauge(
+    "telegram_send_queue_depth", "Bot API requests waiting in the send scheduler"
+)
+send_latency = registry.histogram(
+    "telegram_send_latency_seconds",
+    "Time from scheduling a Bot API request to its completion",
+    labelnames=("endpoint",),
+)
+retry_after_counter = registry.counter(
+    "telegram_retry_after_total", "RetryAfter responses received from the Bot API"
+)
+dropped_actions = registry.counter(
+    "telegram_chat_actions_dropped_total", "Chat actions dropped because newer output was queued"
+)
+
+
+class _Request:
+    __slots__ = ("callback", "args", "kwargs", "endpoint", "future", "enqueued", "attempts", "max_retries")
+
+    def __init__(self, callback, args, kwargs, endpoint: str, max_retries: int):
+        self.callback = callback
+        self.args = args
+        self.kwargs = kwargs
+        self.endpoint = endpoint
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.enqueued = time.monotonic()
+        self.attempts = 0
+        self.max_retries = max_retries
+
+
+class _Chat:
+    __slots__ = ("requests", "buckets", "blocked_until", "worker")
+
+    def __init__(self, buckets: List[TokenBucket]):
+        self.requests: Deque[_Request] = deque()
+        self.buckets = buckets
+        self.blocked_until = 0.0
+        self.worker: Optional[asyncio.Task] = None
+
+    def idle(self, now: float) -> bool:
+        if self.worker is not None or self.requests or self.blocked_until > now:
+            return False
+        # Корзины пополнились — состояние можно забыть без потери ограничения
+        return all(bucket.available(now) >= bucket.capacity for bucket in self.buckets)
+
+
+def _retry_seconds(error: RetryAfter) -> float:
+    # PTB 22 предупреждает о будущей смене типа retry_after; поддерживаем оба варианта
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        value = error.retry_after
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    return float(value)
+
+
+def _is_group(chat_id: Any) -> bool:
+    # Группы и каналы имеют отрицательный id, каналы также задаются как @username
+    if isinstance(chat_id, str):
+        return chat_id.startswith("@") or chat_id.startswith("-")
+    return chat_id < 0
+
+
+class SendScheduler(BaseRateLimiter[int]):
+    """
+    rate_limit_args — необязательное число повторов после RetryAfter для
+    конкретного вызова (по умолчанию TELEGRAM_MAX_RETRIES).
+    """
+
+    def __init__(
+        self,
+        global_rate: Optional[float] = None,
+        chat_rate: Optional[float] = None,
+        chat_burst: Optional[float] = None,
+        group_per_minute: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        max_retry_after: Optional[float] = None,
+    ):
+        global_rate = settings.telegram_global_rate if global_rate is None else global_rate
+        self.chat_rate = settings.telegram_chat_rate if chat_rate is None else chat_rate
+        self.chat_burst = settings.telegram_chat_burst if chat_burst is None else chat_burst
+        self.group_per_minute = (
+            settings.telegram_group_per_minute if group_per_minute is None else group_per_minute
+        )
+        self.max_retries = settings.telegram_max_retries if max_retries is None else max_retries
+        self.max_retry_after = (
+            settings.telegram_max_retry_after if max_retry_after is None else max_retry_after
+        )
+
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self._chats: Dict[Any, _Chat] = {}
+        self._queued = 0
+        queue_depth.set_function(lambda: self._queued)
+
+    @property
+    def depth(self) -> int:
+        return self._queued
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        workers = [chat.worker for chat in self._chats.values() if chat.worker is not None]
+        for chat in self._chats.values():
+            while chat.requests:
+                chat.requests.popleft().future.cancel()
+        self._queued = 0
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self._chats.clear()
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Union[bool, Dict[str, Any], List[Dict[str, Any]]]]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[int],
+    ) -> Union[bool, Dict[str, Any], List[Dict[str, Any]]]:
+        # Запросы вне чата (setMyCommands и т.п.) идут общей очередью под ключом None
+        key = data.get("chat_id")
+        chat = self._chat(key)
+
+        if endpoint == CHAT_ACTION_ENDPOINT and chat.requests:
+            # В очереди чата уже есть вывод — индикатор набора устарел
+            dropped_actions.inc()
+            return True
+        if endpoint != CHAT_ACTION_ENDPOINT:
+            self._drop_pending_actions(chat)
+
+        max_retries = self.max_retries if rate_limit_args is None else rate_limit_args
+        request = _Request(callback, args, kwargs, endpoint, max_retries)
+        chat.requests.append(request)
+        self._queued += 1
+        if chat.worker is None:
+            # Воркер чата переживает запрос, который его запустил, — не наследуем его трассу
+            chat.worker = asyncio.create_task(self._drain(key, chat), context=contextvars.Context())
+        with span(f"telegram.{endpoint}", queued=len(chat.requests)):
+            return await request.future
+
+    def _chat(self, key: Any) -> _Chat:
+        chat = self._chats.get(key)
+        if chat is None:
+            if len(self._chats) >= MAX_IDLE_CHATS:
+                self._prune()
+            buckets = [TokenBucket(self.chat_rate, self.chat_burst)] if key is not None else []
+            if key is not None and _is_group(key) and self.group_per_minute > 0:
+                buckets.append(TokenBucket(self.group_per_minute / 60, self.group_per_minute))
+            chat = self._chats[key] = _Chat(buckets)
+        return chat
+
+    def _prune(self):
+        now = time.monotonic()
+        for key in [key for key, chat in self._chats.items() if chat.idle(now)]:
+            del self._chats[key]
+
+    def _drop_pending_actions(self, chat: _Chat):
+        actions = [request for request in chat.requests if request.endpoint == CHAT_ACTION_ENDPOINT]
+        for request in actions:
+            chat.requests.remove(request)
+            self._queued -= 1
+            dropped_actions.inc()
+            if not request.future.done():
+                request.future.set_result(True)
+
+    async def _acquire(self, chat: _Chat, request: _Request) -> bool:
+        """Ждёт токены для запроса в голове очереди; False, если запрос за это время сняли."""
+        while True:
+            wait = chat.blocked_until - time.monotonic()
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
+
+        buckets = chat.buckets + [self.global_bucket]
+        now = time.monotonic()
+        wait = max(bucket.reserve(1, now) for bucket in buckets)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        if not chat.requests or chat.requests[0] is not request or request.future.done():
+            for bucket in buckets:
+                bucket.refund(1)
+            return False
+        return True
+
+    async def _drain(self, key: Any, chat: _Chat):
+        try:
+            while chat.requests:
+                request = chat.requests[0]
+                if not await self._acquire(chat, request):
+                    if chat.requests and chat.requests[0] is request:
+                        chat.requests.popleft()
+                        self._queued -= 1
+                    continue
+                chat.requests.popleft()
+                self._queued -= 1
+                await self._send(chat, key, request)
+        finally:
+            chat.worker = None
+
+    async def _send(self, chat: _Chat, key: Any, request: _Request):
+        try:
+            result = await request.callback(*request.args, **request.kwargs)
+        except RetryAfter as e:
+            seconds = _retry_seconds(e)
+            retry_after_counter.inc()
+            if request.attempts >= request.max_retries or seconds > self.max_retry_after:
+                if not request.future.done():
+                    request.future.set_exception(e)
+                return
+            logger.warning("Flood control for chat %s: retrying %s in %.1fs", key, request.endpoint, seconds)
+            request.attempts += 1
+            chat.blocked_until = max(chat.blocked_until, time.monotonic() + seconds)
+            chat.requests.appendleft(request)
+            self._queued += 1
+            return
+        except Exception as e:
+            if not request.future.done():
+                request.future.set_exception(e)
+        else:
+            if not request.future.done():
+                request.future.set_result(result)
+        send_latency.observe(time.monotonic() - request.enqueued, endpoint=request.endpoint)
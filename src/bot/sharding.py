@@ -0,0 +1,46 @@
+"""
+Консистентное хеширование обновлений по воркерам.
+
+Ключ обновления — id чата, поэтому все сообщения чата попадают в один и тот
+же воркер: сохраняется порядок обработки и кэш сессии в его StateManager.
+При изменении числа воркеров переезжает лишь ~1/N чатов.
+"""
+from bisect import bisect
+from hashlib import blake2b
+from typing import Any, Dict, List, Optional, Sequence
+
+
+def stable_hash(value: str) -> int:
+    # hash() в Python рандомизирован между процессами, поэтому нужен свой
+    return int.from_bytes(blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    def __init__(self, nodes: Sequence[int], replicas: int = 100):
+        points = sorted(
+            (stable_hash(f"{node}:{replica}"), node) for node in nodes for replica in range(replicas)
+        )
+        self._points: List[int] = [point for point, _ in points]
+        self._nodes: List[int] = [node for _, node in points]
+
+    def node_for(self, key: Any) -> int:
+        index = bisect(self._points, stable_hash(str(key)))
+        return self._nodes[index % len(self._nodes)]
+
+
+def routing_key(update: Dict[str, Any]) -> Optional[int]:
+    """id чата из сырого JSON обновления (без построения объекта Update)."""
+    for field in ("message", "edited_message", "channel_post", "edited_channel_post"):
+        message = update.get(field)
+        if message:
+            return message["chat"]["id"]
+    callback = update.get("callback_query")
+    if callback:
+        message = callback.get("message")
+        if message:
+            return message["chat"]["id"]
+        return callback["from"]["id"]
+    for value in update.values():
+        if isinstance(value, dict) and "from" in value:
+            return value["from"]["id"]
+    return None
@@ -0,0 +1,116 @@
+import logging
+import time
+from typing import Callable, List, Optional
+from telegram import Message
+from telegram.constants import ParseMode
+from telegram.error import TelegramError
+from config.settings import settings
+from src.utils.markdown import prepare_markdown
+from src.utils.message_splitter import split_message
+
+logger = logging.getLogger(__name__)
+
+PLACEHOLDER = "…"
+
+
+class StreamingReply:
+    """
+    Прогрессивно выводит потоковый ответ AI в чат.
+
+    Сразу отправляет сообщение-заглушку, затем редактирует его не чаще
+    edit_interval секунд. Когда текст перестаёт помещаться в одно сообщение,
+    переходит к следующему, используя те же границы, что и split_message().
+    """
+
+    def __init__(
+        self,
+        reply_to: Message,
+        render: Optional[Callable[[str], str]] = None,
+        edit_interval: Optional[float] = None,
+        max_size: int = 4090,
+    ):
+        self.reply_to = reply_to
+        self.render = render or (lambda text: text)
+        self.edit_interval = settings.stream_edit_interval if edit_interval is None else edit_interval
+        self.max_size = max_size
+
+        self.text = ""
+        self._messages: List[Message] = []
+        self._shown: List[str] = []
+        self._last_edit = 0.0
+
+    async def start(self):
+        message = await self.reply_to.reply_text(PLACEHOLDER)
+        self._messages.append(message)
+        self._shown.append(PLACEHOLDER)
+        self._last_edit = time.monotonic()
+
+    async def push(self, delta: str):
+        self.text += delta
+        if time.monotonic() - self._last_edit >= self.edit_interval:
+            await self._sync(self.render(self.text), parse_mode=None)
+
+    async def finish(self, final_text: str):
+        """Выводит окончательный (отфильтрованный и отформатированный) текст с Markdown."""
+        await self._sync(final_text, parse_mode=ParseMode.MARKDOWN)
+
+        # Итоговый текст мог оказаться короче промежуточного — лишние сообщения удаляем
+        parts_count = max(1, len(split_message(final_text, self.max_size)))
+        while len(self._messages) > parts_count:
+            extra = self._messages.pop()
+            self._shown.pop()
+            try:
+                await extra.delete()
+            except TelegramError as e:
+                logger.warning("Failed to delete superfluous streamed message: %s", e)
+
+    async def discard(self):
+        """Удаляет заглушку и уже выведенную часть, если ответ получить не удалось."""
+        while self._messages:
+            message = self._messages.pop()
+            self._shown.pop()
+            try:
+                await message.delete()
+            except TelegramError as e:
+                logger.warning("Failed to delete streamed message: %s", e)
+
+    async def _sync(self, text: str, parse_mode: Optional[str]):
+        parts = split_message(text, self.max_size)
+        for index, part in enumerate(parts):
+            part_mode = parse_mode
+            if parse_mode is not None:
+                part, is_markdown = prepare_markdown(part)
+                part_mode = parse_mode if is_markdown else None
+            if index < len(self._messages):
+                if self._shown[index] == part and parse_mode is None:
+                    continue
+                await self._edit(index, part, part_mode)
+            else:
+                await self._send(part, part_mode)
+        self._last_edit = time.monotonic()
+
+    async def _edit(self, index: int, part: str, parse_mode: Optional[str]):
+        message = self._messages[index]
+        try:
+            await message.edit_text(part, parse_mode=parse_mode)
+        except TelegramError as e:
+            if "not modified" in str(e).lower():
+                pass
+            elif parse_mode is not None:
+                logger.error("Bad response: %s %s", e, part)
+                await message.edit_text(part, parse_mode=None)
+            else:
+                logger.warning("Failed to edit streamed message: %s", e)
+                return
+        self._shown[index] = part
+
+    async def _send(self, part: str, parse_mode: Optional[str]):
+        try:
+            message = await self.reply_to.reply_text(part, parse_mode=parse_mode)
+        except TelegramError as e:
+            if parse_mode is None:
+                raise
+            logger.error("Bad response: %s %s", e, part)
+            message = await self.reply_to.reply_text(part, parse_mode=None)
+        self._messages.append(message)
+        self._shown.append(part)
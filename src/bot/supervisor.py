@@ -0,0 +1,226 @@
+"""
+Режим супервизора: обновления принимает один процесс, а обрабатывают
+BOT_WORKERS процессов-воркеров.
+
+Супервизор получает обновления как обычно (polling или webhook) и по
+консистентному хешу id чата передаёт их воркеру через его очередь. Каждый
+воркер — полноценное приложение бота без Updater со своим StateManager и
+AIClient. Упавший воркер перезапускается с экспоненциальной задержкой, а
+пропускная способность каждого шарда периодически пишется в лог.
+"""
+import asyncio
+import json
+import logging
+import multiprocessing
+import signal
+import time
+from typing import Any, Callable, Dict, List, Optional
+from telegram import Update
+from telegram.ext import Application, ContextTypes, TypeHandler
+from config.settings import settings
+from src.bot.lifecycle import running
+from src.bot.sharding import HashRing, routing_key
+from src.utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Группа обработчиков воркера, которая считает обработанные обновления после основных
+STATS_HANDLER_GROUP = 100
+
+routed_counter = registry.counter(
+    "supervisor_routed_updates_total", "Updates routed to each worker shard", labelnames=("shard",)
+)
+restarts_counter = registry.counter(
+    "supervisor_worker_restarts_total", "Worker process restarts per shard", labelnames=("shard",)
+)
+
+ApplicationFactory = Callable[[], Application]
+
+
+def worker_main(factory: ApplicationFactory, shard: int, inbox, processed):
+    """Точка входа процесса-воркера."""
+    # Ctrl+C получает вся группа процессов; воркеры останавливает супервизор
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        asyncio.run(_run_worker(factory, shard, inbox, processed))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _run_worker(factory: ApplicationFactory, shard: int, inbox, processed):
+    application = factory()
+    application.bot_data["shard"] = shard
+
+    async def count_processed(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        with processed.get_lock():
+            processed[shard] += 1
+
+    application.add_handler(TypeHandler(Update, count_processed), group=STATS_HANDLER_GROUP)
+    loop = asyncio.get_running_loop()
+
+    async with running(application):
+        logger.info("Worker %s started", shard)
+        while True:
+            raw = await loop.run_in_executor(None, inbox.get)
+            if raw is None:
+                break
+            update = Update.de_json(json.loads(raw), application.bot)
+            await application.update_queue.put(update)
+    logger.info("Worker %s stopped", shard)
+
+
+class _Shard:
+    __slots__ = ("index", "inbox", "process", "started_at", "crashes", "restart_at", "restarts")
+
+    def __init__(self, index: int, inbox):
+        self.index = index
+        self.inbox = inbox
+        self.process: Optional[multiprocessing.Process] = None
+        self.started_at = 0.0
+        self.crashes = 0
+        self.restart_at = 0.0
+        self.restarts = 0
+
+
+class Supervisor:
+    def __init__(
+        self,
+        factory: ApplicationFactory,
+        workers: Optional[int] = None,
+        restart_delay: Optional[float] = None,
+        report_interval: Optional[float] = None,
+        replicas: int = 100,
+    ):
+        self.factory = factory
+        self.workers = settings.bot_workers if workers is None else workers
+        self.restart_delay = settings.worker_restart_delay if restart_delay is None else restart_delay
+        self.report_interval = (
+            settings.worker_report_interval if report_interval is None else report_interval
+        )
+        # spawn: дочерний процесс не наследует event loop и соединения родителя
+        self._context = multiprocessing.get_context("spawn")
+        self.ring = HashRing(range(self.workers), replicas)
+        self.processed = self._context.Array("Q", self.workers)
+        self.routed = [0] * self.workers
+        self.shards: List[_Shard] = [_Shard(index, self._context.Queue()) for index in range(self.workers)]
+        self._monitor: Optional[asyncio.Task] = None
+        self._last_report: Optional[tuple] = None
+
+    def start(self):
+        for shard in self.shards:
+            self._spawn(shard)
+
+    def _spawn(self, shard: _Shard):
+        process = self._context.Process(
+            target=worker_main,
+            args=(self.factory, shard.index, shard.inbox, self.processed),
+            name=f"bot-worker-{shard.index}",
+            daemon=True,
+        )
+        process.start()
+        shard.process = process
+        shard.started_at = time.monotonic()
+        logger.info("Started worker %d (pid %s)", shard.index, process.pid)
+
+    def shard_for(self, update: Dict[str, Any]) -> int:
+        key = routing_key(update)
+        return self.ring.node_for(update.get("update_id") if key is None else key)
+
+    def route(self, update: Dict[str, Any]) -> int:
+        shard = self.shard_for(update)
+        self.shards[shard].inbox.put(json.dumps(update))
+        self.routed[shard] += 1
+        routed_counter.inc(shard=str(shard))
+        return shard
+
+    async def handle_update(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Обработчик для приложения супервизора: пересылает обновление воркеру."""
+        self.route(update.to_dict())
+
+    def check_workers(self):
+        """Перезапускает упавшие воркеры; между падениями подряд задержка растёт вдвое."""
+        now = time.monotonic()
+        for shard in self.shards:
+            process = shard.process
+            if process is None or process.is_alive():
+                continue
+            if shard.restart_at == 0.0:
+                # Воркер, проработавший дольше минуты, считается стабильным
+                if now - shard.started_at > 60:
+                    shard.crashes = 0
+                delay = min(60.0, self.restart_delay * (2 ** shard.crashes))
+                shard.crashes += 1
+                shard.restart_at = now + delay
+                logger.error(
+                    "Worker %d exited with code %s, restarting in %.1fs", shard.index, process.exitcode, delay
+                )
+            if now >= shard.restart_at:
+                shard.restart_at = 0.0
+                # Убитый процесс мог оставить захваченной блокировку чтения очереди,
+                # поэтому новый воркер получает новую очередь; недоставленные обновления теряются
+                shard.inbox = self._context.Queue()
+                shard.restarts += 1
+                restarts_counter.inc(shard=str(shard.index))
+                self._spawn(shard)
+
+    def stats(self) -> Dict[int, dict]:
+        return {
+            shard.index: {
+                "alive": shard.process is not None and shard.process.is_alive(),
+                "pid": shard.process.pid if shard.process else None,
+                "routed": self.routed[shard.index],
+                "processed": self.processed[shard.index],
+                "backlog": self.routed[shard.index] - self.processed[shard.index],
+                "restarts": shard.restarts,
+            }
+            for shard in self.shards
+        }
+
+    def report(self):
+        now = time.monotonic()
+        processed = list(self.processed)
+        if self._last_report is not None:
+            last_time, last_processed = self._last_report
+            elapsed = max(now - last_time, 1e-9)
+            for index, count in enumerate(processed):
+                rate = (count - last_processed[index]) / elapsed
+                logger.info(
+                    "Shard %d: %.1f updates/s, processed %d, backlog %d, restarts %d",
+                    index, rate, count, self.routed[index] - count, self.shards[index].restarts,
+                )
+        self._last_report = (now, processed)
+
+    async def _monitor_loop(self):
+        next_report = time.monotonic() + self.report_interval
+        while True:
+            await asyncio.sleep(0.5)
+            self.check_workers()
+            if self.report_interval and time.monotonic() >= next_report:
+                self.report()
+                next_report = time.monotonic() + self.report_interval
+
+    async def start_monitor(self):
+        self._monitor = asyncio.create_task(self._monitor_loop())
+
+    async def stop(self, timeout: float = 10.0):
+        if self._monitor is not None:
+            self._monitor.cancel()
+            await asyncio.gather(self._monitor, return_exceptions=True)
+            self._monitor = None
+
+        for shard in self.shards:
+            shard.inbox.put(None)
+        deadline = time.monotonic() + timeout
+        for shard in self.shards:
+            if shard.process is None:
+                continue
+            await asyncio.to_thread(shard.process.join, max(0.0, deadline - time.monotonic()))
+            if shard.process.is_alive():
+                logger.warning("Worker %d did not stop in time, terminating", shard.index)
+                shard.process.terminate()
+                await asyncio.to_thread(shard.process.join, 1.0)
+        logger.info("All workers stopped")
+
+    def attach(self, application: Application):
+        """Подключает супервизор к приложению, которое получает обновления."""
+        application.add_handler(TypeHandler(Update, self.handle_update))
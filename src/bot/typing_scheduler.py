@@ -0,0 +1,132 @@
+"""
+Общий планировщик индикатора «печатает».
+
+Вместо отдельной спящей задачи на каждое сообщение планировщик хранит чаты,
+для которых сейчас идёт генерация ответа, в куче по сроку следующего
+действия. Один таймер цикла событий срабатывает к ближайшему сроку и раз в
+interval секунд отправляет в каждый чат одно действие, сколько бы генераций
+в чате ни шло. Когда завершается последняя генерация чата, чат сразу выбывает из
+расписания, а ещё не отправленное действие отменяется.
+"""
+import asyncio
+import contextvars
+import heapq
+import logging
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from config.settings import settings
+from src.utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+SendAction = Callable[[], Awaitable]
+
+typing_chats_gauge = registry.gauge("typing_chats", "Chats with a pending generation showing the typing action")
+
+
+class _ChatTyping:
+    __slots__ = ("pending", "send_action", "generation", "sending")
+
+    def __init__(self, send_action: SendAction, generation: int):
+        self.pending = 1
+        self.send_action = send_action
+        # Отличает новую запись чата от снятой, чьи сроки ещё лежат в куче
+        self.generation = generation
+        self.sending: Optional[asyncio.Task] = None
+
+
+class TypingScheduler:
+    def __init__(self, interval: Optional[float] = None):
+        self.interval = settings.typing_interval if interval is None else interval
+        self._chats: Dict[int, _ChatTyping] = {}
+        # Куча (срок по часам цикла событий, поколение, чат); снятые чаты пропускаются при извлечении
+        self._due: List[Tuple[float, int, int]] = []
+        self._generation = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        typing_chats_gauge.set_function(lambda: len(self._chats))
+
+    @property
+    def active_chats(self) -> int:
+        return len(self._chats)
+
+    @asynccontextmanager
+    async def typing(self, chat_id: int, send_action: SendAction):
+        """Показывает «печатает» в чате, пока выполняется тело блока."""
+        self.add(chat_id, send_action)
+        try:
+            yield
+        finally:
+            self.remove(chat_id)
+
+    def add(self, chat_id: int, send_action: SendAction):
+        entry = self._chats.get(chat_id)
+        if entry is not None:
+            entry.pending += 1
+            return
+        self._generation += 1
+        self._chats[chat_id] = _ChatTyping(send_action, self._generation)
+        heapq.heappush(self._due, (asyncio.get_running_loop().time(), self._generation, chat_id))
+        self._schedule()
+
+    def remove(self, chat_id: int):
+        entry = self._chats.get(chat_id)
+        if entry is None:
+            return
+        entry.pending -= 1
+        if entry.pending > 0:
+            return
+        del self._chats[chat_id]
+        if entry.sending is not None and not entry.sending.done():
+            # Действие, застрявшее в очереди отправки, после ответа уже не нужно
+            entry.sending.cancel()
+        if not self._chats:
+            self._stop_timer()
+
+    def _stop_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._due.clear()
+
+    def _schedule(self):
+        """Ставит единственный таймер цикла событий на ближайший срок."""
+        if not self._due:
+            return
+        when = self._due[0][0]
+        if self._timer is not None:
+            if self._timer.when() <= when:
+                return
+            self._timer.cancel()
+        # Таймер переживает генерацию, которая его поставила, — не наследуем её трассу
+        self._timer = asyncio.get_running_loop().call_at(when, self._tick, context=contextvars.Context())
+
+    def _tick(self):
+        self._timer = None
+        now = asyncio.get_running_loop().time()
+        while self._due and self._due[0][0] <= now:
+            _, generation, chat_id = heapq.heappop(self._due)
+            entry = self._chats.get(chat_id)
+            if entry is None or entry.generation != generation:
+                continue
+            if entry.sending is None or entry.sending.done():
+                entry.sending = asyncio.create_task(self._send(chat_id, entry))
+            heapq.heappush(self._due, (now + self.interval, generation, chat_id))
+        self._schedule()
+
+    async def _send(self, chat_id: int, entry: _ChatTyping):
+        try:
+            await entry.send_action()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Как и прежде, после ошибки индикатор для этой генерации больше не шлём
+            logger.debug("Typing action failed for chat %s: %s", chat_id, e)
+            if self._chats.get(chat_id) is entry:
+                entry.generation = -1
+
+    def close(self):
+        for entry in self._chats.values():
+            if entry.sending is not None:
+                entry.sending.cancel()
+        self._chats.clear()
+        self._stop_timer()
@@ -0,0 +1,124 @@
+"""
+Приём обновлений Telegram через webhook вместо long polling.
+
+Встроенный HTTP-сервер принимает POST от Telegram на WEBHOOK_PATH, сверяет
+заголовок X-Telegram-Bot-Api-Secret-Token и кладёт обновление в очередь
+Application. В отличие от run_polling, подписка оформляется только на те
+типы обновлений, которые бот обрабатывает, а сервер можно поставить за
+балансировщик нагрузки.
+"""
+import asyncio
+import hmac
+import json
+import logging
+import secrets
+import signal
+from typing import Optional
+from telegram import Update
+from telegram.ext import Application
+from config.settings import settings
+from src.bot.lifecycle import running
+from src.utils.http_server import HttpRequest, HttpResponse, HttpServer
+from src.utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Бот обрабатывает только новые сообщения (текст и команды)
+ALLOWED_UPDATES = [Update.MESSAGE]
+
+SECRET_HEADER = "x-telegram-bot-api-secret-token"
+
+webhook_requests = registry.counter(
+    "webhook_requests_total", "Webhook HTTP requests by result", labelnames=("result",)
+)
+
+
+class WebhookServer:
+    def __init__(
+        self,
+        application: Application,
+        url: Optional[str] = None,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        path: Optional[str] = None,
+        secret_token: Optional[str] = None,
+    ):
+        self.application = application
+        self.path = path or settings.webhook_path
+        base_url = (url if url is not None else settings.webhook_url).rstrip("/")
+        self.url = base_url + self.path
+        # Без заданного секрета генерируем случайный: он передаётся Telegram в setWebhook
+        self.secret_token = secret_token or settings.webhook_secret_token or secrets.token_urlsafe(32)
+        self.server = HttpServer(
+            self.handle,
+            host=host or settings.webhook_listen,
+            port=settings.webhook_port if port is None else port,
+        )
+
+    @property
+    def port(self) -> int:
+        return self.server.port
+
+    async def handle(self, request: HttpRequest) -> HttpResponse:
+        if request.path != self.path:
+            webhook_requests.inc(result="not_found")
+            return HttpResponse(404)
+        if request.method != "POST":
+            webhook_requests.inc(result="bad_method")
+            return HttpResponse(405)
+
+        token = request.headers.get(SECRET_HEADER, "")
+        if not hmac.compare_digest(token.encode(), self.secret_token.encode()):
+            webhook_requests.inc(result="forbidden")
+            logger.warning("Webhook request with invalid secret token rejected")
+            return HttpResponse(403)
+
+        try:
+            update = Update.de_json(json.loads(request.body), self.application.bot)
+        except (ValueError, TypeError, KeyError) as e:
+            webhook_requests.inc(result="bad_request")
+            logger.warning("Malformed webhook update: %s", e)
+            return HttpResponse(400)
+
+        await self.application.update_queue.put(update)
+        webhook_requests.inc(result="accepted")
+        return HttpResponse(200)
+
+    async def start(self):
+        await self.server.start()
+        logger.info("Webhook server listening on %s:%s%s", self.server.host, self.port, self.path)
+        await self.application.bot.set_webhook(
+            url=self.url,
+            secret_token=self.secret_token,
+            allowed_updates=ALLOWED_UPDATES,
+            max_connections=settings.webhook_max_connections,
+        )
+        logger.info("Webhook registered at %s", self.url)
+
+    async def stop(self):
+        await self.server.stop()
+
+
+async def run_webhook(
+    application: Application,
+    server: Optional[WebhookServer] = None,
+    stop_event: Optional[asyncio.Event] = None,
+):
+    """
+    Аналог Application.run_polling для режима webhook: инициализирует
+    приложение, вызывает post_init/post_stop/post_shutdown и работает до stop_event
+    (по умолчанию — до SIGINT/SIGTERM).
+    """
+    server = server or WebhookServer(application)
+    if stop_event is None:
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop_event.set)
+
+    async with running(application):
+        await server.start()
+        try:
+            await stop_event.wait()
+        finally:
+            await server.stop()
@@ -1,31 +1,29 @@
 import logging
-from better_profanity import profanity
-from src.filters.stopwords import ALL_STOPWORDS
+from src.filters.matcher import ProfanityMatcher, StreamingCensor, get_default_matcher
 from src.utils.exceptions import ContentFilterError
 from src.localization.messages import t
+from src.utils.tracing import span
 
 logger = logging.getLogger(__name__)
 
-profanity.load_censor_words()
-profanity.add_censor_words(ALL_STOPWORDS)
-
 
 class ContentFilter:
-    def __init__(self):
+    def __init__(self, matcher: ProfanityMatcher | None = None):
         self.enabled = True
+        self.matcher = matcher or get_default_matcher()
 
     def contains_profanity(self, text: str) -> bool:
         try:
-            return profanity.contains_profanity(text)
+            return self.matcher.contains(text)
         except Exception as e:
-            logger.error(f"Error checking profanity: {e}")
+            logger.error("Error checking profanity: %s", e)
             return False
 
     def censor_text(self, text: str) -> str:
         try:
-            return profanity.censor(text)
+            return self.matcher.censor(text)[0]
         except Exception as e:
-            logger.error(f"Error censoring text: {e}")
+            logger.error("Error censoring text: %s", e)
             return text
 
     def validate_message(self, text: str, lang: str | None = None) -> tuple[bool, str]:
@@ -35,14 +33,40 @@ class ContentFilter:
         if len(text) > 4000:
             return False, t(lang, "message_too_long")
 
-        if self.contains_profanity(text):
+        with span("filter.validate", chars=len(text)):
+            has_profanity = self.contains_profanity(text)
+        if has_profanity:
             logger.warning("Profanity detected in message")
             return False, t(lang, "message_has_profanity")
 
         return True, ""
 
     def filter_response(self, text: str) -> str:
-        if self.contains_profanity(text):
+        # Поиск и цензура за один проход по тексту
+        try:
+            with span("filter.response", chars=len(text)):
+                censored, count = self.matcher.censor(text)
+        except Exception as e:
+            logger.error("Error censoring text: %s", e)
+            return text
+        if count:
+            logger.warning("Profanity detected in AI response, censoring")
+        return censored
+
+    def stream(self) -> "StreamingFilter":
+        """Фильтр для текста, приходящего по частям; результат совпадает с filter_response."""
+        return StreamingFilter(self.matcher.stream())
+
+
+class StreamingFilter:
+    def __init__(self, censor: StreamingCensor):
+        self._censor = censor
+
+    def feed(self, chunk: str) -> str:
+        return self._censor.feed(chunk)
+
+    def flush(self) -> str:
+        tail = self._censor.flush()
+        if self._censor.count:
             logger.warning("Profanity detected in AI response, censoring")
-            return self.censor_text(text)
-        return text
+        return tail
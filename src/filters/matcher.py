@@ -0,0 +1,223 @@
+"""
+Однопроходный поиск и цензура нецензурных слов.
+
+Все слова собираются в одно регулярное выражение в виде префиксного дерева,
+поэтому текст просматривается один раз, а проверка в каждой позиции стоит
+O(длины слова), а не O(размера словаря). Перед поиском текст нормализуется:
+кириллические и латинские двойники букв сводятся к одной форме, так что
+"xуй" с латинской x и "сука" находятся одинаково. Нормализация заменяет
+символы один к одному, поэтому позиции совпадений совпадают с исходным текстом.
+
+Чисто кириллическое слово может после нормализации совпасть с английским
+("токе" -> "toke"), поэтому такие совпадения дополнительно проверяются по
+словам, которые в словаре записаны кириллицей.
+"""
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from src.filters.stopwords import ALL_STOPWORDS
+
+DEFAULT_WORDLIST_PATH = Path(__file__).with_name("default_wordlist.txt")
+
+CENSOR_REPLACEMENT = "****"
+
+# Кириллические буквы, совпадающие по начертанию с латинскими
+_HOMOGLYPHS = {
+    "а": "a", "в": "b", "е": "e", "ё": "e", "к": "k", "м": "m", "н": "h",
+    "о": "o", "р": "p", "с": "c", "т": "t", "у": "y", "х": "x",
+}
+NORMALIZATION_TABLE = str.maketrans({
+    **_HOMOGLYPHS,
+    **{cyr.upper(): lat for cyr, lat in _HOMOGLYPHS.items()},
+})
+
+# Замены символов в стиле leetspeak (как в better_profanity)
+LEET_VARIANTS: Dict[str, str] = {
+    "a": "a@*4",
+    "i": "i*l1",
+    "o": "o*0@",
+    "u": "u*v",
+    "v": "v*u",
+    "l": "l1",
+    "e": "e*3",
+    "s": "s$5",
+    "t": "t7",
+}
+
+_CYRILLIC = re.compile(r"[а-яё]", re.IGNORECASE)
+_LATIN = re.compile(r"[a-z]", re.IGNORECASE)
+
+SEPARATOR = "\x00"
+# Сколько символов может стоять между словами фразы ("blow  job", "ass-fucker")
+MAX_SEPARATOR_LENGTH = 4
+_END = ""
+
+
+def normalize(text: str) -> str:
+    return text.translate(NORMALIZATION_TABLE)
+
+
+def load_wordlist(path: Path = DEFAULT_WORDLIST_PATH) -> List[str]:
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def _canonical(word: str) -> str:
+    """Нормализованная запись слова: разделители внутри фраз сводятся к одному маркеру."""
+    word = normalize(word.lower())
+    return re.sub(r"[\W_]+", SEPARATOR, word).strip(SEPARATOR)
+
+
+def _char_pattern(char: str) -> str:
+    if char == SEPARATOR:
+        return r"[\W_]{0,%d}" % MAX_SEPARATOR_LENGTH
+    variants = LEET_VARIANTS.get(char)
+    if variants:
+        return "[" + re.escape(variants) + "]"
+    return re.escape(char)
+
+
+def _trie_pattern(node: dict) -> str:
+    branches = []
+    for char in sorted(k for k in node if k != _END):
+        branches.append(_char_pattern(char) + _trie_pattern(node[char]))
+    if _END in node:
+        # Слово закончилось — дальше не должно идти буквы или цифры (подчёркивание — разметка)
+        branches.append(r"(?![^\W_])")
+    if len(branches) == 1:
+        return branches[0]
+    return "(?:" + "|".join(branches) + ")"
+
+
+def _max_length(canonical: str) -> int:
+    """Наибольшая длина совпадения для слова в исходном тексте."""
+    return len(canonical) + canonical.count(SEPARATOR) * (MAX_SEPARATOR_LENGTH - 1)
+
+
+def build_pattern(words: Iterable[str]) -> "re.Pattern[str]":
+    trie: dict = {}
+    for word in words:
+        canonical = _canonical(word)
+        if not canonical:
+            continue
+        node = trie
+        for char in canonical:
+            node = node.setdefault(char, {})
+        node[_END] = True
+    if not trie:
+        # Пустой словарь: выражение, которое никогда не совпадает
+        return re.compile(r"(?!)")
+    return re.compile(r"(?<![^\W_])" + _trie_pattern(trie), re.IGNORECASE)
+
+
+class ProfanityMatcher:
+    def __init__(self, words: Iterable[str]):
+        words = list(words)
+        self.pattern = build_pattern(words)
+        # Совпадение не бывает длиннее этого: столько текста держит StreamingCensor
+        self.max_match_length = max((_max_length(_canonical(word)) for word in words), default=0)
+        # Слова, записанные кириллицей, — для проверки чисто кириллических совпадений
+        self.cyrillic_pattern = build_pattern(word for word in words if _CYRILLIC.search(word))
+
+    def spans(self, text: str, pos: int = 0) -> Iterator[Tuple[int, int]]:
+        """
+        Границы найденных слов начиная с позиции pos. Решение о совпадении в
+        позиции зависит только от max_match_length + 1 символов после неё и
+        одного символа перед ней — на этом держится StreamingCensor.
+        """
+        normalized = normalize(text)
+        match = self.pattern.search(normalized, pos)
+        while match is not None:
+            start, end = match.span()
+            if _LATIN.search(text, start, end) is None:
+                native = self.cyrillic_pattern.match(normalized, start)
+                if native is None:
+                    match = self.pattern.search(normalized, start + 1)
+                    continue
+                start, end = native.span()
+            yield start, end
+            match = self.pattern.search(normalized, end)
+
+    def find(self, text: str) -> List[Tuple[int, int]]:
+        return list(self.spans(text))
+
+    def contains(self, text: str) -> bool:
+        return next(self.spans(text), None) is not None
+
+    def censor(self, text: str) -> Tuple[str, int]:
+        """Заменяет найденные слова за один проход; возвращает текст и число замен."""
+        parts = []
+        position = 0
+        count = 0
+        for start, end in self.spans(text):
+            parts.append(text[position:start])
+            parts.append(CENSOR_REPLACEMENT)
+            position = end
+            count += 1
+        if not count:
+            return text, 0
+        parts.append(text[position:])
+        return "".join(parts), count
+
+    def stream(self) -> "StreamingCensor":
+        return StreamingCensor(self)
+
+
+class StreamingCensor:
+    """
+    Инкрементальная цензура потокового текста.
+
+    feed() возвращает уже проверенную часть текста, придерживая только хвост
+    длиной max_match_length + 1 — в нём ещё может начаться слово, которое
+    закончится в следующем фрагменте. flush() выдаёт остаток. Склейка всех
+    возвращённых строк совпадает с ProfanityMatcher.censor() на всём тексте.
+    """
+
+    def __init__(self, matcher: ProfanityMatcher):
+        self.matcher = matcher
+        self.count = 0
+        self._pending = ""
+        # Последний выданный символ исходного текста — для проверки границы слова
+        self._context = ""
+
+    def feed(self, chunk: str) -> str:
+        self._pending += chunk
+        ready = len(self._pending) - self.matcher.max_match_length - 1
+        if ready <= 0:
+            return ""
+        return self._emit(ready)
+
+    def flush(self) -> str:
+        return self._emit(None)
+
+    def _emit(self, ready: Optional[int]) -> str:
+        offset = len(self._context)
+        text = self._context + self._pending
+        limit = len(text) if ready is None else offset + ready
+
+        parts = []
+        position = offset
+        for start, end in self.matcher.spans(text, offset):
+            if start >= limit:
+                break
+            parts.append(text[position:start])
+            parts.append(CENSOR_REPLACEMENT)
+            position = end
+            self.count += 1
+        # Слово, начавшееся до границы, выдаём целиком, даже если оно заходит за неё
+        stop = max(limit, position)
+        parts.append(text[position:stop])
+
+        if stop > 0:
+            self._context = text[stop - 1]
+        self._pending = text[stop:]
+        return "".join(parts)
+
+
+@lru_cache(maxsize=1)
+def get_default_matcher(extra_words: Optional[Tuple[str, ...]] = None) -> ProfanityMatcher:
+    words = load_wordlist() + list(ALL_STOPWORDS)
+    if extra_words:
+        words += list(extra_words)
+    return ProfanityMatcher(words)
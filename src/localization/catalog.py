@@ -0,0 +1,93 @@
+"""
+Каталог переводов из файлов locales/<язык>.json.
+
+Язык загружается при первом обращении к нему и сразу компилируется в
+таблицу ключ -> Template, поэтому неиспользуемые языки не занимают память
+и не замедляют импорт. Чтобы добавить язык, достаточно
+положить рядом новый файл с теми же ключами.
+"""
+import json
+import logging
+from pathlib import Path
+from string import Formatter
+from typing import Callable, Dict, FrozenSet, NamedTuple, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+LOCALES_DIR = Path(__file__).parent / "locales"
+
+
+class Template(NamedTuple):
+    text: str
+    # None — строка без подстановок, иначе функция от словаря аргументов
+    render: Optional[Callable[[dict], str]] = None
+
+
+def compile_template(text: str) -> Template:
+    """
+    Разбирает строку один раз. Строки без подстановок потом не форматируются,
+    а шаблоны только с простыми {name} переводятся в %(name)s: оператор %
+    со словарём заметно быстрее str.format, который каждый раз разбирает строку.
+    """
+    parsed = list(Formatter().parse(text))
+    fields = [(field, spec, conversion) for _, field, spec, conversion in parsed if field is not None]
+    if not fields:
+        # Экранированные {{ }} без подстановок раскрываем заранее
+        return Template(text.format() if "{" in text or "}" in text else text)
+    if all(field.isidentifier() and not spec and not conversion for field, spec, conversion in fields):
+        pattern = "".join(
+            literal.replace("%", "%%") + (f"%({field})s" if field is not None else "")
+            for literal, field, _, _ in parsed
+        )
+        return Template(text, pattern.__mod__)
+    return Template(text, text.format_map)
+
+
+class Catalog:
+    def __init__(self, directory: Path = LOCALES_DIR, fallback: str = "en"):
+        self.directory = directory
+        self.fallback = fallback
+        self._tables: Dict[str, Dict[str, Template]] = {}
+        self._available: Optional[FrozenSet[str]] = None
+        self._reported: Set[Tuple[str, str]] = set()
+
+    @property
+    def languages(self) -> FrozenSet[str]:
+        """Языки, для которых есть файл; список читается один раз."""
+        if self._available is None:
+            self._available = frozenset(path.stem for path in self.directory.glob("*.json"))
+        return self._available
+
+    def table(self, lang: str) -> Dict[str, Template]:
+        table = self._tables.get(lang)
+        if table is None:
+            table = self._load(lang)
+            self._tables[lang] = table
+        return table
+
+    def _load(self, lang: str) -> Dict[str, Template]:
+        if lang not in self.languages:
+            return {}
+        try:
+            with open(self.directory / f"{lang}.json", encoding="utf-8") as f:
+                raw = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error("Failed to load translations for '%s': %s", lang, e)
+            return {}
+        logger.debug("Loaded %d translation(s) for '%s'", len(raw), lang)
+        return {key: compile_template(text) for key, text in raw.items()}
+
+    def lookup(self, lang: str, key: str) -> Template:
+        """Шаблон ключа: из языка lang, иначе из запасного языка, иначе сам ключ."""
+        template = self.table(lang).get(key)
+        if template is not None:
+            return template
+        if (lang, key) not in self._reported:
+            self._reported.add((lang, key))
+            logger.warning("Missing translation for key '%s' in language '%s'", key, lang)
+        template = self.table(self.fallback).get(key) if lang != self.fallback else None
+        return template if template is not None else Template(key)
+
+    @property
+    def loaded(self) -> FrozenSet[str]:
+        return frozenset(self._tables)
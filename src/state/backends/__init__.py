@@ -0,0 +1,25 @@
+from typing import Optional
+from config.settings import settings
+from src.state.backends.base import StateBackend
+
+
+def create_backend(name: Optional[str] = None) -> Optional[StateBackend]:
+    """
+    Создаёт бэкенд состояния по имени из настроек.
+    Для "memory" возвращает None — StateManager работает только в памяти.
+    """
+    name = (name or settings.state_backend).lower()
+
+    if name == "memory":
+        return None
+    if name == "sqlite":
+        from src.state.backends.sqlite import SQLiteBackend
+        return SQLiteBackend()
+    if name == "redis":
+        from src.state.backends.redis import RedisBackend
+        return RedisBackend()
+
+    raise ValueError(f"Unknown state backend: {name}")
+
+
+__all__ = ["StateBackend", "create_backend"]
@@ -0,0 +1,44 @@
+from abc import ABC, abstractmethod
+from typing import List, Optional
+from src.state.models import UserSession, ChatMessage
+
+
+class StateBackend(ABC):
+    """
+    Долговременное хранилище сессий и сообщений для StateManager.
+
+    StateManager держит горячие данные в памяти и обращается к бэкенду
+    только при промахе кэша и для записи изменений.
+
+    Бэкенд с shared = True разделяют несколько процессов бота, поэтому
+    StateManager не доверяет своим копиям и перечитывает сессию и историю
+    из бэкенда при каждом обращении.
+    """
+
+    shared = False
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    @abstractmethod
+    async def load_session(self, telegram_user_id: int) -> Optional[UserSession]:
+        ...
+
+    @abstractmethod
+    async def save_session(self, session: UserSession):
+        ...
+
+    @abstractmethod
+    async def append_message(self, message: ChatMessage):
+        ...
+
+    @abstractmethod
+    async def load_messages(self, session_id: str, limit: Optional[int] = None) -> List[ChatMessage]:
+        ...
+
+    @abstractmethod
+    async def clear_messages(self, session_id: str):
+        ...
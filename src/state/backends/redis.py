@@ -0,0 +1,171 @@
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+from config.settings import settings
+from src.state.backends.base import StateBackend
+from src.state.backends.resp import RespClient
+from src.state.models import UserSession, ChatMessage
+
+logger = logging.getLogger(__name__)
+
+
+class RedisBackend(StateBackend):
+    """
+    Общее для нескольких реплик бота хранилище по протоколу Redis.
+
+    Сессия хранится JSON-строкой под ключом {prefix}session:{user_id}, история —
+    списком JSON-сообщений под ключом {prefix}history:{session_id}, в котором
+    остаются только последние max_messages сообщений. Добавление сообщения
+    (RPUSH + LTRIM + EXPIRE истории и сессии) уходит одним pipeline, то есть
+    стоит одного обмена с сервером. Оба ключа живут ttl секунд с последней записи.
+
+    Чтения проходят через небольшой локальный кэш: свои записи сразу попадают
+    в него, а записи других реплик становятся видны не позже чем через
+    cache_ttl секунд.
+    """
+
+    shared = True
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        prefix: Optional[str] = None,
+        ttl: Optional[float] = None,
+        max_messages: Optional[int] = None,
+        cache_ttl: Optional[float] = None,
+        cache_size: Optional[int] = None,
+        client: Optional[RespClient] = None,
+    ):
+        self.client = client or RespClient(url or settings.state_redis_url)
+        self.prefix = settings.state_redis_prefix if prefix is None else prefix
+        self.ttl = int(settings.state_redis_ttl if ttl is None else ttl)
+        self.max_messages = max_messages or max(settings.state_hot_tail, settings.max_context_messages)
+        self.cache_ttl = settings.state_redis_cache_ttl if cache_ttl is None else cache_ttl
+        self.cache_size = settings.state_redis_cache_size if cache_size is None else cache_size
+
+        # ключ -> (момент устаревания, значение); порядок ключей — LRU
+        self._cache: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        # session_id -> ключ сессии, чтобы продлевать её TTL вместе с историей
+        self._session_keys: "OrderedDict[str, str]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def _session_key(self, telegram_user_id: int) -> str:
+        return f"{self.prefix}session:{telegram_user_id}"
+
+    def _history_key(self, session_id: str) -> str:
+        return f"{self.prefix}history:{session_id}"
+
+    async def start(self):
+        await self.client.connect()
+        await self.client.execute("PING")
+
+    async def close(self):
+        await self.client.close()
+        self._cache.clear()
+        logger.info("Redis state backend closed")
+
+    def _cache_get(self, key: str) -> Tuple[bool, Any]:
+        entry = self._cache.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            self.cache_misses += 1
+            return False, None
+        self._cache.move_to_end(key)
+        self.cache_hits += 1
+        return True, entry[1]
+
+    def _cache_put(self, key: str, value: Any, expires_at: Optional[float] = None):
+        if self.cache_size <= 0 or self.cache_ttl <= 0:
+            return
+        if expires_at is None:
+            expires_at = time.monotonic() + self.cache_ttl
+        self._cache[key] = (expires_at, value)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _remember_owner(self, session_id: str, session_key: str):
+        self._session_keys[session_id] = session_key
+        self._session_keys.move_to_end(session_id)
+        while len(self._session_keys) > max(self.cache_size, 1):
+            self._session_keys.popitem(last=False)
+
+    @staticmethod
+    def _encode_session(session: UserSession) -> str:
+        return json.dumps({
+            "id": session.id,
+            "telegram_user_id": session.telegram_user_id,
+            "username": session.username,
+            "first_name": session.first_name,
+            "language": session.language,
+            "conversation_context": session.conversation_context,
+            "created_at": session.created_at.isoformat(),
+            "updated_at": session.updated_at.isoformat(),
+        }, ensure_ascii=False)
+
+    @staticmethod
+    def _encode_message(message: ChatMessage) -> str:
+        return json.dumps({
+            "id": message.id,
+            "role": message.role,
+            "content": message.content,
+            "created_at": message.created_at.isoformat(),
+        }, ensure_ascii=False)
+
+    @staticmethod
+    def _decode_message(session_id: str, raw: bytes) -> ChatMessage:
+        return ChatMessage(session_id=session_id, **json.loads(raw))
+
+    async def load_session(self, telegram_user_id: int) -> Optional[UserSession]:
+        key = self._session_key(telegram_user_id)
+        found, session = self._cache_get(key)
+        if not found:
+            raw = await self.client.execute("GET", key)
+            session = UserSession(**json.loads(raw)) if raw is not None else None
+            self._cache_put(key, session)
+        if session is not None:
+            self._remember_owner(session.id, key)
+        return session
+
+    async def save_session(self, session: UserSession):
+        key = self._session_key(session.telegram_user_id)
+        await self.client.execute("SET", key, self._encode_session(session), "EX", self.ttl)
+        self._cache_put(key, session)
+        self._remember_owner(session.id, key)
+
+    async def append_message(self, message: ChatMessage):
+        key = self._history_key(message.session_id)
+        commands = [
+            ("RPUSH", key, self._encode_message(message)),
+            ("LTRIM", key, -self.max_messages, -1),
+            ("EXPIRE", key, self.ttl),
+        ]
+        session_key = self._session_keys.get(message.session_id)
+        if session_key is not None:
+            commands.append(("EXPIRE", session_key, self.ttl))
+        await self.client.pipeline(commands)
+
+        # Своя запись обновляет кэш, но не продлевает его: записи других реплик
+        # по-прежнему станут видны не позже истечения cache_ttl
+        entry = self._cache.get(key)
+        if entry is not None:
+            history = entry[1] + [message]
+            self._cache_put(key, history[-self.max_messages:], entry[0])
+
+    async def load_messages(self, session_id: str, limit: Optional[int] = None) -> List[ChatMessage]:
+        key = self._history_key(session_id)
+        found, history = self._cache_get(key)
+        if not found:
+            rows = await self.client.execute("LRANGE", key, -self.max_messages, -1)
+            history = [self._decode_message(session_id, row) for row in rows]
+            self._cache_put(key, history)
+        if limit:
+            history = history[-limit:]
+        return list(history)
+
+    async def clear_messages(self, session_id: str):
+        key = self._history_key(session_id)
+        await self.client.execute("DEL", key)
+        self._cache.pop(key, None)
@@ -0,0 +1,165 @@
+"""
+Минимальный асинхронный клиент протокола Redis (RESP2).
+
+Одно TCP-соединение обслуживает все корутины: команды пишутся в сокет
+сразу, а ответы разбирает фоновая задача и отдаёт их ожидающим в порядке
+отправки. Поэтому несколько команд, отправленных через pipeline(), и
+параллельные запросы разных обработчиков не ждут друг друга — каждый
+pipeline стоит ровно одного обмена с сервером.
+"""
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Deque, List, Optional, Sequence
+from urllib.parse import unquote, urlsplit
+from src.utils.exceptions import StateBackendError
+
+logger = logging.getLogger(__name__)
+
+Command = Sequence[Any]
+
+
+def encode_command(*args: Any) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, bytes):
+            data = arg
+        elif isinstance(arg, str):
+            data = arg.encode()
+        else:
+            data = str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+async def read_reply(reader: asyncio.StreamReader) -> Any:
+    """Читает один ответ; ошибка сервера возвращается как экземпляр StateBackendError."""
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("Connection closed by server")
+    kind, payload = line[:1], line[1:-2]
+    if kind == b"+":
+        return payload.decode()
+    if kind == b"-":
+        return StateBackendError(payload.decode())
+    if kind == b":":
+        return int(payload)
+    if kind == b"$":
+        length = int(payload)
+        if length < 0:
+            return None
+        data = await reader.readexactly(length + 2)
+        return data[:-2]
+    if kind == b"*":
+        count = int(payload)
+        if count < 0:
+            return None
+        return [await read_reply(reader) for _ in range(count)]
+    raise ConnectionError(f"Unexpected reply type: {line[:20]!r}")
+
+
+class RespClient:
+    def __init__(self, url: str = "redis://127.0.0.1:6379/0", timeout: float = 5.0):
+        parts = urlsplit(url)
+        if parts.scheme != "redis":
+            raise ValueError(f"Unsupported Redis URL scheme: {parts.scheme}")
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 6379
+        self.password = unquote(parts.password) if parts.password else None
+        self.username = unquote(parts.username) if parts.username else None
+        self.db = int(parts.path.lstrip("/") or 0)
+        self.timeout = timeout
+
+        # Число обменов с сервером — для проверки, что pipeline не дробится
+        self.round_trips = 0
+
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._pending: Deque[asyncio.Future] = deque()
+        self._reader_task: Optional[asyncio.Task] = None
+        self._connect_lock = asyncio.Lock()
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def connect(self):
+        async with self._connect_lock:
+            if self.connected:
+                return
+            self._reader, self._writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), self.timeout
+            )
+            self._reader_task = asyncio.create_task(self._read_loop(self._reader))
+            setup: List[Command] = []
+            if self.password is not None:
+                setup.append(("AUTH", self.username, self.password) if self.username else ("AUTH", self.password))
+            if self.db:
+                setup.append(("SELECT", self.db))
+            if setup:
+                await self._execute(setup)
+            logger.info("Connected to Redis at %s:%s/%s", self.host, self.port, self.db)
+
+    async def close(self):
+        writer, self._writer = self._writer, None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            await asyncio.gather(self._reader_task, return_exceptions=True)
+            self._reader_task = None
+        self._fail_pending(ConnectionError("Connection closed"))
+
+    def _fail_pending(self, error: Exception):
+        while self._pending:
+            future = self._pending.popleft()
+            if not future.done():
+                future.set_exception(StateBackendError(f"Redis connection lost: {error}"))
+
+    async def _read_loop(self, reader: asyncio.StreamReader):
+        try:
+            while True:
+                reply = await read_reply(reader)
+                future = self._pending.popleft()
+                # Ожидающий мог отвалиться по таймауту — ответ всё равно нужно вычитать
+                if not future.done():
+                    future.set_result(reply)
+        except asyncio.CancelledError:
+            raise
+        except (ConnectionError, OSError, asyncio.IncompleteReadError, IndexError, ValueError) as e:
+            logger.warning("Redis connection lost: %s", e)
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            self._fail_pending(e)
+
+    async def _execute(self, commands: Sequence[Command]) -> List[Any]:
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in commands]
+        # Запись и постановка в очередь ожидания без await между ними сохраняют порядок ответов
+        self._writer.write(b"".join(encode_command(*command) for command in commands))
+        self._pending.extend(futures)
+        self.round_trips += 1
+        try:
+            replies = await asyncio.wait_for(asyncio.gather(*futures), self.timeout)
+        except asyncio.TimeoutError:
+            raise StateBackendError(f"Redis did not reply within {self.timeout}s")
+        for reply in replies:
+            if isinstance(reply, StateBackendError):
+                raise reply
+        return replies
+
+    async def pipeline(self, commands: Sequence[Command]) -> List[Any]:
+        """Отправляет команды одним пакетом и возвращает ответы в том же порядке."""
+        if not commands:
+            return []
+        if not self.connected:
+            await self.connect()
+        return await self._execute(commands)
+
+    async def execute(self, *args: Any) -> Any:
+        return (await self.pipeline([args]))[0]
@@ -0,0 +1,213 @@
+import asyncio
+import json
+import logging
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple
+from config.settings import settings
+from src.state.backends.base import StateBackend
+from src.state.models import UserSession, ChatMessage
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    telegram_user_id INTEGER NOT NULL UNIQUE,
+    username TEXT NOT NULL DEFAULT '',
+    first_name TEXT NOT NULL DEFAULT '',
+    language TEXT NOT NULL,
+    conversation_context TEXT NOT NULL DEFAULT '{}',
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS messages (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    session_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_id, seq);
+"""
+
+MessageRow = Tuple[str, str, str, str, str]
+
+
+class SQLiteBackend(StateBackend):
+    """
+    SQLite-хранилище в режиме WAL.
+
+    Все обращения к базе выполняются в отдельном потоке, чтобы не блокировать
+    цикл событий. Новые сообщения накапливаются в буфере и записываются одной
+    транзакцией раз в flush_interval секунд (или при заполнении batch_size).
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        flush_interval: Optional[float] = None,
+        batch_size: Optional[int] = None,
+    ):
+        self.path = path or settings.state_sqlite_path
+        self.flush_interval = settings.state_flush_interval if flush_interval is None else flush_interval
+        self.batch_size = batch_size or settings.state_flush_batch_size
+
+        self._conn: Optional[sqlite3.Connection] = None
+        # Один поток-исполнитель сериализует все операции с соединением
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-state")
+        self._pending: List[MessageRow] = []
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._flusher: Optional[asyncio.Task] = None
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _connect(self):
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        conn.commit()
+        self._conn = conn
+
+    async def start(self):
+        await self._run(self._connect)
+        self._flusher = asyncio.create_task(self._flush_loop())
+        logger.info("SQLite state backend opened at %s", self.path)
+
+    async def close(self):
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+
+        await self.flush()
+        if self._conn is not None:
+            await self._run(self._conn.close)
+            self._conn = None
+        self._executor.shutdown(wait=True)
+        logger.info("SQLite state backend closed")
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Записывает накопленные сообщения одной транзакцией."""
+        async with self._flush_lock:
+            if not self._pending or self._conn is None:
+                return
+            batch, self._pending = self._pending, []
+            try:
+                await self._run(self._write_messages, batch)
+                logger.debug("Flushed %d message(s) to SQLite", len(batch))
+            except Exception as e:
+                logger.error("Error flushing messages to SQLite, will retry: %s", e)
+                self._pending[:0] = batch
+
+    def _write_messages(self, batch: List[MessageRow]):
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO messages (id, session_id, role, content, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                batch,
+            )
+
+    async def load_session(self, telegram_user_id: int) -> Optional[UserSession]:
+        row = await self._run(self._select_session, telegram_user_id)
+        if row is None:
+            return None
+        return UserSession(
+            id=row[0],
+            telegram_user_id=row[1],
+            username=row[2],
+            first_name=row[3],
+            language=row[4],
+            conversation_context=json.loads(row[5]),
+            created_at=row[6],
+            updated_at=row[7],
+        )
+
+    def _select_session(self, telegram_user_id: int):
+        return self._conn.execute(
+            "SELECT id, telegram_user_id, username, first_name, language, "
+            "conversation_context, created_at, updated_at "
+            "FROM sessions WHERE telegram_user_id = ?",
+            (telegram_user_id,),
+        ).fetchone()
+
+    async def save_session(self, session: UserSession):
+        row = (
+            session.id,
+            session.telegram_user_id,
+            session.username,
+            session.first_name,
+            session.language,
+            json.dumps(session.conversation_context, ensure_ascii=False),
+            session.created_at.isoformat(),
+            session.updated_at.isoformat(),
+        )
+        await self._run(self._upsert_session, row)
+
+    def _upsert_session(self, row: tuple):
+        with self._conn:
+            self._conn.execute(
+                "INSERT INTO sessions (id, telegram_user_id, username, first_name, language, "
+                "conversation_context, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(telegram_user_id) DO UPDATE SET id = excluded.id, "
+                "username = excluded.username, first_name = excluded.first_name, "
+                "language = excluded.language, conversation_context = excluded.conversation_context, "
+                "updated_at = excluded.updated_at",
+                row,
+            )
+
+    async def append_message(self, message: ChatMessage):
+        self._pending.append((
+            message.id,
+            message.session_id,
+            message.role,
+            message.content,
+            message.created_at.isoformat(),
+        ))
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    async def load_messages(self, session_id: str, limit: Optional[int] = None) -> List[ChatMessage]:
+        await self.flush()
+        rows = await self._run(self._select_messages, session_id, limit)
+        return [
+            ChatMessage(id=row[0], session_id=row[1], role=row[2], content=row[3], created_at=row[4])
+            for row in reversed(rows)
+        ]
+
+    def _select_messages(self, session_id: str, limit: Optional[int]):
+        return self._conn.execute(
+            "SELECT id, session_id, role, content, created_at FROM messages "
+            "WHERE session_id = ? ORDER BY seq DESC LIMIT ?",
+            (session_id, limit if limit else -1),
+        ).fetchall()
+
+    async def clear_messages(self, session_id: str):
+        await self.flush()
+        await self._run(self._delete_messages, session_id)
+
+    def _delete_messages(self, session_id: str):
+        with self._conn:
+            self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
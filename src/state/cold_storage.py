@@ -0,0 +1,104 @@
+"""
+Холодный уровень хранения истории: сжатые архивы простаивающих сессий.
+
+История сериализуется marshal (кортежи строк и чисел, без накладных
+расходов на объекты) и сжимается zlib или zstd. Пакет zstandard
+необязателен: без него вместо zstd используется zlib.
+"""
+import logging
+import marshal
+import zlib
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+from src.state.records import MessageRecord
+
+logger = logging.getLogger(__name__)
+
+
+class Codec(NamedTuple):
+    name: str
+    compress: Callable[[bytes], bytes]
+    decompress: Callable[[bytes], bytes]
+
+
+def _zstd_codec(level: int) -> Optional[Codec]:
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    compressor = zstandard.ZstdCompressor(level=level)
+    decompressor = zstandard.ZstdDecompressor()
+    return Codec("zstd", compressor.compress, decompressor.decompress)
+
+
+def get_codec(name: str = "zlib", level: int = 6) -> Codec:
+    name = name.lower()
+    if name == "zstd":
+        codec = _zstd_codec(level)
+        if codec is not None:
+            return codec
+        logger.warning("zstandard is not installed, falling back to zlib for the cold tier")
+    elif name != "zlib":
+        raise ValueError(f"Unknown cold tier codec: {name}")
+    return Codec("zlib", lambda data: zlib.compress(data, level), zlib.decompress)
+
+
+def pack_history(messages: Iterable[MessageRecord]) -> bytes:
+    return marshal.dumps([(m.role, m.content, m.created_at, m.tokens) for m in messages])
+
+
+def unpack_history(data: bytes) -> List[MessageRecord]:
+    return [MessageRecord(*fields) for fields in marshal.loads(data)]
+
+
+class ColdStore:
+    """Сжатые архивы истории по session_id с учётом исходного и сжатого размера."""
+
+    def __init__(self, codec: Codec):
+        self.codec = codec
+        self._blobs: Dict[str, bytes] = {}
+        self._raw_sizes: Dict[str, int] = {}
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._blobs
+
+    def __len__(self) -> int:
+        return len(self._blobs)
+
+    @property
+    def compression_ratio(self) -> float:
+        """Во сколько раз архивы меньше исходной сериализованной истории."""
+        return self.raw_bytes / self.compressed_bytes if self.compressed_bytes else 0.0
+
+    def size(self, session_id: str) -> int:
+        blob = self._blobs.get(session_id)
+        return len(blob) if blob is not None else 0
+
+    def put(self, session_id: str, messages: Iterable[MessageRecord]) -> int:
+        """Архивирует историю и возвращает размер архива в байтах."""
+        self.discard(session_id)
+        raw = pack_history(messages)
+        blob = self.codec.compress(raw)
+        self._blobs[session_id] = blob
+        self._raw_sizes[session_id] = len(raw)
+        self.raw_bytes += len(raw)
+        self.compressed_bytes += len(blob)
+        return len(blob)
+
+    def pop(self, session_id: str) -> Optional[List[MessageRecord]]:
+        blob = self._blobs.get(session_id)
+        if blob is None:
+            return None
+        messages = unpack_history(self.codec.decompress(blob))
+        self.discard(session_id)
+        return messages
+
+    def discard(self, session_id: str) -> int:
+        """Удаляет архив и возвращает освобождённый размер в байтах."""
+        blob = self._blobs.pop(session_id, None)
+        if blob is None:
+            return 0
+        self.raw_bytes -= self._raw_sizes.pop(session_id)
+        self.compressed_bytes -= len(blob)
+        return len(blob)
@@ -1,65 +1,352 @@
+import asyncio
 import logging
-from typing import List, Dict, Optional
+import sys
+import time
+import uuid
+from collections import OrderedDict, deque
+from itertools import islice
+from typing import Deque, List, Dict, Optional
 from datetime import datetime
 from config.settings import settings
+from src.state.backends import StateBackend
+from src.state.models import UserSession, ChatMessage
+from src.state.cold_storage import ColdStore, get_codec
+from src.state.records import MessageRecord, SessionRecord
 from src.utils.exceptions import StateManagerError
+from src.utils.metrics import registry
+from src.ai.tokens import estimate_message_tokens
 from src.localization.messages import normalize_language_code
+from src.utils.tracing import traced
 
 logger = logging.getLogger(__name__)
 
+# Приблизительные накладные расходы на запись в памяти (см. benchmarks/bench_state_memory.py)
+SESSION_OVERHEAD_BYTES = 1400
+MESSAGE_OVERHEAD_BYTES = 100
+
+sessions_gauge = registry.gauge("state_sessions", "Sessions currently held in memory")
+memory_gauge = registry.gauge("state_estimated_bytes", "Estimated memory used by sessions and history")
+evictions_counter = registry.counter(
+    "state_evictions_total", "Sessions evicted from memory", labelnames=("reason",)
+)
+hot_sessions_gauge = registry.gauge("state_hot_sessions", "Sessions with uncompressed history in memory")
+cold_sessions_gauge = registry.gauge("state_cold_sessions", "Sessions with history archived in the cold tier")
+cold_bytes_gauge = registry.gauge("state_cold_bytes", "Compressed size of the cold tier")
+cold_ratio_gauge = registry.gauge(
+    "state_cold_compression_ratio", "Serialized to compressed size ratio of the cold tier"
+)
+rehydrate_latency = registry.histogram(
+    "state_rehydrate_seconds",
+    "Time to restore archived history from the cold tier",
+    buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05),
+)
+
+
+def _message_size(content: str) -> int:
+    return MESSAGE_OVERHEAD_BYTES + sys.getsizeof(content)
+
 
 class StateManager:
-    def __init__(self):
-        self.sessions: Dict[int, Dict] = {}
-        self.messages: Dict[str, List[Dict]] = {}
+    def __init__(self, backend: Optional[StateBackend] = None):
+        # Порядок ключей — порядок последнего обращения (LRU)
+        self.sessions: "OrderedDict[int, SessionRecord]" = OrderedDict()
+        # Индекс session_id -> сессия для поиска по id за O(1)
+        self.sessions_by_id: Dict[str, SessionRecord] = {}
+        self.messages: Dict[str, Deque[MessageRecord]] = {}
         self.max_context_messages = settings.max_context_messages
-        logger.info("StateManager initialized with in-memory storage")
+        self.backend = backend
+        # Общий для нескольких реплик бэкенд — источник истины, локальные копии лишь зеркалят его
+        self.shared = backend is not None and backend.shared
+
+        # История каждой сессии хранится в кольцевом буфере фиксированной ёмкости
+        self.history_capacity = max(settings.state_hot_tail, self.max_context_messages)
+        self.session_ttl = settings.state_session_ttl
+        self.max_sessions = settings.state_max_sessions
+        self.max_bytes = int(settings.state_max_memory_mb * 1024 * 1024)
+        self.sweep_interval = settings.state_sweep_interval
+        # Историю сессий, простаивающих дольше cold_after секунд, сжимаем в холодный уровень
+        self.cold_after = settings.state_cold_after
+        self.cold = ColdStore(get_codec(settings.state_cold_codec, settings.state_cold_level))
+
+        self._history_bytes: Dict[str, int] = {}
+        self.estimated_bytes = 0
+        self._sweeper: Optional[asyncio.Task] = None
+
+        sessions_gauge.set_function(lambda: len(self.sessions))
+        memory_gauge.set_function(lambda: self.estimated_bytes)
+        hot_sessions_gauge.set_function(lambda: len(self.messages))
+        cold_sessions_gauge.set_function(lambda: len(self.cold))
+        cold_bytes_gauge.set_function(lambda: self.cold.compressed_bytes)
+        cold_ratio_gauge.set_function(lambda: self.cold.compression_ratio)
+
+        if backend is None:
+            logger.info("StateManager initialized with in-memory storage")
+        else:
+            logger.info("StateManager initialized with %s", type(backend).__name__)
+
+    async def start(self):
+        if self.backend is not None:
+            await self.backend.start()
+        if self.sweep_interval > 0 and (self.session_ttl > 0 or self.cold_after > 0):
+            self._sweeper = asyncio.create_task(self._sweep_loop())
+
+    async def close(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+        if self.backend is not None:
+            await self.backend.close()
+
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                self.evict_idle()
+                self.archive_idle()
+            except Exception as e:
+                logger.error("Error sweeping idle sessions: %s", e)
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """Выгружает сессии, к которым не обращались дольше session_ttl секунд."""
+        if self.session_ttl <= 0:
+            return 0
+        deadline = (now if now is not None else time.monotonic()) - self.session_ttl
+        evicted = 0
+        # Самые давние сессии — в начале OrderedDict, поэтому останавливаемся на первой свежей
+        while self.sessions:
+            user_id, session = next(iter(self.sessions.items()))
+            if session.last_active > deadline:
+                break
+            self._evict(user_id, "ttl")
+            evicted += 1
+        if evicted:
+            logger.info("Evicted %d idle session(s), %d remain", evicted, len(self.sessions))
+        return evicted
+
+    def archive_idle(self, now: Optional[float] = None) -> int:
+        """Сжимает в холодный уровень историю сессий, простаивающих дольше cold_after секунд."""
+        # Общий бэкенд и так перечитывает историю при каждом обращении
+        if self.cold_after <= 0 or self.shared:
+            return 0
+        deadline = (now if now is not None else time.monotonic()) - self.cold_after
+        archived = 0
+        for session in self.sessions.values():
+            if session.last_active > deadline:
+                break
+            if session.id in self.messages:
+                self._archive(session.id)
+                archived += 1
+        if archived:
+            logger.info(
+                "Archived %d idle session(s): %d hot, %d cold (%.1f KB, ratio %.2f)",
+                archived, len(self.messages), len(self.cold),
+                self.cold.compressed_bytes / 1024, self.cold.compression_ratio,
+            )
+        return archived
+
+    def _archive(self, session_id: str):
+        history = self.messages.pop(session_id)
+        self.estimated_bytes -= self._history_bytes.pop(session_id, 0)
+        # Пустую историю хранить незачем: _get_history создаст новую
+        if history:
+            self.estimated_bytes += self.cold.put(session_id, history)
+
+    def _rehydrate(self, session_id: str) -> bool:
+        started = time.perf_counter()
+        size = self.cold.size(session_id)
+        history = self.cold.pop(session_id)
+        if history is None:
+            return False
+        self.estimated_bytes -= size
+        self._set_history(session_id, history)
+        rehydrate_latency.observe(time.perf_counter() - started)
+        return True
+
+    def _enforce_limits(self):
+        while self.sessions and (
+            (self.max_sessions > 0 and len(self.sessions) > self.max_sessions)
+            or (self.max_bytes > 0 and self.estimated_bytes > self.max_bytes)
+        ):
+            user_id = next(iter(self.sessions))
+            self._evict(user_id, "capacity")
+
+    def _evict(self, telegram_user_id: int, reason: str):
+        session = self.sessions.pop(telegram_user_id)
+        self.sessions_by_id.pop(session.id, None)
+        self._drop_history(session.id)
+        self.estimated_bytes -= SESSION_OVERHEAD_BYTES
+        evictions_counter.inc(reason=reason)
+        logger.debug("Evicted session for user %s (%s)", telegram_user_id, reason)
+
+    def _drop_history(self, session_id: str):
+        self.messages.pop(session_id, None)
+        self.estimated_bytes -= self._history_bytes.pop(session_id, 0)
+        self.estimated_bytes -= self.cold.discard(session_id)
+
+    def _touch(self, telegram_user_id: int, session: SessionRecord):
+        session.last_active = time.monotonic()
+        self.sessions.move_to_end(telegram_user_id)
+
+    def _add_session(self, session: SessionRecord):
+        session.last_active = time.monotonic()
+        self.sessions[session.telegram_user_id] = session
+        self.sessions_by_id[session.id] = session
+        self.estimated_bytes += SESSION_OVERHEAD_BYTES
+
+    def _set_history(self, session_id: str, messages: List[MessageRecord]):
+        self._drop_history(session_id)
+        history = deque(maxlen=self.history_capacity)
+        self.messages[session_id] = history
+        self._history_bytes[session_id] = 0
+        for message in messages:
+            self._append_history(session_id, history, message)
+
+    def _append_history(self, session_id: str, history: Deque[MessageRecord], message: MessageRecord):
+        if not message.tokens:
+            message.tokens = estimate_message_tokens(message)
+        size = _message_size(message.content)
+        if len(history) == history.maxlen:
+            size -= _message_size(history[0].content)
+        history.append(message)
+        self._history_bytes[session_id] += size
+        self.estimated_bytes += size
+
+    @staticmethod
+    def _session_from_model(model: UserSession) -> SessionRecord:
+        return SessionRecord(
+            id=model.id,
+            telegram_user_id=model.telegram_user_id,
+            username=model.username,
+            first_name=model.first_name,
+            language=model.language,
+            conversation_context=model.conversation_context,
+            created_at=model.created_at.timestamp(),
+        )
+
+    @staticmethod
+    def _history_from_models(messages: List[ChatMessage]) -> List[MessageRecord]:
+        return [MessageRecord(msg.role, msg.content, msg.created_at.timestamp()) for msg in messages]
+
+    async def _persist_session(self, session: SessionRecord):
+        if self.backend is None:
+            return
+        await self.backend.save_session(UserSession(
+            id=session.id,
+            telegram_user_id=session.telegram_user_id,
+            username=session.username,
+            first_name=session.first_name,
+            language=session.language,
+            conversation_context=session.conversation_context,
+            created_at=session.created_datetime,
+            updated_at=datetime.now(),
+        ))
+
+    async def _load_session(self, telegram_user_id: int) -> Optional[SessionRecord]:
+        if self.backend is None:
+            return None
+
+        model = await self.backend.load_session(telegram_user_id)
+        if model is None:
+            return None
 
+        session = self._session_from_model(model)
+        cached = self.sessions.get(telegram_user_id)
+        if cached is not None:
+            # Общий бэкенд: обновляем локальную копию, историю перечитает _get_history
+            if cached.id != session.id:
+                self._drop_history(cached.id)
+                self.sessions_by_id.pop(cached.id, None)
+                self.sessions_by_id[session.id] = cached
+            cached.update_from(session)
+            return cached
+
+        tail = await self.backend.load_messages(session.id, self.history_capacity)
+        self._add_session(session)
+        self._set_history(session.id, self._history_from_models(tail))
+        self._enforce_limits()
+        logger.info("Loaded session for user %s from storage", telegram_user_id)
+        return session
+
+    async def _load_tail(self, session_id: str) -> List[MessageRecord]:
+        if self.backend is None:
+            return []
+        return self._history_from_models(await self.backend.load_messages(session_id, self.history_capacity))
+
+    async def _get_history(self, session_id: str) -> Deque[MessageRecord]:
+        history = self.messages.get(session_id)
+        if history is None and session_id in self.cold and self._rehydrate(session_id):
+            return self.messages[session_id]
+        if history is None or self.shared:
+            tail = await self._load_tail(session_id)
+            if session_id not in self.sessions_by_id:
+                # Сессию выгрузили (в том числе пока шёл запрос к модели): историю без сессии
+                # в индексе не освободит ни одна выгрузка, поэтому в памяти её не заводим
+                return deque(tail, maxlen=self.history_capacity)
+            self._set_history(session_id, tail)
+            history = self.messages[session_id]
+        return history
+
+    @traced("state.session")
     async def get_or_create_session(
         self,
         telegram_user_id: int,
         username: str = "",
         first_name: str = "",
         language_code: Optional[str] = None,
-    ) -> Dict:
+    ) -> SessionRecord:
         try:
-            if telegram_user_id in self.sessions:
-                session = self.sessions[telegram_user_id]
+            session = self.sessions.get(telegram_user_id)
+            if session is None or self.shared:
+                session = await self._load_session(telegram_user_id)
+
+            if session is not None:
+                self._touch(telegram_user_id, session)
 
                 # Обновляем язык, если он изменился
                 if language_code:
                     normalized_lang = normalize_language_code(language_code)
-                    if session.get("language") != normalized_lang:
-                        session["language"] = normalized_lang
+                    if session.language != normalized_lang:
+                        session.language = normalized_lang
+                        await self._persist_session(session)
                         logger.info(
-                            f"Updated language for user {telegram_user_id} to {normalized_lang}"
+                            "Updated language for user %s to %s", telegram_user_id, normalized_lang
                         )
 
-                logger.info(f"Found existing session for user {telegram_user_id}")
+                logger.debug("Found existing session for user %s", telegram_user_id)
                 return session
 
+            if telegram_user_id in self.sessions:
+                # Сессия истекла в общем бэкенде — локальная копия больше не действительна
+                self._evict(telegram_user_id, "expired")
+
             session_id = f"session_{telegram_user_id}_{datetime.now().timestamp()}"
             normalized_lang = normalize_language_code(language_code)
-            new_session = {
-                "id": session_id,
-                "telegram_user_id": telegram_user_id,
-                "username": username,
-                "first_name": first_name,
-                 "language": normalized_lang,
-                "conversation_context": {},
-                "created_at": datetime.now().isoformat()
-            }
-
-            self.sessions[telegram_user_id] = new_session
-            self.messages[session_id] = []
-
-            logger.info(f"Created new session for user {telegram_user_id}")
+            new_session = SessionRecord(
+                id=session_id,
+                telegram_user_id=telegram_user_id,
+                username=username,
+                first_name=first_name,
+                language=normalized_lang,
+                created_at=time.time(),
+            )
+
+            self._add_session(new_session)
+            self._set_history(session_id, [])
+            self._enforce_limits()
+            await self._persist_session(new_session)
+
+            logger.info("Created new session for user %s", telegram_user_id)
             return new_session
 
         except Exception as e:
-            logger.error(f"Error getting/creating session: {e}")
+            logger.error("Error getting/creating session: %s", e)
             raise StateManagerError(f"Failed to manage session: {str(e)}")
 
+    @traced("state.save")
     async def save_message(
         self,
         session_id: str,
@@ -67,64 +354,93 @@ class StateManager:
         content: str
     ):
         try:
-            if session_id not in self.messages:
-                self.messages[session_id] = []
+            created_at = time.time()
+            message = MessageRecord(role, content, created_at)
 
-            message = {
-                "role": role,
-                "content": content,
-                "created_at": datetime.now().isoformat()
-            }
+            if session_id in self.sessions_by_id:
+                if self.shared:
+                    # Общий бэкенд перечитывается при каждом чтении истории: перед записью
+                    # его не читаем, а локальную копию дописываем, только если она уже есть
+                    history = self.messages.get(session_id)
+                else:
+                    history = await self._get_history(session_id)
+                # Пока история читалась, сессию могли выгрузить
+                if history is not None and self.messages.get(session_id) is history:
+                    self._append_history(session_id, history, message)
+            else:
+                # Выгруженная сессия: сообщение попадает только в хранилище
+                logger.debug("Session %s is not in memory, saving message to storage only", session_id)
 
-            self.messages[session_id].append(message)
-            logger.debug(f"Saved message for session {session_id}")
+            if self.backend is not None:
+                await self.backend.append_message(ChatMessage(
+                    id=uuid.uuid4().hex,
+                    session_id=session_id,
+                    role=role,
+                    content=content,
+                    created_at=datetime.fromtimestamp(created_at),
+                ))
+
+            self._enforce_limits()
+            logger.debug("Saved message for session %s", session_id)
 
         except Exception as e:
-            logger.error(f"Error saving message: {e}")
+            logger.error("Error saving message: %s", e)
             raise StateManagerError(f"Failed to save message: {str(e)}")
 
+    @traced("state.history")
     async def get_conversation_history(
         self,
         session_id: str,
         limit: Optional[int] = None
     ) -> List[Dict[str, str]]:
+        """
+        Возвращает последние limit сообщений сессии; limit=0 — всю историю в памяти.
+        Обрезку под бюджет токенов делает format_conversation_history: только там
+        известны системный промпт и новое сообщение пользователя.
+        """
         try:
+            if session_id not in self.messages and session_id not in self.cold and self.backend is None:
+                return []
+
+            all_messages = await self._get_history(session_id)
+
             if limit is None:
                 limit = self.max_context_messages
+            start = max(0, len(all_messages) - limit) if limit else 0
+            messages = islice(all_messages, start, None)
 
-            if session_id not in self.messages:
-                return []
-            
-            all_messages = self.messages[session_id]
-            
-            messages = all_messages[-limit:] if limit else all_messages
-            
-            result = [{"role": msg["role"], "content": msg["content"]} for msg in messages]
-
-            logger.debug(f"Retrieved {len(result)} messages for session {session_id}")
+            result = [{"role": msg.role, "content": msg.content} for msg in messages]
+
+            logger.debug("Retrieved %d messages for session %s", len(result), session_id)
             return result
 
         except Exception as e:
-            logger.error(f"Error getting conversation history: {e}")
+            logger.error("Error getting conversation history: %s", e)
             raise StateManagerError(f"Failed to get history: {str(e)}")
 
     async def reset_conversation(self, telegram_user_id: int):
         try:
-            if telegram_user_id not in self.sessions:
-                logger.warning(f"No session found for user {telegram_user_id}")
-                return
+            if telegram_user_id not in self.sessions or self.shared:
+                if await self._load_session(telegram_user_id) is None:
+                    logger.warning("No session found for user %s", telegram_user_id)
+                    return
 
-            session_id = self.sessions[telegram_user_id]["id"]
-            
-            if session_id in self.messages:
-                self.messages[session_id] = []
-            
-            self.sessions[telegram_user_id]["conversation_context"] = {}
+            session = self.sessions[telegram_user_id]
+            session_id = session.id
 
-            logger.info(f"Reset conversation for user {telegram_user_id}")
+            if session_id in self.messages or session_id in self.cold:
+                self._set_history(session_id, [])
+
+            session.conversation_context = {}
+
+            if self.backend is not None:
+                await self.backend.clear_messages(session_id)
+                await self._persist_session(session)
+
+            logger.info("Reset conversation for user %s", telegram_user_id)
 
         except Exception as e:
-            logger.error(f"Error resetting conversation: {e}")
+            logger.error("Error resetting conversation: %s", e)
             raise StateManagerError(f"Failed to reset conversation: {str(e)}")
 
     async def get_user_language(self, telegram_user_id: int) -> str:
@@ -133,13 +449,15 @@ class StateManager:
         """
         try:
             session = self.sessions.get(telegram_user_id)
-            if session and "language" in session:
-                return session["language"]
+            if session is None or self.shared:
+                session = await self._load_session(telegram_user_id)
+            if session is not None and session.language:
+                return session.language
 
             return settings.default_language
 
         except Exception as e:
-            logger.error(f"Error getting user language: {e}")
+            logger.error("Error getting user language: %s", e)
             return settings.default_language
 
     async def update_session_context(
@@ -148,14 +466,15 @@ class StateManager:
         context: Dict
     ):
         try:
-            for user_id, session in self.sessions.items():
-                if session["id"] == session_id:
-                    session["conversation_context"] = context
-                    logger.debug(f"Updated context for session {session_id}")
-                    return
-            
-            logger.warning(f"Session {session_id} not found for context update")
+            session = self.sessions_by_id.get(session_id)
+            if session is None:
+                logger.warning("Session %s not found for context update", session_id)
+                return
+
+            session.conversation_context = context
+            await self._persist_session(session)
+            logger.debug("Updated context for session %s", session_id)
 
         except Exception as e:
-            logger.error(f"Error updating session context: {e}")
+            logger.error("Error updating session context: %s", e)
             raise StateManagerError(f"Failed to update context: {str(e)}")
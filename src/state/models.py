@@ -8,6 +8,7 @@ class UserSession(BaseModel):
     telegram_user_id: int
     username: str = ""
     first_name: str = ""
+    language: str = "ru"
     conversation_context: Dict = {}
     created_at: datetime
     updated_at: datetime
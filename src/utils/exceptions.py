@@ -8,3 +8,11 @@ class StateManagerError(Exception):
 
 class ContentFilterError(Exception):
     pass
+
+
+class RateLimitError(AIClientError):
+    pass
+
+
+class StateBackendError(StateManagerError):
+    pass
@@ -0,0 +1,153 @@
+"""
+Минимальный встроенный HTTP/1.1 сервер на asyncio.
+
+Используется там, где боту нужно принимать HTTP-запросы (webhook Telegram),
+без зависимости от отдельного веб-фреймворка. Поддерживает keep-alive,
+Content-Length и ограничение размера тела запроса.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+REASONS = {
+    200: "OK",
+    204: "No Content",
+    400: "Bad Request",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    429: "Too Many Requests",
+    500: "Internal Server Error",
+    502: "Bad Gateway",
+    503: "Service Unavailable",
+}
+
+MAX_HEADER_LINES = 100
+
+
+class HttpRequest(NamedTuple):
+    method: str
+    path: str
+    query: str
+    headers: Dict[str, str]
+    body: bytes
+
+
+class HttpResponse(NamedTuple):
+    status: int = 200
+    body: bytes = b""
+    content_type: str = "text/plain; charset=utf-8"
+    headers: Optional[Dict[str, str]] = None
+
+
+Handler = Callable[[HttpRequest], Awaitable[HttpResponse]]
+
+
+class HttpServer:
+    def __init__(
+        self,
+        handler: Handler,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        max_body_size: int = 1024 * 1024,
+        idle_timeout: float = 60.0,
+    ):
+        self.handler = handler
+        self.host = host
+        self.port = port
+        self.max_body_size = max_body_size
+        self.idle_timeout = idle_timeout
+        self._server: Optional[asyncio.base_events.Server] = None
+
+    async def start(self) -> int:
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[HttpRequest]:
+        request_line = await asyncio.wait_for(reader.readline(), self.idle_timeout)
+        if not request_line:
+            return None
+        method, target, _ = request_line.decode("latin-1").split(" ", 2)
+
+        headers = {}
+        for _ in range(MAX_HEADER_LINES):
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get("content-length", "0"))
+        if length > self.max_body_size:
+            raise _PayloadTooLarge()
+        body = await reader.readexactly(length) if length else b""
+
+        url = urlsplit(target)
+        return HttpRequest(method.upper(), url.path, url.query, headers, body)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except _PayloadTooLarge:
+                    self._write(writer, HttpResponse(413), keep_alive=False)
+                    await writer.drain()
+                    break
+                except ValueError:
+                    self._write(writer, HttpResponse(400), keep_alive=False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+
+                try:
+                    response = await self.handler(request)
+                except Exception as e:
+                    logger.error("HTTP handler failed for %s %s: %s", request.method, request.path, e, exc_info=True)
+                    response = HttpResponse(500)
+
+                keep_alive = request.headers.get("connection", "").lower() != "close"
+                self._write(writer, response, keep_alive, head=request.method == "HEAD")
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _write(writer: asyncio.StreamWriter, response: HttpResponse, keep_alive: bool, head: bool = False):
+        lines = [
+            f"HTTP/1.1 {response.status} {REASONS.get(response.status, 'OK')}",
+            f"Content-Type: {response.content_type}",
+            f"Content-Length: {len(response.body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        for name, value in (response.headers or {}).items():
+            lines.append(f"{name}: {value}")
+        payload = b"" if head else response.body
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + payload)
+
+
+class _PayloadTooLarge(Exception):
+    pass
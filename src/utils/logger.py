@@ -11,14 +11,14 @@ def log_async_errors(func: Callable):
         try:
             return await func(*args, **kwargs)
         except Exception as e:
-            logger.error(f"Error in {func.__name__}: {e}", exc_info=True)
+            logger.error("Error in %s: %s", func.__name__, e, exc_info=True)
             raise
     return wrapper
 
 
 def log_user_interaction(user_id: int, username: str, message: str):
-    logger.info(f"User {user_id} (@{username}): {message[:100]}")
+    logger.info("User %s (@%s): %.100s", user_id, username, message)
 
 
 def log_bot_response(user_id: int, response: str):
-    logger.info(f"Bot response to {user_id}: {response[:100]}")
+    logger.info("Bot response to %s: %.100s", user_id, response)
@@ -0,0 +1,131 @@
+"""
+Локальная проверка разметки Telegram Markdown (ParseMode.MARKDOWN, v1).
+
+Разбор повторяет правила Bot API: сущность *жирного*, _курсива_, `кода`,
+```блока кода``` или [ссылки] закрывается ближайшим таким же символом,
+вложенности нет, а незакрытая сущность — ошибка "Can't find end of the
+entity". Проверив текст заранее, можно не тратить запрос на отправку,
+которую Telegram всё равно отклонит.
+"""
+import re
+from typing import List, NamedTuple, Tuple
+
+ESCAPABLE = "_*`["
+
+_SPECIAL = re.compile(r"[\\_*`\[]")
+_LANGUAGE = re.compile(r"[^\s`]*")
+# Более длинная сплошная строка после ``` — уже код, а не название языка
+MAX_LANGUAGE = 32
+
+_CLOSERS = {"*": "*", "_": "_", "`": "`", "[": "]"}
+
+
+class Entity(NamedTuple):
+    start: int
+    end: int
+    # Открывающая и закрывающая разметка; для ссылок closer пустой — их не разрывают
+    opener: str
+    closer: str
+
+    @property
+    def is_pre(self) -> bool:
+        return self.opener.startswith("```")
+
+    @property
+    def is_link(self) -> bool:
+        return self.opener == "["
+
+
+def scan(text: str) -> Tuple[List[Entity], List[int]]:
+    """
+    Разбирает text за линейное время.
+    Возвращает сущности в порядке следования и позиции незакрытых сущностей.
+    Незакрытый символ считается обычным текстом, и разбор продолжается дальше,
+    как после экранирования.
+    """
+    entities: List[Entity] = []
+    unclosed: List[int] = []
+    # Закрывающие символы, которых правее уже точно нет: повторный поиск не нужен
+    exhausted = set()
+    size = len(text)
+    position = 0
+
+    while True:
+        match = _SPECIAL.search(text, position)
+        if match is None:
+            break
+        start = match.start()
+        char = text[start]
+
+        if char == "\\":
+            escaped = start + 1 < size and text[start + 1] in ESCAPABLE
+            position = start + 2 if escaped else start + 1
+            continue
+
+        if text.startswith("```", start):
+            content = start + 3
+            language_end = _LANGUAGE.match(text, content).end()
+            if (language_end == content or language_end - content > MAX_LANGUAGE
+                    or language_end >= size or text[language_end] == "`"):
+                language_end = content
+            closer = "```"
+            close = -1 if closer in exhausted else text.find(closer, language_end)
+            if close == -1:
+                exhausted.add(closer)
+                unclosed.append(start)
+                position = start + 1
+                continue
+            end = close + 3
+            entities.append(Entity(start, end, text[start:language_end], closer))
+            position = end
+            continue
+
+        closer = _CLOSERS[char]
+        close = -1 if closer in exhausted else text.find(closer, start + 1)
+        if close == -1:
+            exhausted.add(closer)
+            unclosed.append(start)
+            position = start + 1
+            continue
+
+        end = close + 1
+        if char == "[":
+            if end < size and text[end] == "(":
+                url_end = text.find(")", end + 1)
+                end = size if url_end == -1 else url_end + 1
+            entities.append(Entity(start, end, "[", ""))
+        else:
+            entities.append(Entity(start, end, char, closer))
+        position = end
+
+    return entities, unclosed
+
+
+def is_valid_markdown(text: str) -> bool:
+    return not scan(text)[1]
+
+
+def escape_unclosed(text: str) -> str:
+    """Экранирует незакрытые символы разметки, сохраняя остальное форматирование."""
+    unclosed = scan(text)[1]
+    if not unclosed:
+        return text
+    parts = []
+    position = 0
+    for index in unclosed:
+        parts.append(text[position:index])
+        parts.append("\\")
+        position = index
+    parts.append(text[position:])
+    return "".join(parts)
+
+
+def prepare_markdown(text: str) -> Tuple[str, bool]:
+    """
+    Готовит часть сообщения к отправке с ParseMode.MARKDOWN.
+    Возвращает текст и признак того, что его можно отправлять с разметкой.
+    """
+    escaped = escape_unclosed(text)
+    if is_valid_markdown(escaped):
+        return escaped, True
+    return text, False
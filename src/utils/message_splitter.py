@@ -1,61 +1,116 @@
 """
 Утилита для разбиения длинных сообщений на части для отправки в Telegram.
 """
-def split_message(text: str, max_size: int = 4090) -> list[str]:
-    """
-    Разделяет длинное сообщение с Markdown-разметкой на части для Telegram.
+from bisect import bisect_right
+from typing import Iterator, List, Optional
+from src.utils.markdown import ESCAPABLE, Entity, scan
 
-    Функция разбивает текст на чанки, размер которых не превышает max_size.
-    Она отслеживает состояние блоков кода (```) и, если разрыв происходит
-    внутри такого блока, корректно закрывает его в текущем чанке с помощью '```
-    и заново открывает в следующем.
+# Наибольшая длина закрывающей разметки в конце части — "\n```"
+CLOSING_RESERVE = 4
 
-    Args:
-        text: Входной текст с Markdown-разметкой.
-        max_size: Максимальный размер одного чанка (по умолчанию 4096).
 
-    Returns:
-        Список строк (чанков), готовых к отправке.
+def _entity_at(entities: List[Entity], starts: List[int], position: int) -> Optional[Entity]:
+    """Сущность, внутри которой (строго) находится позиция разреза."""
+    index = bisect_right(starts, position - 1) - 1
+    if index >= 0 and entities[index].end > position:
+        return entities[index]
+    return None
+
+
+def _find_cut(text: str, entities: List[Entity], starts: List[int], position: int, budget: int):
+    """Выбирает место разреза; возвращает позицию, длину пропускаемого разделителя и открытую сущность."""
+    limit = max(position + 1, position + budget)
+    cut = text.rfind("\n", position + 1, limit + 1)
+    if cut == -1:
+        cut = text.rfind(" ", position + 1, limit + 1)
+    # Разделитель на месте разреза не переносится в следующую часть
+    skip = 1
+    if cut == -1:
+        cut = limit
+        skip = 0
+        if text[cut - 1] == "\\" and text[cut] in ESCAPABLE:
+            cut -= 1
+
+    entity = _entity_at(entities, starts, cut)
+    if entity is not None:
+        if entity.is_link or cut <= entity.start + len(entity.opener):
+            # Не оставляем в части пустую сущность или половину ссылки
+            if entity.start > position:
+                return entity.start, 0, None
+        elif cut > entity.end - len(entity.closer):
+            cut, skip = entity.end - len(entity.closer), 0
+    return cut, skip, entity
+
+
+def _closing(entity: Optional[Entity]) -> str:
+    if entity is None or entity.is_link:
+        return ""
+    return "\n```" if entity.is_pre else entity.closer
+
+
+def _reopening(entity: Optional[Entity]) -> str:
+    if entity is None or entity.is_link:
+        return ""
+    return entity.opener + "\n" if entity.is_pre else entity.opener
+
+
+def iter_message_chunks(text: str, max_size: int = 4090) -> Iterator[str]:
     """
-    if not text:
-        return []
+    Лениво разбивает сообщение с Markdown-разметкой на части не длиннее max_size.
 
-    chunks = []
-    lines = text.split('\n')
-    current_chunk = ""
-    is_in_code_block = False
+    Разрез ставится по последнему переводу строки, затем по пробелу, а если
+    строка длиннее части — прямо посреди неё. Если разрез попадает внутрь
+    *жирного*, _курсива_, `кода` или ```блока кода```, сущность закрывается
+    в конце части и заново открывается в начале следующей; ссылки не рвутся.
+    Работает за линейное время от длины текста.
+    """
+    if not text:
+        return
 
-    i = 0
-    while i < len(lines):
-        line = lines[i]
-        
-        is_toggler = line.strip().startswith('```')
+    entities, _ = scan(text)
+    starts = [entity.start for entity in entities]
+    size = len(text)
+    position = 0
+    prefix = ""
 
-        closing_tags_len = 4 if is_in_code_block else 0
-        
-        separator_len = 1 if current_chunk else 0
+    while position < size:
+        if len(prefix) + CLOSING_RESERVE >= max_size:
+            # Переоткрытая сущность вместе с закрытием не помещается в часть
+            prefix = ""
+        budget = max_size - len(prefix)
+        if size - position <= budget:
+            chunk = prefix + text[position:]
+            if chunk.strip():
+                yield chunk
+            return
 
-        if len(current_chunk) + separator_len + len(line) > max_size - closing_tags_len:
-            chunk_to_add = current_chunk
-            if is_in_code_block:
-                chunk_to_add += '\n```'
-            
-            chunks.append(chunk_to_add)
+        # Сначала пробуем без запаса; если разрез придётся закрывать разметкой, режем раньше
+        for reserve in (0, CLOSING_RESERVE):
+            cut, skip, entity = _find_cut(text, entities, starts, position, budget - reserve)
+            closing = _closing(entity)
+            if cut - position + len(closing) <= budget:
+                break
+        if cut <= position or cut - position + len(closing) > budget:
+            # Разметку не уместить: режем по бюджету без закрытия, чтобы каждый проход продвигался
+            cut, skip, entity, closing = min(size, position + max(1, budget)), 0, None, ""
 
-            current_chunk = '```' if is_in_code_block else ''
-            
-            continue
+        chunk = prefix + text[position:cut] + closing
+        prefix = _reopening(entity)
 
-        if current_chunk:
-            current_chunk += '\n'
-        current_chunk += line
+        if chunk.strip():
+            yield chunk
+        position = cut + skip
 
-        if is_toggler:
-            is_in_code_block = not is_in_code_block
 
-        i += 1
+def split_message(text: str, max_size: int = 4090) -> list[str]:
+    """
+    Разделяет длинное сообщение с Markdown-разметкой на части для Telegram.
 
-    if current_chunk:
-        chunks.append(current_chunk)
+    Args:
+        text: Входной текст с Markdown-разметкой.
+        max_size: Максимальный размер одного чанка (по умолчанию 4090).
 
-    return chunks
+    Returns:
+        Список строк (чанков), готовых к отправке.
+    """
+    return list(iter_message_chunks(text, max_size))
@@ -0,0 +1,79 @@
+"""
+HTTP-эндпоинт /metrics в формате Prometheus и наблюдение за циклом событий.
+
+MetricsServer отдаёт содержимое реестра метрик на встроенном HTTP-сервере и
+раз в lag_interval секунд замеряет, насколько позже запланированного
+просыпается цикл событий (задержка цикла), а также число задач asyncio.
+"""
+import asyncio
+import logging
+import time
+from typing import Optional
+from src.utils.http_server import HttpRequest, HttpResponse, HttpServer
+from src.utils.metrics import MetricsRegistry, registry as default_registry
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+
+class MetricsServer:
+    def __init__(
+        self,
+        host: str = "0.0.0.0",
+        port: int = 9100,
+        path: str = "/metrics",
+        registry: Optional[MetricsRegistry] = None,
+        lag_interval: float = 0.5,
+    ):
+        self.path = path
+        self.registry = registry or default_registry
+        self.lag_interval = lag_interval
+        self.server = HttpServer(self.handle, host=host, port=port)
+        self._monitor: Optional[asyncio.Task] = None
+
+        self.loop_lag = self.registry.histogram(
+            "event_loop_lag_seconds", "Delay between scheduled and actual event loop wake-ups", buckets=LAG_BUCKETS
+        )
+        self.loop_tasks = self.registry.gauge("event_loop_tasks", "Asyncio tasks alive in the event loop")
+
+    @property
+    def port(self) -> int:
+        return self.server.port
+
+    async def handle(self, request: HttpRequest) -> HttpResponse:
+        if request.path != self.path:
+            return HttpResponse(404)
+        if request.method not in ("GET", "HEAD"):
+            return HttpResponse(405)
+        return HttpResponse(200, self.registry.exposition().encode(), CONTENT_TYPE)
+
+    async def _monitor_loop(self):
+        loop = asyncio.get_running_loop()
+        self.loop_tasks.set_function(lambda: len(asyncio.all_tasks(loop)))
+        while True:
+            expected = time.perf_counter() + self.lag_interval
+            await asyncio.sleep(self.lag_interval)
+            self.loop_lag.observe(max(0.0, time.perf_counter() - expected))
+
+    async def start(self):
+        await self.server.start()
+        if self.lag_interval > 0:
+            self._monitor = asyncio.create_task(self._monitor_loop())
+        logger.info("Metrics endpoint listening on %s:%s%s", self.server.host, self.port, self.path)
+
+    async def stop(self):
+        if self._monitor is not None:
+            self._monitor.cancel()
+            await asyncio.gather(self._monitor, return_exceptions=True)
+            self._monitor = None
+        await self.server.stop()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
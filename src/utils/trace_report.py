@@ -0,0 +1,177 @@
+"""
+Офлайн-отчёт по файлу трасс (см. src/utils/tracing.py).
+
+Читает JSONL вместе с ротированными частями, выводит распределение
+длительности обновлений, самые медленные трассы и разбивку критического
+пути: на что суммарно уходило время, которое пользователь ждал ответа.
+
+Запуск:
+    python -m src.utils.trace_report logs/traces.jsonl --top 10
+"""
+import argparse
+import json
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Допуск на округление времени в файле (мс)
+EPSILON_MS = 0.01
+
+Segment = Tuple[str, float]
+
+
+class SpanNode:
+    __slots__ = ("name", "start", "end", "attrs", "children")
+
+    def __init__(self, record: dict):
+        self.name = record["name"]
+        self.start = record["start_ms"]
+        self.end = record["start_ms"] + record["duration_ms"]
+        self.attrs = record.get("attrs") or {}
+        self.children: List["SpanNode"] = []
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+def trace_files(path: str) -> List[Path]:
+    """Основной файл и его ротированные части, от старых к новым."""
+    base = Path(path)
+    rotated = sorted(
+        (p for p in base.parent.glob(base.name + ".*") if p.suffix[1:].isdigit()),
+        key=lambda p: int(p.suffix[1:]),
+        reverse=True,
+    )
+    return rotated + ([base] if base.exists() else [])
+
+
+def load_traces(files: Iterable[Path]) -> Dict[str, SpanNode]:
+    """Собирает спаны в деревья; возвращает корни по trace id."""
+    records: Dict[str, List[dict]] = defaultdict(list)
+    for file in files:
+        with open(file, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                records[record["trace"]].append(record)
+
+    roots = {}
+    for trace_id, spans in records.items():
+        nodes = {record["span"]: SpanNode(record) for record in spans}
+        root = None
+        for record in spans:
+            node = nodes[record["span"]]
+            parent = nodes.get(record["parent"]) if record["parent"] is not None else None
+            if parent is not None:
+                parent.children.append(node)
+            elif record["parent"] is None:
+                root = node
+        if root is not None:
+            roots[trace_id] = root
+    return roots
+
+
+def critical_path(node: SpanNode) -> List[Segment]:
+    """
+    Критический путь спана: идём от его конца назад, каждый раз спускаясь в
+    дочерний спан, который закончился последним до текущего момента.
+    Промежутки между дочерними спанами — собственное время родителя.
+    Параллельные дочерние спаны, закончившиеся позже, на путь не попадают.
+    """
+    segments: List[Segment] = []
+    cursor = node.end
+    for child in sorted(node.children, key=lambda c: c.end, reverse=True):
+        if child.end > cursor + EPSILON_MS or child.start < node.start - EPSILON_MS:
+            continue
+        if cursor - child.end > EPSILON_MS:
+            segments.append((node.name, cursor - child.end))
+        segments.extend(critical_path(child))
+        cursor = child.start
+    if cursor - node.start > EPSILON_MS:
+        segments.append((node.name, cursor - node.start))
+    return segments
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+def _summarize_path(segments: List[Segment], limit: int = 3) -> str:
+    totals: Dict[str, float] = defaultdict(float)
+    for name, duration in segments:
+        totals[name] += duration
+    top = sorted(totals.items(), key=lambda item: item[1], reverse=True)[:limit]
+    return ", ".join(f"{name} {duration:.0f}ms" for name, duration in top)
+
+
+def report(roots: Dict[str, SpanNode], top: int = 10, name: Optional[str] = None) -> str:
+    traces = [(trace_id, root) for trace_id, root in roots.items() if name is None or root.name == name]
+    if not traces:
+        return "No traces found"
+
+    durations = [root.duration for _, root in traces]
+    lines = [
+        f"{len(traces)} trace(s): p50 {_percentile(durations, 50):.1f}ms, "
+        f"p95 {_percentile(durations, 95):.1f}ms, p99 {_percentile(durations, 99):.1f}ms, "
+        f"max {max(durations):.1f}ms",
+        "",
+        f"Slowest {min(top, len(traces))} trace(s):",
+        f"{'trace':<18}{'time':<21}{'total ms':>10}  critical path",
+    ]
+    paths = {trace_id: critical_path(root) for trace_id, root in traces}
+    for trace_id, root in sorted(traces, key=lambda item: item[1].duration, reverse=True)[:top]:
+        ts = root.attrs.get("ts")
+        when = datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S") if isinstance(ts, (int, float)) else "-"
+        lines.append(f"{trace_id:<18}{when:<21}{root.duration:>10.1f}  {_summarize_path(paths[trace_id])}")
+
+    totals: Dict[str, float] = defaultdict(float)
+    counts: Dict[str, int] = defaultdict(int)
+    for segments in paths.values():
+        seen = set()
+        for segment_name, duration in segments:
+            totals[segment_name] += duration
+            if segment_name not in seen:
+                seen.add(segment_name)
+                counts[segment_name] += 1
+    overall = sum(totals.values()) or 1.0
+
+    lines += [
+        "",
+        "Critical path breakdown (self time on the critical path):",
+        f"{'span':<28}{'share':>8}{'total ms':>12}{'mean ms':>10}{'traces':>8}",
+    ]
+    for segment_name, total in sorted(totals.items(), key=lambda item: item[1], reverse=True):
+        lines.append(
+            f"{segment_name:<28}{total / overall:>7.1%}{total:>12.1f}"
+            f"{total / counts[segment_name]:>10.1f}{counts[segment_name]:>8}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None):
+    from config.settings import settings
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", default=settings.trace_path)
+    parser.add_argument("--top", type=int, default=10, help="сколько самых медленных трасс показать")
+    parser.add_argument("--name", default="update", help="имя корневого спана (пусто — все трассы)")
+    args = parser.parse_args(argv)
+
+    files = trace_files(args.path)
+    if not files:
+        parser.error(f"no trace files found at {args.path}")
+    print(report(load_traces(files), args.top, args.name or None))
+
+
+if __name__ == "__main__":
+    main()
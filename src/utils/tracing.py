@@ -0,0 +1,236 @@
+"""
+Лёгкая трассировка обработки обновлений.
+
+Каждое обновление получает trace id; текущий спан хранится в contextvars,
+поэтому вложенные вызовы (middleware, StateManager, AIClient, ContentFilter,
+отправка в Telegram) открывают дочерние спаны без явной передачи контекста:
+
+    with tracer.trace("update", chat_id=chat_id):
+        with span("ai.generate", model=model):
+            ...
+
+Вне трассы span() возвращает пустой спан и почти ничего не стоит.
+Законченная трасса пишется в JSONL-файл с ротацией по размеру — по строке на
+спан; сериализацию и запись выполняет фоновый поток, цикл событий только
+ставит трассу в очередь. В файл попадает доля TRACE_SAMPLE_RATE трасс и все трассы дольше
+TRACE_SLOW_THRESHOLD секунд. Отчёт по файлу строит src.utils.trace_report.
+"""
+import functools
+import json
+import logging
+import os
+import queue
+import random
+import time
+from contextvars import ContextVar
+from logging.handlers import QueueListener, RotatingFileHandler
+from pathlib import Path
+from typing import Any, Callable, List, Optional
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("trace_span", default=None)
+
+# Сколько законченных трасс может ждать записи; при переполнении новые отбрасываются
+QUEUE_SIZE = 10000
+
+
+class _Trace:
+    __slots__ = ("trace_id", "tracer", "spans", "sampled", "started_at", "origin", "next_id")
+
+    def __init__(self, tracer: "Tracer", sampled: bool):
+        self.trace_id = os.urandom(8).hex()
+        self.tracer = tracer
+        self.spans: List["Span"] = []
+        self.sampled = sampled
+        self.started_at = time.time()
+        self.origin = time.perf_counter()
+        self.next_id = 0
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "attrs", "start", "duration", "_previous")
+
+    def __init__(self, trace: _Trace, name: str, parent_id: Optional[int], attrs: dict):
+        self.trace = trace
+        self.span_id = trace.next_id
+        trace.next_id += 1
+        self.parent_id = parent_id
+        self.name = name
+        self.attrs = attrs
+        self.start = 0.0
+        self.duration = 0.0
+        self._previous: Optional[Span] = None
+
+    @property
+    def trace_id(self) -> str:
+        return self.trace.trace_id
+
+    def set(self, **attrs: Any):
+        self.attrs.update(attrs)
+
+    def __enter__(self) -> "Span":
+        self.start = time.perf_counter()
+        self._previous = _current_span.get()
+        _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        # set(), а не reset(token): асинхронный генератор могут закрыть из другого контекста
+        _current_span.set(self._previous)
+        self._previous = None
+        self.trace.spans.append(self)
+        if self.parent_id is None:
+            self.trace.tracer.finish(self.trace, self)
+
+    async def __aenter__(self) -> "Span":
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.__exit__(exc_type, exc, tb)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace": self.trace.trace_id,
+            "span": self.span_id,
+            "parent": self.parent_id,
+            "name": self.name,
+            "start_ms": round((self.start - self.trace.origin) * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3),
+            "attrs": self.attrs,
+        }
+
+
+class _NoopSpan:
+    __slots__ = ()
+    trace_id = None
+
+    def set(self, **attrs: Any):
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+    async def __aenter__(self) -> "_NoopSpan":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def span(name: str, **attrs: Any):
+    """Дочерний спан текущей трассы или пустой спан, если трассы нет."""
+    parent = _current_span.get()
+    if parent is None:
+        return NOOP_SPAN
+    return Span(parent.trace, name, parent.span_id, attrs)
+
+
+def traced(name: str) -> Callable:
+    """Декоратор корутины: выполняет её внутри спана name."""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_trace_id() -> Optional[str]:
+    current = _current_span.get()
+    return current.trace_id if current is not None else None
+
+
+class _SpansFormatter(logging.Formatter):
+    """Запись очереди несёт список спанов трассы — по JSON-строке на спан."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return "\n".join(json.dumps(item, ensure_ascii=False, default=str) for item in record.msg)
+
+
+class _TraceListener(QueueListener):
+    def enqueue_sentinel(self):
+        # Очередь ограничена: при остановке ждём места, а не падаем на put_nowait
+        self.queue.put(self._sentinel)
+
+
+class Tracer:
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        sample_rate: Optional[float] = None,
+        slow_threshold: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        backup_count: Optional[int] = None,
+    ):
+        self.path = path or settings.trace_path
+        self.sample_rate = settings.trace_sample_rate if sample_rate is None else sample_rate
+        self.slow_threshold = settings.trace_slow_threshold if slow_threshold is None else slow_threshold
+        self.max_bytes = settings.trace_max_bytes if max_bytes is None else max_bytes
+        self.backup_count = settings.trace_backup_count if backup_count is None else backup_count
+        self._queue: Optional[queue.Queue] = None
+        self._listener: Optional[_TraceListener] = None
+        self.written = 0
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0 or self.slow_threshold > 0
+
+    def trace(self, name: str, **attrs: Any):
+        """Корневой спан новой трассы; при выключенной трассировке — пустой спан."""
+        if not self.enabled:
+            return NOOP_SPAN
+        sampled = self.sample_rate >= 1 or random.random() < self.sample_rate
+        # Без решения о записи трассу всё равно собираем, если медленные пишутся всегда
+        if not sampled and self.slow_threshold <= 0:
+            return NOOP_SPAN
+        return Span(_Trace(self, sampled), name, None, attrs)
+
+    def finish(self, trace: _Trace, root: Span):
+        if not trace.sampled and root.duration < self.slow_threshold:
+            return
+        root.attrs.setdefault("ts", trace.started_at)
+        try:
+            self._enqueue([s.to_dict() for s in trace.spans])
+        except queue.Full:
+            self.dropped += 1
+            logger.debug("Trace queue is full, dropping trace %s", trace.trace_id)
+        except Exception as e:
+            logger.error("Failed to write trace %s: %s", trace.trace_id, e)
+
+    def _enqueue(self, spans: List[dict]):
+        if self._listener is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            handler = RotatingFileHandler(
+                self.path, maxBytes=self.max_bytes, backupCount=self.backup_count, encoding="utf-8"
+            )
+            handler.setFormatter(_SpansFormatter())
+            self._queue = queue.Queue(QUEUE_SIZE)
+            self._listener = _TraceListener(self._queue, handler)
+            self._listener.start()
+        self._queue.put_nowait(logging.makeLogRecord({"msg": spans, "levelno": logging.INFO}))
+        self.written += 1
+
+    def close(self):
+        """Дописывает очередь трасс и останавливает поток записи."""
+        if self._listener is not None:
+            self._listener.stop()
+            for handler in self._listener.handlers:
+                handler.close()
+            self._listener = None
+            self._queue = None
+
+
+tracer = Tracer()
@@ -1,6 +1,8 @@
+import json
+import httpx
 import pytest
 from unittest.mock import AsyncMock, patch, Mock
-from src.ai.client import AIClient
+from src.ai.client import AIClient, errors_counter, tokens_counter
 from src.utils.exceptions import AIClientError
 
 
@@ -19,6 +21,7 @@ async def test_ai_client_successful_response():
         ]
     })
     mock_response.raise_for_status = Mock()
+    mock_response.headers = {}
 
     with patch("httpx.AsyncClient") as mock_http_client:
         mock_client_instance = AsyncMock()
@@ -43,6 +46,7 @@ async def test_ai_client_empty_response():
     mock_response = AsyncMock()
     mock_response.json = Mock(return_value={"choices": []})
     mock_response.raise_for_status = Mock()
+    mock_response.headers = {}
 
     with patch("httpx.AsyncClient") as mock_http_client:
         mock_client_instance = AsyncMock()
@@ -56,3 +60,99 @@ async def test_ai_client_empty_response():
                 messages=[],
                 user_message="Test question"
             )
+
+
+@pytest.mark.asyncio
+async def test_ai_client_reuses_shared_http_client():
+    client = AIClient()
+
+    mock_response = AsyncMock()
+    mock_response.json = Mock(return_value={
+        "choices": [{"message": {"content": "ok"}}]
+    })
+    mock_response.raise_for_status = Mock()
+    mock_response.headers = {}
+
+    with patch("httpx.AsyncClient") as mock_http_client:
+        mock_client_instance = AsyncMock()
+        mock_client_instance.is_closed = False
+        mock_client_instance.post = AsyncMock(return_value=mock_response)
+        mock_http_client.return_value = mock_client_instance
+
+        await client.generate_response(messages=[], user_message="first")
+        await client.generate_response(messages=[], user_message="second")
+
+        mock_http_client.assert_called_once()
+        assert mock_client_instance.post.call_count == 2
+
+        await client.close()
+        mock_client_instance.aclose.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_ai_client_stream_response_parses_sse():
+    client = AIClient()
+
+    sse_body = (
+        ": OPENROUTER PROCESSING\n\n"
+        'data: {"choices": [{"delta": {"role": "assistant"}}]}\n\n'
+        'data: {"choices": [{"delta": {"content": "Hello"}}]}\n\n'
+        'data: {"choices": [{"delta": {"content": ", world"}}]}\n\n'
+        "data: [DONE]\n\n"
+    )
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert json.loads(request.content)["stream"] is True
+        return httpx.Response(200, text=sse_body, headers={"Content-Type": "text/event-stream"})
+
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    deltas = [delta async for delta in client.stream_response(messages=[], user_message="Hi")]
+
+    assert deltas == ["Hello", ", world"]
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_ai_client_stream_response_http_error():
+    client = AIClient()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(500, text="boom")
+
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    with pytest.raises(AIClientError, match="AI service error: 500"):
+        async for _ in client.stream_response(messages=[], user_message="Hi"):
+            pass
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_ai_client_counts_usage_tokens_and_errors():
+    client = AIClient()
+    client.cache.max_entries = 0
+    statuses = iter([200, 502])
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        status = next(statuses)
+        if status != 200:
+            return httpx.Response(status, text="bad gateway")
+        return httpx.Response(200, json={
+            "choices": [{"message": {"content": "Hi"}}],
+            "usage": {"prompt_tokens": 12, "completion_tokens": 3, "total_tokens": 15},
+        })
+
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    tokens_in = tokens_counter.value(direction="in")
+    tokens_out = tokens_counter.value(direction="out")
+    errors = errors_counter.value(status="502")
+
+    await client.generate_response(messages=[], user_message="Hi")
+    with pytest.raises(AIClientError):
+        await client.generate_response(messages=[], user_message="Hi again")
+
+    assert tokens_counter.value(direction="in") == tokens_in + 12
+    assert tokens_counter.value(direction="out") == tokens_out + 3
+    assert errors_counter.value(status="502") == errors + 1
+    await client.close()
@@ -0,0 +1,45 @@
+import os
+import pytest
+from benchmarks.bench_hot_paths import DEFAULT_THRESHOLD, build_cases, compare, load_baseline, run_suite
+
+# Замеры времени идут только по запросу: BENCH_CHECK=1 pytest tests/test_benchmarks.py
+BENCH_CHECK = os.getenv("BENCH_CHECK", "") not in ("", "0")
+THRESHOLD = float(os.getenv("BENCH_THRESHOLD", str(DEFAULT_THRESHOLD)))
+
+
+def test_baseline_covers_every_case():
+    assert set(load_baseline()["cases"]) == set(build_cases())
+
+
+def test_compare_flags_only_regressions_beyond_threshold():
+    baseline = {"cases": {"fast": {"relative": 1.0}, "slow": {"relative": 1.0}}}
+    results = {"cases": {
+        "fast": {"seconds": 1e-6, "relative": 1.1},
+        "slow": {"seconds": 2e-6, "relative": 1.5},
+        "new": {"seconds": 3e-6, "relative": 2.0},
+    }}
+
+    rows = {row.name: row for row in compare(results, baseline, threshold=0.25)}
+
+    assert rows["fast"].change == pytest.approx(0.1)
+    assert not rows["fast"].regressed
+    assert rows["slow"].regressed
+    assert rows["new"].change is None and not rows["new"].regressed
+
+
+def test_compare_allows_case_noise_on_top_of_threshold():
+    baseline = {"cases": {"noisy": {"relative": 1.0, "noise": 0.3}}}
+
+    within, = compare({"cases": {"noisy": {"seconds": 1e-6, "relative": 1.5}}}, baseline, threshold=0.25)
+    beyond, = compare({"cases": {"noisy": {"seconds": 1e-6, "relative": 1.6}}}, baseline, threshold=0.25)
+
+    assert not within.regressed
+    assert beyond.regressed
+
+
+@pytest.mark.skipif(not BENCH_CHECK, reason="set BENCH_CHECK=1 to run timing checks")
+@pytest.mark.parametrize("name", list(build_cases()))
+def test_hot_path_does_not_regress(name):
+    row, = compare(run_suite([name]), load_baseline(), THRESHOLD)
+
+    assert not row.regressed, f"{name} is {row.change:+.1%} slower than baseline (threshold {THRESHOLD:.0%})"
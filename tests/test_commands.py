@@ -92,3 +92,22 @@ async def test_reset_command(mock_state_manager, sample_user):
     update.message.reply_text.assert_called_once()
     call_args = update.message.reply_text.call_args[0][0]
     assert "сброшен" in call_args
+
+
+@pytest.mark.asyncio
+async def test_reset_command_cancels_pending_work(mock_state_manager, sample_user):
+    dispatcher = MagicMock()
+    commands = BotCommands(mock_state_manager, dispatcher)
+
+    update = MagicMock()
+    update.effective_user = sample_user
+    update.effective_user.language_code = "ru"
+    update.effective_chat.id = 555
+    update.message.reply_text = AsyncMock()
+
+    mock_state_manager.get_user_language = AsyncMock(return_value="ru")
+
+    await commands.reset_command(update, MagicMock())
+
+    dispatcher.cancel.assert_called_once_with(555)
+    mock_state_manager.reset_conversation.assert_called_once_with(sample_user.id)
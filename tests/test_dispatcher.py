@@ -0,0 +1,77 @@
+import asyncio
+import pytest
+from src.bot.dispatcher import UserDispatcher
+
+
+@pytest.mark.asyncio
+async def test_queue_policy_preserves_order_per_chat():
+    dispatcher = UserDispatcher(policy="queue")
+    order = []
+
+    def job(name, delay):
+        async def run():
+            await asyncio.sleep(delay)
+            order.append(name)
+        return run
+
+    dispatcher.submit(1, job("first", 0.03))
+    dispatcher.submit(1, job("second", 0.0))
+    last = dispatcher.submit(1, job("third", 0.01))
+    await last
+
+    assert order == ["first", "second", "third"]
+
+
+@pytest.mark.asyncio
+async def test_cancel_policy_supersedes_inflight_request():
+    dispatcher = UserDispatcher(policy="cancel")
+    done = []
+
+    async def slow():
+        await asyncio.sleep(10)
+        done.append("slow")
+
+    async def fast():
+        done.append("fast")
+
+    first = dispatcher.submit(1, slow)
+    await asyncio.sleep(0)
+    second = dispatcher.submit(1, fast)
+    await second
+
+    assert first.cancelled()
+    assert done == ["fast"]
+
+
+@pytest.mark.asyncio
+async def test_cancel_stops_outstanding_work_and_reaps_tasks():
+    dispatcher = UserDispatcher(policy="queue")
+
+    async def slow():
+        await asyncio.sleep(10)
+
+    tasks = [dispatcher.submit(7, slow) for _ in range(3)]
+    assert dispatcher.pending(7) == 3
+
+    assert dispatcher.cancel(7) == 3
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert dispatcher.pending(7) == 0
+    assert dispatcher.inflight == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_task_does_not_block_queue():
+    dispatcher = UserDispatcher(policy="queue")
+    results = []
+
+    async def broken():
+        raise RuntimeError("boom")
+
+    async def ok():
+        results.append("ok")
+
+    dispatcher.submit(1, broken)
+    await dispatcher.submit(1, ok)
+
+    assert results == ["ok"]
@@ -67,3 +67,60 @@ def test_content_filter_response_filtering():
     profane_response = "This is a fuck response"
     filtered = filter_instance.filter_response(profane_response)
     assert "fuck" not in filtered
+
+
+def test_content_filter_homoglyphs_and_leetspeak():
+    filter_instance = ContentFilter()
+
+    # Латинская "x" вместо кириллической и цифра вместо буквы
+    assert filter_instance.contains_profanity("xуй") is True
+    assert filter_instance.contains_profanity("sh1t") is True
+    assert filter_instance.contains_profanity("сyка") is True
+
+
+def test_content_filter_no_false_positives_inside_words():
+    filter_instance = ContentFilter()
+
+    assert filter_instance.contains_profanity("classic assignment") is False
+    # Чисто кириллическое слово не должно совпадать с английским после нормализации
+    assert filter_instance.contains_profanity("токе") is False
+
+
+def test_content_filter_censor_keeps_markdown():
+    filter_instance = ContentFilter()
+
+    assert filter_instance.filter_response("Это **shit** и `code`") == "Это ******** и `code`"
+    assert filter_instance.filter_response("_fuck_ yes") == "_****_ yes"
+
+
+def test_content_filter_censor_is_idempotent():
+    filter_instance = ContentFilter()
+
+    text = "fuck this shit, сука"
+    censored = filter_instance.filter_response(text)
+
+    assert censored == filter_instance.censor_text(text)
+    assert filter_instance.filter_response(censored) == censored
+
+
+def test_content_filter_stream_matches_filter_response():
+    filter_instance = ContentFilter()
+
+    text = "Ну и shit, ass-fucker и сука. " * 5 + "Чистый хвост без слов, fuck"
+    for size in (1, 3, 7, 50):
+        stream = filter_instance.stream()
+        parts = [stream.feed(text[i:i + size]) for i in range(0, len(text), size)]
+        parts.append(stream.flush())
+
+        assert "".join(parts) == filter_instance.filter_response(text)
+
+
+def test_content_filter_stream_holds_back_only_the_tail():
+    filter_instance = ContentFilter()
+    stream = filter_instance.stream()
+
+    emitted = stream.feed("a" * 1000 + " sh")
+    emitted += stream.feed("it")
+
+    assert len(emitted) >= 1000 - filter_instance.matcher.max_match_length
+    assert emitted + stream.flush() == "a" * 1000 + " ****"
@@ -0,0 +1,52 @@
+import httpx
+from benchmarks.fake_openrouter import FakeOpenRouter, parse_latency
+from benchmarks.load_test import LoadConfig, run_load
+
+
+def test_parse_latency_distributions():
+    assert parse_latency(0.25)() == 0.25
+    assert parse_latency("0.5")() == 0.5
+    assert 0.2 <= parse_latency("uniform:0.2,0.4")() <= 0.4
+    assert parse_latency("lognormal:0.8,0.5")() > 0
+
+
+async def test_fake_openrouter_injects_errors_and_429_bursts():
+    payload = {"model": "fake/model", "messages": [{"role": "user", "content": "hi"}]}
+
+    async with FakeOpenRouter(burst_every=60, burst_duration=30) as server:
+        async with httpx.AsyncClient() as client:
+            limited = await client.post(server.base_url, json=payload)
+    assert limited.status_code == 429
+    assert int(limited.headers["retry-after"]) >= 1
+
+    async with FakeOpenRouter(error_rate=1.0, seed=1) as server:
+        async with httpx.AsyncClient() as client:
+            failed = await client.post(server.base_url, json=payload)
+    assert failed.status_code in (500, 502, 503)
+    assert server.statuses[failed.status_code] == 1
+
+
+async def test_load_harness_drives_real_application():
+    config = LoadConfig(users=20, messages=2, ramp=0.2, think=0.01, ai_latency="0.01", seed=1)
+
+    result = await run_load(config)
+
+    assert result.replies == 40
+    assert result.timeouts == 0
+    assert result.throughput > 0
+    assert result.peak_rss_kb > 0
+    assert result.telegram_calls["sendMessage"] == 40
+
+
+async def test_load_harness_waits_for_final_streamed_reply():
+    config = LoadConfig(users=10, messages=2, ramp=0.2, think=0.01, ai_latency="0.05", seed=1,
+                        env={"AI_STREAM_RESPONSES": "true", "STREAM_EDIT_INTERVAL": "0",
+                             "AI_WARMUP_CONNECTIONS": "0"})
+
+    result = await run_load(config)
+
+    assert result.replies == 20
+    assert result.timeouts == 0
+    # Каждый ответ — отдельный запрос к модели: заглушка и промежуточные правки ответом не считаются
+    assert result.ai_statuses[200] == 20
+    assert result.telegram_calls["editMessageText"] >= 20
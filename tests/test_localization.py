@@ -0,0 +1,56 @@
+import json
+import logging
+from src.localization import messages
+from src.localization.catalog import Catalog, compile_template
+from src.localization.messages import normalize_language_code, t
+
+
+def write_locale(directory, lang, table):
+    (directory / f"{lang}.json").write_text(json.dumps(table, ensure_ascii=False), encoding="utf-8")
+
+
+def test_languages_are_loaded_lazily_from_files(tmp_path):
+    write_locale(tmp_path, "en", {"hello": "Hello"})
+    write_locale(tmp_path, "de", {"hello": "Hallo"})
+    catalog = Catalog(tmp_path)
+
+    assert catalog.languages == {"en", "de"}
+    assert catalog.loaded == set()
+    assert catalog.lookup("de", "hello").text == "Hallo"
+    assert catalog.loaded == {"de"}
+
+
+def test_missing_key_falls_back_and_is_reported_once(tmp_path, caplog):
+    write_locale(tmp_path, "en", {"only_en": "English"})
+    write_locale(tmp_path, "ru", {})
+    catalog = Catalog(tmp_path)
+
+    with caplog.at_level(logging.WARNING, logger="src.localization.catalog"):
+        for _ in range(3):
+            assert catalog.lookup("ru", "only_en").text == "English"
+            assert catalog.lookup("ru", "unknown").text == "unknown"
+
+    assert len(caplog.records) == 2
+
+
+def test_compiled_templates_skip_formatting_without_placeholders():
+    assert compile_template("Plain text").render is None
+    assert compile_template("Braces {{kept}}") == ("Braces {kept}", None)
+
+    simple = compile_template("Hi, {first_name}! 100%")
+    assert simple.render({"first_name": "Ann"}) == "Hi, Ann! 100%"
+    assert compile_template("{value:>4}").render({"value": 7}) == "   7"
+
+
+def test_t_memoizes_resolution_and_keeps_behavior():
+    messages._resolve.cache_clear()
+
+    assert t("ru-RU", "start_welcome", first_name="Иван").startswith("👋 Привет, Иван!")
+    assert t("en-US", "start_welcome").startswith("👋 Hi, {first_name}!")
+    assert t("de", "reset_error") == t("ru", "reset_error")
+    for _ in range(5):
+        t("ru-RU", "error_general")
+
+    assert messages._resolve.cache_info().misses == 5
+    assert normalize_language_code("EN_gb") == "en"
+    assert normalize_language_code(None) == normalize_language_code("xx")
@@ -0,0 +1,89 @@
+import json
+import logging
+import threading
+import pytest
+from config import logging_config
+from config.logging_config import SamplingFilter, parse_sample_rates, setup_logging, stop_logging
+from config.settings import settings
+
+
+@pytest.fixture
+def configure_logging(tmp_path, monkeypatch):
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+
+    def configure(**overrides):
+        monkeypatch.setattr(settings, "log_file", str(tmp_path / "bot.log"))
+        for name, value in overrides.items():
+            monkeypatch.setattr(settings, name, value)
+        setup_logging()
+        return tmp_path / "bot.log"
+
+    yield configure
+    stop_logging()
+    root.handlers[:] = saved_handlers
+    root.setLevel(saved_level)
+
+
+def test_records_are_written_by_listener_thread(configure_logging):
+    path = configure_logging()
+    threads = []
+
+    class Probe:
+        def __str__(self):
+            threads.append(threading.current_thread().name)
+            return "probe"
+
+    logger = logging.getLogger("tests.queue")
+    logger.info("value %s", 42)
+    logger.info("object %s", Probe())
+    logger.debug("disabled %s", Probe())
+    stop_logging()
+
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert lines[0].endswith("tests.queue - INFO - value 42")
+    assert lines[1].endswith("object probe")
+    # Изменяемый аргумент форматируется сразу, а запись ниже уровня не форматируется вовсе
+    assert threads == [threading.current_thread().name]
+
+
+def test_json_format_and_size_rotation(configure_logging):
+    path = configure_logging(log_format="json", log_max_bytes=500, log_backup_count=2)
+
+    logger = logging.getLogger("tests.rotation")
+    for index in range(30):
+        logger.info("message %d %s", index, "x" * 40)
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("failed")
+    stop_logging()
+
+    assert sorted(p.name for p in path.parent.glob("bot.log*")) == ["bot.log", "bot.log.1", "bot.log.2"]
+    entries = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    last = entries[-1]
+    assert last["level"] == "ERROR"
+    assert last["logger"] == "tests.rotation"
+    assert "ValueError: boom" in last["exc_info"]
+
+
+def test_sampling_keeps_share_of_info_and_all_warnings():
+    sampler = SamplingFilter(parse_sample_rates("src.state=0.25, src.state.manager=0.5"))
+
+    def passed(name, level, count=100):
+        record = logging.LogRecord(name, level, __file__, 1, "msg", None, None)
+        return sum(sampler.filter(record) for _ in range(count))
+
+    assert passed("src.state.manager", logging.INFO) == 50
+    assert passed("src.state.backends.sqlite", logging.DEBUG) == 25
+    assert passed("src.state.manager", logging.WARNING) == 100
+    assert passed("src.ai.client", logging.INFO) == 100
+
+
+def test_setup_logging_replaces_previous_listener(configure_logging):
+    configure_logging()
+    first = logging_config._listener
+    configure_logging()
+
+    assert logging_config._listener is not first
+    assert len(logging.getLogger().handlers) == 1
@@ -0,0 +1,103 @@
+import pytest
+from src.utils.markdown import escape_unclosed, is_valid_markdown, prepare_markdown
+from src.utils.message_splitter import iter_message_chunks, split_message
+
+
+def test_split_message_short_text_is_single_chunk():
+    assert split_message("Hello, world") == ["Hello, world"]
+    assert split_message("") == []
+
+
+def test_split_message_prefers_line_breaks():
+    text = "first line\nsecond line\nthird line"
+
+    assert split_message(text, max_size=24) == ["first line\nsecond line", "third line"]
+
+
+def test_split_message_hard_wraps_oversized_line():
+    text = "a" * 250
+
+    chunks = split_message(text, max_size=100)
+
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    assert "".join(chunks) == text
+
+
+def test_split_message_reopens_code_block():
+    text = "```python\n" + "\n".join(f"print({i})" for i in range(20)) + "\n```\nafter"
+
+    chunks = split_message(text, max_size=60)
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert len(chunk) <= 60
+        assert is_valid_markdown(chunk)
+    assert all(chunk.startswith("```python\n") for chunk in chunks[1:])
+
+
+def test_split_message_balances_bold_and_italic():
+    text = "*" + "bold words " * 20 + "* and _" + "italic words " * 20 + "_"
+
+    chunks = split_message(text, max_size=80)
+
+    for chunk in chunks:
+        assert len(chunk) <= 80
+        assert is_valid_markdown(chunk)
+
+
+def test_split_message_does_not_break_links():
+    text = "x" * 50 + " [link text](https://example.com/path) tail"
+
+    chunks = split_message(text, max_size=70)
+
+    assert any("[link text](https://example.com/path)" in chunk for chunk in chunks)
+
+
+def test_iter_message_chunks_is_lazy():
+    chunks = iter_message_chunks("line\n" * 10000, max_size=100)
+
+    assert len(next(chunks)) <= 100
+
+
+@pytest.mark.parametrize("text, valid", [
+    ("plain text", True),
+    ("*bold* and _italic_ and `code`", True),
+    ("```python\nprint('hi')\n```", True),
+    ("[link](https://example.com)", True),
+    ("snake_case", False),
+    ("2 * 3", False),
+    ("```unclosed", False),
+    ("escaped \\_ underscore", True),
+])
+def test_is_valid_markdown(text, valid):
+    assert is_valid_markdown(text) is valid
+
+
+def test_escape_unclosed_keeps_valid_entities():
+    text = "*bold* and snake_case"
+
+    escaped = escape_unclosed(text)
+
+    assert escaped == "*bold* and snake\\_case"
+    assert is_valid_markdown(escaped)
+    assert prepare_markdown(text) == (escaped, True)
+
+
+def test_split_message_long_unbroken_code_block_terminates():
+    text = "```" + "x" * 5000 + "\n```"
+
+    chunks = split_message(text)
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 4090 for chunk in chunks)
+    assert all(is_valid_markdown(chunk) for chunk in chunks)
+
+
+@pytest.mark.parametrize("max_size", [1, 2, 4, 5, 8, 12])
+def test_split_message_tiny_max_size_terminates(max_size):
+    text = "```python\n" + "print(1)\n" * 5 + "```\n*bold text* and [link](https://example.com)"
+
+    chunks = split_message(text, max_size=max_size)
+
+    assert chunks
+    assert all(len(chunk) <= max_size for chunk in chunks)
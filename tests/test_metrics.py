@@ -0,0 +1,98 @@
+import asyncio
+import httpx
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from config.settings import settings
+from src.bot.handlers import MessageHandler, stage_latency
+from src.utils.metrics import MetricsRegistry
+from src.utils.metrics_server import MetricsServer
+
+
+def test_exposition_renders_prometheus_text_format():
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "Requests", labelnames=("status",)).inc(3, status='bad "one"')
+    registry.gauge("queue_depth", "Queue depth").set(2.5)
+    histogram = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    lines = registry.exposition().splitlines()
+
+    assert "# TYPE requests_total counter" in lines
+    assert 'requests_total{status="bad \\"one\\""} 3' in lines
+    assert "queue_depth 2.5" in lines
+    assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{le="1"} 2' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in lines
+    assert "latency_seconds_sum 5.55" in lines
+    assert "latency_seconds_count 3" in lines
+
+
+async def test_metrics_server_serves_registry_and_loop_lag():
+    registry = MetricsRegistry()
+    registry.counter("hits_total", "Hits").inc()
+
+    async with MetricsServer(host="127.0.0.1", port=0, registry=registry, lag_interval=0.01) as server:
+        await asyncio.sleep(0.05)
+        async with httpx.AsyncClient() as client:
+            response = await client.get(f"http://127.0.0.1:{server.port}/metrics")
+            missing = await client.get(f"http://127.0.0.1:{server.port}/other")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "hits_total 1" in response.text
+    assert "event_loop_lag_seconds_count" in response.text
+    assert "event_loop_tasks" in response.text
+    assert missing.status_code == 404
+
+
+async def test_message_handler_records_stage_latencies(mock_ai_client, mock_state_manager, content_filter):
+    mock_ai_client.context_budget = 8000
+    handler = MessageHandler(mock_ai_client, mock_state_manager, content_filter)
+    handler.middleware.process_message = AsyncMock(return_value=(True, "Hello"))
+    update = MagicMock()
+    update.effective_user.language_code = "en"
+    update.message.reply_text = AsyncMock()
+    update.message.chat.send_action = AsyncMock()
+    stages = ("validation", "session", "history", "ai", "filter", "save", "split", "send")
+    before = {stage: stage_latency.count(stage=stage) for stage in stages}
+
+    await handler._handle_message(update, MagicMock())
+
+    update.message.reply_text.assert_called_once()
+    for stage in stages:
+        assert stage_latency.count(stage=stage) == before[stage] + 1, stage
+
+
+async def test_streaming_handler_times_ai_apart_from_sending(
+        monkeypatch, mock_ai_client, mock_state_manager, content_filter):
+    monkeypatch.setattr(settings, "ai_stream_responses", True)
+
+    async def stream_response(**kwargs):
+        for delta in ("Hello", ", world"):
+            yield delta
+
+    async def slow_reply_text(text, parse_mode=None):
+        await asyncio.sleep(0.05)
+        message = MagicMock()
+        message.edit_text = AsyncMock()
+        return message
+
+    mock_ai_client.context_budget = 8000
+    mock_ai_client.stream_response = stream_response
+    handler = MessageHandler(mock_ai_client, mock_state_manager, content_filter)
+    handler.middleware.process_message = AsyncMock(return_value=(True, "Hello"))
+    update = MagicMock()
+    update.effective_user.language_code = "en"
+    update.message.reply_text = AsyncMock(side_effect=slow_reply_text)
+    stages = ("ai", "filter", "send")
+    counts = {stage: stage_latency.count(stage=stage) for stage in stages}
+    sums = {stage: stage_latency.sum(stage=stage) for stage in stages}
+
+    await handler._handle_message(update, MagicMock())
+
+    for stage in stages:
+        assert stage_latency.count(stage=stage) == counts[stage] + 1, stage
+    assert stage_latency.sum(stage="send") - sums["send"] >= 0.05
+    assert stage_latency.sum(stage="ai") - sums["ai"] < 0.05
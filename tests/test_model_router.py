@@ -0,0 +1,123 @@
+import asyncio
+import json
+import httpx
+import pytest
+from config.settings import settings
+from src.ai.client import AIClient
+from src.ai.model_router import ModelRouter, MIN_SAMPLES
+from src.utils.exceptions import AIClientError
+
+
+def completion(content: str) -> httpx.Response:
+    return httpx.Response(200, json={"choices": [{"message": {"content": content}}]})
+
+
+@pytest.fixture
+def fallback_settings(monkeypatch):
+    monkeypatch.setattr(settings, "ai_model", "primary/model")
+    monkeypatch.setattr(settings, "ai_fallback_models", "backup/model")
+    monkeypatch.setattr(settings, "ai_cache_max_entries", 0)
+    monkeypatch.setattr(settings, "ai_hedge_min_delay", 0.05)
+    monkeypatch.setattr(settings, "ai_hedge_default_delay", 0.05)
+
+
+def test_hedge_delay_uses_observed_p95(monkeypatch):
+    monkeypatch.setattr(settings, "ai_hedge_min_delay", 0.1)
+    monkeypatch.setattr(settings, "ai_hedge_default_delay", 5.0)
+    router = ModelRouter(["a"])
+
+    assert router.hedge_delay("a") == 5.0
+
+    for i in range(100):
+        router.record_success("a", 0.01 * (i + 1))
+    assert router.hedge_delay("a") == pytest.approx(0.96)
+    assert router.stats["a"].quantile(0.5) == pytest.approx(0.51)
+    assert len(router.stats["a"].latencies) >= MIN_SAMPLES
+
+
+@pytest.mark.asyncio
+async def test_failover_to_next_model_on_5xx(fallback_settings):
+    client = AIClient()
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        model = json.loads(request.content)["model"]
+        seen.append(model)
+        if model == "primary/model":
+            return httpx.Response(502, text="bad gateway")
+        return completion("from backup")
+
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    assert await client.generate_response(messages=[], user_message="Hi") == "from backup"
+    assert seen == ["primary/model", "backup/model"]
+    stats = client.model_stats()
+    assert stats["primary/model"]["failures"] == 1
+    assert stats["backup/model"]["wins"] == 1
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_client_errors_do_not_fail_over(fallback_settings):
+    client = AIClient()
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(json.loads(request.content)["model"])
+        return httpx.Response(400, text="bad request")
+
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    with pytest.raises(AIClientError, match="400"):
+        await client.generate_response(messages=[], user_message="Hi")
+    assert seen == ["primary/model"]
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_takes_fastest_model(fallback_settings, monkeypatch):
+    monkeypatch.setattr(settings, "ai_hedging", True)
+    client = AIClient()
+    cancelled = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        model = json.loads(request.content)["model"]
+        if model == "primary/model":
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(model)
+                raise
+            return completion("slow")
+        return completion("fast")
+
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    assert await client.generate_response(messages=[], user_message="Hi") == "fast"
+    await asyncio.sleep(0)
+    assert cancelled == ["primary/model"]
+    assert client.model_stats()["backup/model"]["wins"] == 1
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_fallback_answer_is_not_cached_for_primary_model(fallback_settings, monkeypatch):
+    monkeypatch.setattr(settings, "ai_cache_max_entries", 10)
+    monkeypatch.setattr(settings, "ai_cache_deterministic_only", False)
+    client = AIClient()
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        model = json.loads(request.content)["model"]
+        seen.append(model)
+        if model == "primary/model" and len(seen) == 1:
+            return httpx.Response(502, text="bad gateway")
+        return completion(f"from {model}")
+
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    assert await client.generate_response(messages=[], user_message="Hi") == "from backup/model"
+    assert await client.generate_response(messages=[], user_message="Hi") == "from primary/model"
+    assert await client.generate_response(messages=[], user_message="Hi") == "from primary/model"
+    assert seen == ["primary/model", "backup/model", "primary/model"]
+    await client.close()
@@ -0,0 +1,64 @@
+import logging
+from src.ai.prompts import format_conversation_history, SYSTEM_PROMPT
+from src.ai.tokens import estimate_tokens, estimate_message_tokens, context_token_budget
+
+
+def test_estimate_tokens_counts_cyrillic_heavier():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcdefgh") == 2
+    assert estimate_tokens("абвгдежз") == 4
+
+
+def test_format_without_budget_keeps_everything():
+    messages = [{"role": "user", "content": "x" * 1000} for _ in range(20)]
+
+    formatted = format_conversation_history(messages)
+
+    assert formatted[0] == {"role": "system", "content": SYSTEM_PROMPT}
+    assert len(formatted) == 21
+
+
+def test_format_with_budget_keeps_newest_turns():
+    messages = [{"role": "user", "content": f"{i} " + "x" * 400} for i in range(10)]
+    system_tokens = estimate_message_tokens({"content": SYSTEM_PROMPT})
+    per_message = estimate_message_tokens(messages[0])
+
+    formatted = format_conversation_history(messages, token_budget=system_tokens + 3 * per_message)
+
+    assert formatted[0]["role"] == "system"
+    assert [m["content"][:2] for m in formatted[1:]] == ["7 ", "8 ", "9 "]
+
+
+def test_format_with_budget_always_keeps_latest_message():
+    messages = [{"role": "user", "content": "x" * 10000}]
+
+    formatted = format_conversation_history(messages, token_budget=10)
+
+    assert len(formatted) == 2
+    assert formatted[1]["content"] == messages[0]["content"]
+
+
+def test_format_with_budget_logs_truncation(caplog):
+    messages = [{"role": "user", "content": "x" * 400} for _ in range(10)]
+    system_tokens = estimate_message_tokens({"content": SYSTEM_PROMPT})
+    per_message = estimate_message_tokens(messages[0])
+    budget = system_tokens + 4 * per_message
+
+    with caplog.at_level(logging.INFO, logger="src.ai.prompts"):
+        format_conversation_history(messages, token_budget=budget)
+
+    assert caplog.messages == [
+        f"Context: {system_tokens + 4 * per_message}/{budget} tokens used, "
+        f"6 message(s) dropped ({6 * per_message} tokens)"
+    ]
+
+
+def test_context_budget_reserves_completion_tokens(monkeypatch):
+    from config.settings import settings
+    monkeypatch.setattr(settings, "ai_context_token_budget", 0)
+
+    assert context_token_budget("deepseek/deepseek-chat", 4000) == 60000
+    assert context_token_budget("unknown/model", 40000) == 0
+
+    monkeypatch.setattr(settings, "ai_context_token_budget", 8000)
+    assert context_token_budget("deepseek/deepseek-chat", 4000) == 8000
@@ -0,0 +1,92 @@
+import time
+import httpx
+import pytest
+from src.ai.client import AIClient
+from src.ai.rate_limiter import (
+    TokenBucket,
+    UpstreamRateLimiter,
+    backoff_delay,
+    parse_reset,
+    parse_retry_after,
+)
+from src.utils.exceptions import RateLimitError
+
+
+def test_token_bucket_reports_wait_when_empty():
+    bucket = TokenBucket(rate=1.0, capacity=2)
+    now = time.monotonic()
+
+    assert bucket.reserve(1, now) == 0
+    assert bucket.reserve(1, now) == 0
+    assert bucket.reserve(1, now) == pytest.approx(1.0)
+
+
+def test_backoff_delay_is_bounded_and_jittered():
+    for attempt in range(10):
+        delay = backoff_delay(attempt, base=0.5, cap=8)
+        assert 0 < delay <= 8
+    assert backoff_delay(0, base=1, cap=8) >= 0.5
+
+
+def test_header_parsing():
+    assert parse_retry_after("3") == 3
+    assert parse_retry_after(None) is None
+    assert parse_reset(str(int((time.time() + 10) * 1000))) == pytest.approx(10, abs=1)
+    assert parse_reset("5") == 5
+
+
+@pytest.mark.asyncio
+async def test_acquire_raises_when_wait_exceeds_deadline():
+    limiter = UpstreamRateLimiter(requests_per_minute=0, tokens_per_minute=0)
+    limiter.block_for(60)
+
+    with pytest.raises(RateLimitError):
+        await limiter.acquire(10, deadline=time.monotonic() + 1)
+
+
+@pytest.mark.asyncio
+async def test_exhausted_ratelimit_headers_pause_requests():
+    limiter = UpstreamRateLimiter(requests_per_minute=0, tokens_per_minute=0)
+
+    retry_after = limiter.update_from_headers({
+        "x-ratelimit-remaining": "0",
+        "x-ratelimit-reset": str(int((time.time() + 30) * 1000)),
+    })
+
+    assert retry_after == pytest.approx(30, abs=1)
+    with pytest.raises(RateLimitError):
+        await limiter.acquire(1, deadline=time.monotonic() + 5)
+
+
+@pytest.mark.asyncio
+async def test_ai_client_retries_429_honoring_retry_after():
+    client = AIClient()
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(429, headers={"Retry-After": "0"}, text="slow down")
+        return httpx.Response(200, json={"choices": [{"message": {"content": "ok"}}]})
+
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    assert await client.generate_response(messages=[], user_message="Hi") == "ok"
+    assert len(calls) == 2
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_ai_client_gives_up_when_retry_exceeds_budget(monkeypatch):
+    from config.settings import settings
+    monkeypatch.setattr(settings, "ai_retry_budget", 1)
+    client = AIClient()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(429, headers={"Retry-After": "120"}, text="slow down")
+
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    with pytest.raises(RateLimitError):
+        await client.generate_response(messages=[], user_message="Hi")
+    await client.close()
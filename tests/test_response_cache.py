@@ -0,0 +1,106 @@
+import json
+import time
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+from src.ai.cache import ResponseCache
+from src.ai.client import AIClient
+
+
+def test_cache_key_normalizes_whitespace_and_case():
+    first = ResponseCache.make_key("m", 0.7, [{"role": "user", "content": "Hello   World "}])
+    second = ResponseCache.make_key("m", 0.7, [{"role": "user", "content": "hello world"}])
+    other_model = ResponseCache.make_key("other", 0.7, [{"role": "user", "content": "hello world"}])
+
+    assert first == second
+    assert first != other_model
+
+
+def test_cache_evicts_least_recently_used():
+    cache = ResponseCache(max_entries=2, ttl=60, path="")
+    cache.put("a", "A")
+    cache.put("b", "B")
+    cache.get("a")
+    cache.put("c", "C")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+    assert cache.get("c") == "C"
+
+
+def test_cache_expires_entries():
+    cache = ResponseCache(max_entries=10, ttl=-1, path="")
+    cache.put("a", "A")
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_cache_deterministic_only():
+    cache = ResponseCache(max_entries=10, ttl=60, path="", deterministic_only=True)
+
+    assert cache.cacheable(0) is True
+    assert cache.cacheable(0.7) is False
+
+
+def test_cache_persists_to_disk(tmp_path):
+    path = str(tmp_path / "cache.json")
+    cache = ResponseCache(max_entries=10, ttl=60, path=path)
+    cache.put("a", "A", latency=1.5)
+    cache.save()
+
+    restored = ResponseCache(max_entries=10, ttl=60, path=path)
+    restored.load()
+
+    assert restored.get("a") == "A"
+
+
+def test_cache_load_skips_corrupt_entries(tmp_path):
+    path = tmp_path / "cache.json"
+    expires_at = time.time() + 60
+    path.write_text(json.dumps([
+        ["a", "A", expires_at, 1.0],
+        ["short", "entry"],
+        "not a list",
+        ["b", "B", "tomorrow", 1.0],
+        ["c", "C", expires_at, 0.5],
+    ]))
+
+    cache = ResponseCache(max_entries=10, ttl=60, path=str(path))
+    cache.load()
+
+    assert cache.get("a") == "A"
+    assert cache.get("b") is None
+    assert cache.get("c") == "C"
+
+
+def test_cache_load_ignores_non_list_file(tmp_path):
+    path = tmp_path / "cache.json"
+    path.write_text(json.dumps({"abcd": 1}))
+
+    cache = ResponseCache(max_entries=10, ttl=60, path=str(path))
+    cache.load()
+
+    assert cache.get("abcd") is None
+
+
+@pytest.mark.asyncio
+async def test_ai_client_serves_repeated_prompt_from_cache():
+    client = AIClient()
+    client.cache = ResponseCache(max_entries=10, ttl=60, path="", deterministic_only=False)
+
+    mock_response = AsyncMock()
+    mock_response.json = Mock(return_value={"choices": [{"message": {"content": "cached answer"}}]})
+    mock_response.raise_for_status = Mock()
+    mock_response.headers = {}
+
+    with patch("httpx.AsyncClient") as mock_http_client:
+        mock_client_instance = AsyncMock()
+        mock_client_instance.is_closed = False
+        mock_client_instance.post = AsyncMock(return_value=mock_response)
+        mock_http_client.return_value = mock_client_instance
+
+        first = await client.generate_response(messages=[], user_message="What is Python?")
+        second = await client.generate_response(messages=[], user_message="what is  python?")
+
+    assert first == second == "cached answer"
+    mock_client_instance.post.assert_called_once()
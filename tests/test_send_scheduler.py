@@ -0,0 +1,86 @@
+import asyncio
+import time
+import pytest
+from telegram.error import RetryAfter
+from src.bot.send_scheduler import SendScheduler
+
+
+def make_scheduler(**kwargs):
+    params = dict(global_rate=1000, chat_rate=1000, chat_burst=1000, group_per_minute=0, max_retries=3)
+    params.update(kwargs)
+    return SendScheduler(**params)
+
+
+async def send(scheduler, calls, chat_id, text, endpoint="sendMessage"):
+    async def callback():
+        calls.append((chat_id, text))
+        return text
+
+    return await scheduler.process_request(callback, (), {}, endpoint, {"chat_id": chat_id}, None)
+
+
+@pytest.mark.asyncio
+async def test_send_scheduler_keeps_order_within_chat():
+    scheduler = make_scheduler(chat_rate=200, chat_burst=1)
+    calls = []
+
+    results = await asyncio.gather(*(send(scheduler, calls, 1, f"part {i}") for i in range(5)))
+
+    assert results == [f"part {i}" for i in range(5)]
+    assert calls == [(1, f"part {i}") for i in range(5)]
+    assert scheduler.depth == 0
+
+
+@pytest.mark.asyncio
+async def test_send_scheduler_throttles_per_chat():
+    scheduler = make_scheduler(chat_rate=20, chat_burst=1)
+    calls = []
+
+    started = time.monotonic()
+    await asyncio.gather(*(send(scheduler, calls, 1, str(i)) for i in range(3)))
+
+    assert time.monotonic() - started >= 0.09
+
+
+@pytest.mark.asyncio
+async def test_send_scheduler_drops_superseded_chat_actions():
+    scheduler = make_scheduler(chat_rate=50, chat_burst=1)
+    calls = []
+
+    first = asyncio.create_task(send(scheduler, calls, 1, "first"))
+    await asyncio.sleep(0)
+    action = asyncio.create_task(send(scheduler, calls, 1, "typing", endpoint="sendChatAction"))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(send(scheduler, calls, 1, "second"))
+
+    assert await action is True
+    await asyncio.gather(first, second)
+    assert calls == [(1, "first"), (1, "second")]
+
+
+@pytest.mark.asyncio
+async def test_send_scheduler_requeues_after_retry_after():
+    scheduler = make_scheduler()
+    attempts = []
+
+    async def callback():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise RetryAfter(0)
+        return "ok"
+
+    result = await scheduler.process_request(callback, (), {}, "sendMessage", {"chat_id": 1}, None)
+
+    assert result == "ok"
+    assert len(attempts) == 2
+
+
+@pytest.mark.asyncio
+async def test_send_scheduler_gives_up_after_max_retries():
+    scheduler = make_scheduler(max_retries=1)
+
+    async def callback():
+        raise RetryAfter(0)
+
+    with pytest.raises(RetryAfter):
+        await scheduler.process_request(callback, (), {}, "sendMessage", {"chat_id": 1}, None)
@@ -0,0 +1,171 @@
+import pytest
+from benchmarks.fake_redis import FakeRedis
+from src.state.manager import StateManager
+from src.state.backends.redis import RedisBackend
+from src.state.backends.sqlite import SQLiteBackend
+
+
+@pytest.fixture
+async def sqlite_backend(tmp_path):
+    backend = SQLiteBackend(path=str(tmp_path / "state.db"), flush_interval=60)
+    await backend.start()
+    yield backend
+    await backend.close()
+
+
+@pytest.fixture
+async def fake_redis():
+    async with FakeRedis() as server:
+        yield server
+
+
+async def _redis_manager(server, **kwargs):
+    manager = StateManager(backend=RedisBackend(url=server.url, **kwargs))
+    await manager.start()
+    return manager
+
+
+@pytest.mark.asyncio
+async def test_sqlite_backend_uses_wal(sqlite_backend):
+    mode = sqlite_backend._conn.execute("PRAGMA journal_mode").fetchone()[0]
+    assert mode == "wal"
+
+
+@pytest.mark.asyncio
+async def test_save_message_is_buffered_until_flush(sqlite_backend):
+    manager = StateManager(backend=sqlite_backend)
+    session = await manager.get_or_create_session(telegram_user_id=1, language_code="en")
+
+    await manager.save_message(session["id"], "user", "Hello")
+    count = sqlite_backend._conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+    assert count == 0
+
+    await sqlite_backend.flush()
+    count = sqlite_backend._conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+    assert count == 1
+
+
+@pytest.mark.asyncio
+async def test_state_survives_restart(tmp_path):
+    path = str(tmp_path / "state.db")
+
+    backend = SQLiteBackend(path=path)
+    manager = StateManager(backend=backend)
+    await manager.start()
+    session = await manager.get_or_create_session(telegram_user_id=42, language_code="en")
+    await manager.save_message(session["id"], "user", "Hi")
+    await manager.save_message(session["id"], "assistant", "Hello!")
+    await manager.close()
+
+    backend = SQLiteBackend(path=path)
+    restarted = StateManager(backend=backend)
+    await restarted.start()
+    restored = await restarted.get_or_create_session(telegram_user_id=42)
+    history = await restarted.get_conversation_history(restored["id"])
+    await restarted.close()
+
+    assert restored["id"] == session["id"]
+    assert restored["language"] == "en"
+    assert history == [
+        {"role": "user", "content": "Hi"},
+        {"role": "assistant", "content": "Hello!"},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_reset_clears_persisted_history(sqlite_backend):
+    manager = StateManager(backend=sqlite_backend)
+    session = await manager.get_or_create_session(telegram_user_id=7)
+    await manager.save_message(session["id"], "user", "Hi")
+
+    await manager.reset_conversation(7)
+
+    assert await sqlite_backend.load_messages(session["id"]) == []
+    assert await manager.get_conversation_history(session["id"]) == []
+
+
+
+@pytest.mark.asyncio
+async def test_redis_replicas_share_history(fake_redis):
+    first = await _redis_manager(fake_redis, cache_ttl=0)
+    second = await _redis_manager(fake_redis, cache_ttl=0)
+
+    session = await first.get_or_create_session(telegram_user_id=5, language_code="en")
+    await first.save_message(session["id"], "user", "Hi")
+    restored = await second.get_or_create_session(telegram_user_id=5)
+    await second.save_message(restored["id"], "assistant", "Hello!")
+    history = await first.get_conversation_history(session["id"])
+
+    await first.close()
+    await second.close()
+    assert restored["id"] == session["id"]
+    assert restored["language"] == "en"
+    assert history == [
+        {"role": "user", "content": "Hi"},
+        {"role": "assistant", "content": "Hello!"},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_redis_append_is_one_round_trip(fake_redis):
+    # Локальный кэш истёк (как бывает, пока модель готовит ответ) — чтения перед записью быть не должно
+    manager = await _redis_manager(fake_redis, max_messages=3, ttl=60, cache_ttl=0)
+    session = await manager.get_or_create_session(telegram_user_id=8)
+    client = manager.backend.client
+
+    before = client.round_trips
+    fake_redis.commands.clear()
+    await manager.save_message(session["id"], "user", "Hi")
+
+    assert client.round_trips == before + 1
+    assert [command[0] for command in fake_redis.commands] == ["RPUSH", "LTRIM", "EXPIRE", "EXPIRE"]
+
+    for i in range(5):
+        await manager.save_message(session["id"], "user", f"m{i}")
+    history_key = f"tgbot:history:{session['id']}"
+    assert len(fake_redis.data[history_key.encode()]) == 3
+    assert 0 < fake_redis._cmd_ttl(b"tgbot:session:8") <= 60
+    await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_redis_history_reads_hit_local_cache(fake_redis):
+    manager = await _redis_manager(fake_redis, cache_ttl=60)
+    session = await manager.get_or_create_session(telegram_user_id=9)
+    await manager.get_conversation_history(session["id"])
+    await manager.save_message(session["id"], "user", "Hi")
+
+    fake_redis.commands.clear()
+    for _ in range(3):
+        history = await manager.get_conversation_history(session["id"])
+
+    assert history == [{"role": "user", "content": "Hi"}]
+    assert fake_redis.commands == []
+    await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_redis_reset_invalidates_cache(fake_redis):
+    manager = await _redis_manager(fake_redis, cache_ttl=60)
+    session = await manager.get_or_create_session(telegram_user_id=10)
+    await manager.save_message(session["id"], "user", "Hi")
+
+    await manager.reset_conversation(10)
+
+    assert await manager.get_conversation_history(session["id"]) == []
+    assert f"tgbot:history:{session['id']}".encode() not in fake_redis.data
+    await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_evicted_session_message_goes_to_backend_only(sqlite_backend):
+    manager = StateManager(backend=sqlite_backend)
+    session = await manager.get_or_create_session(telegram_user_id=1, language_code="en")
+    manager._evict(1, "capacity")
+
+    await manager.save_message(session["id"], "assistant", "late reply")
+    history = await manager.get_conversation_history(session["id"])
+
+    assert [message["content"] for message in history] == ["late reply"]
+    assert session["id"] not in manager.messages
+    assert manager.estimated_bytes == 0
@@ -0,0 +1,170 @@
+import sys
+import pytest
+from src.state.manager import StateManager
+
+
+@pytest.mark.asyncio
+async def test_history_is_bounded_ring_buffer():
+    manager = StateManager()
+    manager.history_capacity = 5
+    session = await manager.get_or_create_session(telegram_user_id=1)
+    manager._set_history(session["id"], [])
+
+    for i in range(20):
+        await manager.save_message(session["id"], "user", f"message {i}")
+
+    history = await manager.get_conversation_history(session["id"], limit=100)
+
+    assert len(manager.messages[session["id"]]) == 5
+    assert [m["content"] for m in history] == [f"message {i}" for i in range(15, 20)]
+
+
+@pytest.mark.asyncio
+async def test_idle_sessions_are_evicted_by_ttl():
+    manager = StateManager()
+    manager.session_ttl = 100
+    old = await manager.get_or_create_session(telegram_user_id=1)
+    fresh = await manager.get_or_create_session(telegram_user_id=2)
+    old["last_active"] -= 500
+
+    evicted = manager.evict_idle()
+
+    assert evicted == 1
+    assert 1 not in manager.sessions
+    assert old["id"] not in manager.messages
+    assert 2 in manager.sessions
+    assert fresh["id"] in manager.messages
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_session_evicted_over_capacity():
+    manager = StateManager()
+    manager.max_sessions = 2
+    await manager.get_or_create_session(telegram_user_id=1)
+    await manager.get_or_create_session(telegram_user_id=2)
+    await manager.get_or_create_session(telegram_user_id=1)
+    await manager.get_or_create_session(telegram_user_id=3)
+
+    assert list(manager.sessions) == [1, 3]
+
+
+@pytest.mark.asyncio
+async def test_estimated_bytes_tracks_history():
+    manager = StateManager()
+    session = await manager.get_or_create_session(telegram_user_id=1)
+    baseline = manager.estimated_bytes
+
+    await manager.save_message(session["id"], "user", "x" * 1000)
+    assert manager.estimated_bytes > baseline + 1000
+
+    await manager.reset_conversation(1)
+    assert manager.estimated_bytes == baseline
+
+    manager._evict(1, "test")
+    assert manager.estimated_bytes == 0
+
+
+@pytest.mark.asyncio
+async def test_memory_only_state_manager_trims_history_to_context():
+    manager = StateManager()
+    session = await manager.get_or_create_session(telegram_user_id=3)
+    for i in range(15):
+        await manager.save_message(session["id"], "user", f"message {i}")
+
+    history = await manager.get_conversation_history(session["id"])
+
+    assert len(history) == manager.max_context_messages
+    assert history[-1]["content"] == "message 14"
+
+
+@pytest.mark.asyncio
+async def test_history_limit_zero_returns_whole_hot_tail():
+    manager = StateManager()
+    session = await manager.get_or_create_session(telegram_user_id=4)
+    for i in range(manager.max_context_messages + 5):
+        await manager.save_message(session["id"], "user", f"message {i}")
+
+    assert len(await manager.get_conversation_history(session["id"])) == manager.max_context_messages
+    assert len(await manager.get_conversation_history(session["id"], limit=0)) == manager.max_context_messages + 5
+
+
+@pytest.mark.asyncio
+async def test_sessions_and_messages_are_compact_records():
+    manager = StateManager()
+    session = await manager.get_or_create_session(telegram_user_id=5, language_code="en")
+    await manager.save_message(session.id, "".join(["us", "er"]), "Hi")
+
+    message = manager.messages[session.id][0]
+    assert not hasattr(session, "__dict__")
+    assert not hasattr(message, "__dict__")
+    assert isinstance(session.created_at, float)
+    assert isinstance(message.created_at, float)
+    assert message.role is sys.intern("user")
+    assert session["language"] == "en"
+
+
+@pytest.mark.asyncio
+async def test_update_session_context_uses_id_index():
+    manager = StateManager()
+    session = await manager.get_or_create_session(telegram_user_id=6)
+
+    await manager.update_session_context(session.id, {"topic": "python"})
+    assert manager.sessions[6].conversation_context == {"topic": "python"}
+
+    manager._evict(6, "test")
+    assert session.id not in manager.sessions_by_id
+
+
+@pytest.mark.asyncio
+async def test_idle_history_is_archived_and_rehydrated():
+    manager = StateManager()
+    manager.cold_after = 100
+    idle = await manager.get_or_create_session(telegram_user_id=1)
+    active = await manager.get_or_create_session(telegram_user_id=2)
+    for i in range(5):
+        await manager.save_message(idle.id, "user", f"Сообщение номер {i} " * 20)
+    await manager.save_message(active.id, "user", "Hi")
+    expected = await manager.get_conversation_history(idle.id)
+    hot_bytes = manager.estimated_bytes
+    idle.last_active -= 500
+
+    assert manager.archive_idle() == 1
+    assert idle.id not in manager.messages
+    assert idle.id in manager.cold
+    assert active.id in manager.messages
+    assert manager.cold.compression_ratio > 2
+    assert manager.estimated_bytes < hot_bytes
+
+    assert await manager.get_conversation_history(idle.id) == expected
+    assert idle.id not in manager.cold
+    assert manager.estimated_bytes == hot_bytes
+
+
+@pytest.mark.asyncio
+async def test_evicting_archived_session_frees_cold_tier():
+    manager = StateManager()
+    manager.cold_after = 100
+    session = await manager.get_or_create_session(telegram_user_id=1)
+    await manager.save_message(session.id, "user", "Hi")
+    session.last_active -= 500
+    manager.archive_idle()
+
+    manager._evict(1, "test")
+
+    assert len(manager.cold) == 0
+    assert manager.cold.compressed_bytes == 0
+    assert manager.estimated_bytes == 0
+
+
+@pytest.mark.asyncio
+async def test_saving_to_evicted_session_does_not_recreate_history():
+    manager = StateManager()
+    session = await manager.get_or_create_session(telegram_user_id=1)
+    # Сессию выгрузили, пока шёл запрос к модели
+    manager._evict(1, "capacity")
+
+    await manager.save_message(session.id, "assistant", "late reply")
+
+    assert session.id not in manager.messages
+    assert session.id not in manager._history_bytes
+    assert manager.estimated_bytes == 0
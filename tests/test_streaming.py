@@ -0,0 +1,93 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from telegram.constants import ParseMode
+from config.settings import settings
+from src.bot.handlers import MessageHandler
+from src.bot.streaming import StreamingReply, PLACEHOLDER
+from src.localization.messages import t
+from src.utils.exceptions import RateLimitError
+
+
+def make_incoming_message():
+    sent = []
+
+    async def reply_text(text, parse_mode=None):
+        message = MagicMock()
+        message.text = text
+        message.edit_text = AsyncMock()
+        message.delete = AsyncMock()
+        sent.append(message)
+        return message
+
+    incoming = MagicMock()
+    incoming.reply_text = AsyncMock(side_effect=reply_text)
+    return incoming, sent
+
+
+@pytest.mark.asyncio
+async def test_streaming_reply_sends_placeholder_and_edits():
+    incoming, sent = make_incoming_message()
+    reply = StreamingReply(incoming, edit_interval=0)
+
+    await reply.start()
+    assert sent[0].text == PLACEHOLDER
+
+    await reply.push("Hello")
+    await reply.push(", world")
+    sent[0].edit_text.assert_called_with("Hello, world", parse_mode=None)
+
+    await reply.finish("Hello, world!")
+    sent[0].edit_text.assert_called_with("Hello, world!", parse_mode=ParseMode.MARKDOWN)
+    assert len(sent) == 1
+
+
+@pytest.mark.asyncio
+async def test_streaming_reply_throttles_edits():
+    incoming, sent = make_incoming_message()
+    reply = StreamingReply(incoming, edit_interval=60)
+
+    await reply.start()
+    for token in ["a", "b", "c"]:
+        await reply.push(token)
+
+    sent[0].edit_text.assert_not_called()
+    assert reply.text == "abc"
+
+
+@pytest.mark.asyncio
+async def test_streaming_reply_rolls_over_to_new_message():
+    incoming, sent = make_incoming_message()
+    reply = StreamingReply(incoming, edit_interval=0, max_size=20)
+
+    await reply.start()
+    await reply.push("first line of text\n")
+    await reply.push("second line of text")
+
+    assert len(sent) == 2
+    sent[0].edit_text.assert_called_with("first line of text", parse_mode=None)
+    assert sent[1].text == "second line of text"
+
+
+@pytest.mark.asyncio
+async def test_failed_stream_removes_placeholder(monkeypatch, mock_ai_client, mock_state_manager, content_filter):
+    monkeypatch.setattr(settings, "ai_stream_responses", True)
+
+    async def failing_stream(**kwargs):
+        yield "partial "
+        raise RateLimitError("429")
+
+    mock_ai_client.context_budget = 8000
+    mock_ai_client.stream_response = failing_stream
+    handler = MessageHandler(mock_ai_client, mock_state_manager, content_filter)
+    handler.middleware.process_message = AsyncMock(return_value=(True, "Hello"))
+    incoming, sent = make_incoming_message()
+    update = MagicMock()
+    update.effective_user.language_code = "en"
+    update.message = incoming
+
+    await handler._handle_message(update, MagicMock())
+
+    assert sent[0].text == PLACEHOLDER
+    sent[0].delete.assert_awaited_once()
+    assert sent[-1].text == t("en", "error_rate_limit")
+    mock_state_manager.save_message.assert_not_called()
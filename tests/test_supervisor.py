@@ -0,0 +1,87 @@
+import asyncio
+import functools
+import os
+import pytest
+from telegram import Update
+from telegram.ext import Application, ContextTypes, MessageHandler, filters
+from benchmarks.fake_telegram import FakeBotAPI
+from src.bot.sharding import HashRing, routing_key
+from src.bot.supervisor import Supervisor
+
+TOKEN = "123456:TEST"
+
+
+async def echo_with_pid(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.message.reply_text(f"{os.getpid()}:{update.message.text}")
+
+
+def make_echo_application(base_url: str) -> Application:
+    application = Application.builder().token(TOKEN).base_url(base_url).updater(None).build()
+    application.add_handler(MessageHandler(filters.TEXT, echo_with_pid))
+    return application
+
+
+def test_hash_ring_is_stable_and_balanced():
+    ring = HashRing(range(4))
+
+    assignments = [ring.node_for(chat_id) for chat_id in range(10000)]
+
+    rebuilt = HashRing(range(4))
+    assert assignments == [rebuilt.node_for(chat_id) for chat_id in range(10000)]
+    for node in range(4):
+        assert 1500 < assignments.count(node) < 3500
+
+
+def test_hash_ring_moves_few_keys_when_growing():
+    before = HashRing(range(4))
+    after = HashRing(range(5))
+
+    moved = sum(before.node_for(key) != after.node_for(key) for key in range(10000))
+
+    assert moved < 3000
+
+
+def test_routing_key_uses_chat_id():
+    assert routing_key({"update_id": 1, "message": {"chat": {"id": -100}, "from": {"id": 5}}}) == -100
+    assert routing_key({"update_id": 2, "callback_query": {"from": {"id": 7}}}) == 7
+    assert routing_key({"update_id": 3}) is None
+
+
+async def test_supervisor_routes_by_chat_and_restarts_workers():
+    async with FakeBotAPI(TOKEN) as api:
+        supervisor = Supervisor(
+            functools.partial(make_echo_application, api.base_url),
+            workers=2, restart_delay=0.1, report_interval=0,
+        )
+        supervisor.start()
+        try:
+            chats = range(1, 7)
+            for index in range(3):
+                for chat_id in chats:
+                    supervisor.route(api.make_message_update(chat_id, f"m{index}"))
+            sent = await api.wait_for("sendMessage", 18, timeout=60)
+
+            for chat_id in chats:
+                replies = [params["text"].split(":") for params in sent if params["chat_id"] == chat_id]
+                assert len({pid for pid, _ in replies}) == 1
+                assert [text for _, text in replies] == ["m0", "m1", "m2"]
+
+            crashed = supervisor.shards[0].process
+            crashed.kill()
+            await asyncio.to_thread(crashed.join, 5)
+            for _ in range(100):
+                supervisor.check_workers()
+                if supervisor.shards[0].process is not crashed:
+                    break
+                await asyncio.sleep(0.05)
+            assert supervisor.shards[0].restarts == 1
+
+            chat_on_shard0 = next(chat_id for chat_id in range(100) if supervisor.ring.node_for(chat_id) == 0)
+            supervisor.route(api.make_message_update(chat_on_shard0, "after restart"))
+            sent = await api.wait_for("sendMessage", 19, timeout=60)
+            assert sent[-1]["text"].endswith("after restart")
+
+            stats = supervisor.stats()
+            assert sum(shard["routed"] for shard in stats.values()) == 19
+        finally:
+            await supervisor.stop()
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import threading
+import pytest
+from logging.handlers import RotatingFileHandler
+from unittest.mock import AsyncMock, MagicMock
+from src.bot.handlers import MessageHandler
+from src.state.manager import StateManager
+from src.utils.trace_report import SpanNode, critical_path, load_traces, report, trace_files
+from src.utils.tracing import Tracer, current_trace_id, span
+
+
+def read_spans(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+async def test_spans_propagate_through_awaits_and_tasks(tmp_path):
+    tracer = Tracer(path=str(tmp_path / "traces.jsonl"), sample_rate=1.0)
+
+    async def child():
+        with span("child", step=1):
+            await asyncio.sleep(0)
+            return current_trace_id()
+
+    with tracer.trace("update", chat_id=1) as root:
+        with span("outer"):
+            in_task = await asyncio.create_task(child())
+        in_call = await child()
+    tracer.close()
+
+    assert current_trace_id() is None
+    assert in_task == in_call == root.trace_id
+    spans = {record["name"]: record for record in read_spans(tmp_path / "traces.jsonl") if record["name"] != "child"}
+    assert spans["update"]["parent"] is None
+    assert spans["outer"]["parent"] == spans["update"]["span"]
+    assert all(record["trace"] == root.trace_id for record in read_spans(tmp_path / "traces.jsonl"))
+
+
+async def test_unsampled_traces_are_kept_only_when_slow(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(path=str(path), sample_rate=0.0, slow_threshold=0.05)
+
+    with tracer.trace("update", kind="fast"):
+        pass
+    with tracer.trace("update", kind="slow"):
+        await asyncio.sleep(0.06)
+    tracer.close()
+
+    assert [record["attrs"]["kind"] for record in read_spans(path)] == ["slow"]
+    assert span("orphan").trace_id is None
+
+
+def test_critical_path_skips_to_latest_finishing_child():
+    def node(name, start, end, *children):
+        result = SpanNode({"name": name, "start_ms": start, "duration_ms": end - start})
+        result.children = list(children)
+        return result
+
+    root = node("update", 0, 100, node("a", 0, 30), node("b", 30, 90, node("c", 40, 80)), node("p", 5, 25))
+
+    totals = {}
+    for name, duration in critical_path(root):
+        totals[name] = totals.get(name, 0) + duration
+
+    assert totals == pytest.approx({"update": 10, "b": 20, "c": 40, "a": 30})
+
+
+def test_traces_are_written_off_the_calling_thread(tmp_path, monkeypatch):
+    writers = []
+    emit = RotatingFileHandler.emit
+
+    def recording_emit(handler, record):
+        writers.append(threading.current_thread())
+        emit(handler, record)
+
+    monkeypatch.setattr(RotatingFileHandler, "emit", recording_emit)
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(path=str(path), sample_rate=1.0)
+
+    for index in range(3):
+        with tracer.trace("update", index=index):
+            with span("child"):
+                pass
+    tracer.close()
+
+    assert len(writers) == 3
+    assert threading.current_thread() not in writers
+    assert [record["name"] for record in read_spans(path)] == ["child", "update"] * 3
+
+
+async def test_handler_trace_covers_components_and_report(tmp_path, monkeypatch, mock_ai_client, content_filter):
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(path=str(path), sample_rate=1.0, max_bytes=2000, backup_count=3)
+    monkeypatch.setattr("src.bot.handlers.tracer", tracer)
+    mock_ai_client.context_budget = 8000
+    handler = MessageHandler(mock_ai_client, StateManager(), content_filter)
+
+    for update_id in range(3):
+        update = MagicMock()
+        update.update_id = update_id
+        update.effective_chat.id = 42
+        update.effective_user.id = 42
+        update.effective_user.language_code = "en"
+        update.message.text = "Hello"
+        update.message.reply_text = AsyncMock()
+        update.message.chat.send_action = AsyncMock()
+        await handler._handle_message(update, MagicMock())
+    tracer.close()
+
+    names = {record["name"] for record in read_spans(path)}
+    assert {"update", "middleware.process", "filter.validate", "state.session", "state.history",
+            "filter.response", "state.save", "split", "send"} <= names
+
+    files = trace_files(str(path))
+    assert len(files) > 1
+    roots = load_traces(files)
+    assert len(roots) == 3
+    text = report(roots, top=2)
+    assert "Slowest 2 trace(s)" in text
+    assert "Critical path breakdown" in text
@@ -0,0 +1,88 @@
+import asyncio
+from src.bot.typing_scheduler import TypingScheduler
+
+
+def recorder(calls, chat_id, delay=0.0):
+    async def send_action():
+        if delay:
+            await asyncio.sleep(delay)
+        calls.append(chat_id)
+    return send_action
+
+
+async def test_one_action_per_chat_per_interval():
+    scheduler = TypingScheduler(interval=0.05)
+    calls = []
+
+    async with scheduler.typing(1, recorder(calls, 1)), scheduler.typing(1, recorder(calls, 1)):
+        async with scheduler.typing(2, recorder(calls, 2)):
+            await asyncio.sleep(0.12)
+            assert scheduler.active_chats == 2
+
+    assert 2 <= calls.count(1) <= 3
+    assert calls.count(1) == calls.count(2)
+    scheduler.close()
+
+
+async def test_chat_stops_when_last_generation_finishes():
+    scheduler = TypingScheduler(interval=0.05)
+    calls = []
+
+    scheduler.add(1, recorder(calls, 1))
+    scheduler.add(1, recorder(calls, 1))
+    await asyncio.sleep(0.01)
+    scheduler.remove(1)
+    await asyncio.sleep(0.06)
+    assert calls == [1, 1]
+
+    scheduler.remove(1)
+    await asyncio.sleep(0.1)
+    assert calls == [1, 1]
+    assert scheduler.active_chats == 0
+    assert scheduler._timer is None
+
+
+async def test_pending_action_is_cancelled_after_reply():
+    scheduler = TypingScheduler(interval=0.05)
+    calls = []
+
+    async with scheduler.typing(1, recorder(calls, 1, delay=0.05)):
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.1)
+
+    assert calls == []
+
+
+async def test_failed_action_stops_typing_for_chat():
+    scheduler = TypingScheduler(interval=0.02)
+    attempts = []
+
+    async def failing():
+        attempts.append(1)
+        raise RuntimeError("Forbidden: bot was blocked by the user")
+
+    async with scheduler.typing(1, failing):
+        await asyncio.sleep(0.1)
+
+    assert attempts == [1]
+    scheduler.close()
+
+
+async def test_post_stop_closes_typing_scheduler(monkeypatch):
+    import main
+    monkeypatch.setattr(main.settings, "telegram_bot_token", "123456:TEST")
+    monkeypatch.setattr(main.settings, "state_backend", "memory")
+    application = main.build_application()
+    # post_stop выполняется до Application.shutdown, пока бот ещё может отправлять
+    assert application.post_stop is main.post_stop
+    scheduler = application.bot_data["typing"]
+    calls = []
+    scheduler.add(1, recorder(calls, 1, delay=10))
+    await asyncio.sleep(0.01)
+
+    await main.post_stop(application)
+
+    assert scheduler.active_chats == 0
+    assert scheduler._timer is None
+    await asyncio.sleep(0)
+    assert calls == []
@@ -0,0 +1,74 @@
+import asyncio
+import httpx
+import pytest
+from telegram import Update
+from telegram.ext import Application, ContextTypes, MessageHandler, filters
+from benchmarks.fake_telegram import FakeBotAPI
+from src.bot.webhook import SECRET_HEADER, WebhookServer, run_webhook
+
+TOKEN = "123456:TEST"
+SECRET = "s3cret-token"
+
+
+async def echo(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.message.reply_text(f"echo: {update.message.text}")
+
+
+@pytest.fixture
+async def webhook_bot():
+    async with FakeBotAPI(TOKEN) as api:
+        application = Application.builder().token(TOKEN).base_url(api.base_url).updater(None).build()
+        application.add_handler(MessageHandler(filters.TEXT, echo))
+        server = WebhookServer(application, url="https://bot.example.com", host="127.0.0.1",
+                               port=0, secret_token=SECRET)
+        stop = asyncio.Event()
+        runner = asyncio.create_task(run_webhook(application, server, stop))
+        await api.wait_for("setWebhook")
+        try:
+            yield api, server
+        finally:
+            stop.set()
+            await runner
+
+
+async def test_webhook_registers_only_handled_update_types(webhook_bot):
+    api, server = webhook_bot
+
+    assert api.webhook["url"] == "https://bot.example.com/telegram"
+    assert api.webhook["secret_token"] == SECRET
+    assert api.webhook["allowed_updates"] == ["message"]
+
+
+async def test_webhook_delivers_update_end_to_end(webhook_bot):
+    api, server = webhook_bot
+    update = api.make_message_update(user_id=42, text="hello")
+
+    async with httpx.AsyncClient() as client:
+        response = await client.post(
+            f"http://127.0.0.1:{server.port}/telegram", json=update, headers={SECRET_HEADER: SECRET}
+        )
+
+    assert response.status_code == 200
+    sent = await api.wait_for("sendMessage")
+    assert sent[0]["chat_id"] == 42
+    assert sent[0]["text"] == "echo: hello"
+
+
+async def test_webhook_rejects_wrong_secret(webhook_bot):
+    api, server = webhook_bot
+    update = api.make_message_update(user_id=42, text="hello")
+
+    async with httpx.AsyncClient() as client:
+        forbidden = await client.post(
+            f"http://127.0.0.1:{server.port}/telegram", json=update, headers={SECRET_HEADER: "wrong"}
+        )
+        missing = await client.post(f"http://127.0.0.1:{server.port}/telegram", json=update)
+        not_found = await client.post(
+            f"http://127.0.0.1:{server.port}/other", json=update, headers={SECRET_HEADER: SECRET}
+        )
+
+    assert forbidden.status_code == 403
+    assert missing.status_code == 403
+    assert not_found.status_code == 404
+    await asyncio.sleep(0.05)
+    assert api.calls_to("sendMessage") == []